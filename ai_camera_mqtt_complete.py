@@ -10,7 +10,8 @@ import numpy as np
 import time
 import sys
 import threading
-from collections import deque
+import queue
+import signal
 import json
 from datetime import datetime
 
@@ -69,9 +70,11 @@ except ImportError:
     
     # Mock 클래스들
     class rPPGProcessor:
-        def __init__(self, fps=30): pass
+        def __init__(self, fps=30, **kwargs): pass
         def process_frame(self, frame, bbox): pass
+        def process_sample(self, sample): pass
         def get_heart_rate(self): return 0, 0
+        def pop_beats(self): return []
         def reset(self): pass
         def draw_roi(self, frame): pass
         def draw_heart_rate(self, frame, x=0, y=0): pass
@@ -80,23 +83,63 @@ except ImportError:
     class StressAnalyzer:
         def __init__(self): pass
         def update_heart_rate(self, hr): pass
+        def update_beats(self, beat_times): pass
         def get_stress_data(self): return {'stress_index': 0}
         def reset(self): pass
+        def stop(self): pass
         def draw_stress_info(self, frame, x=0, y=0): pass
     
     class SpO2Estimator:
         def __init__(self, fps=30): pass
         def process_frame(self, frame, bbox): pass
+        def process_sample(self, sample): pass
         def get_spo2_data(self): return {'spo2': 0}
         def reset(self): pass
         def draw_spo2_info(self, frame, x=0, y=0): pass
 
+# 얼굴 감지 전략 (감지 후 추적)
+from face_tracking import DetectThenTrack, SearchWindowDetector
+
+# IMX500 온센서 추론 후처리
+from imx500_postprocess import IMX500Detector
+
+# 단계별 지연 측정
+from stage_profiler import StageProfiler
+
+# 고정 크기 numpy 링 버퍼 (평균용 버퍼)
+from ring_buffer import RingBuffer
+
+# rPPG / SpO2 공통 ROI 통계 (프레임당 한 번)
+from roi_stats import ROIStatsStage
+
+# 생체신호 워커 파이프라인 (ROI 샘플 큐 + 최신값 저장소)
+from biometrics_pipeline import BiometricsPipeline
+
+# 얼굴 감지기 백엔드 (Haar / OpenCV DNN / TFLite)
+from face_detectors import BACKENDS, create_detector
+
+# 멀티프로세스 얼굴 감지 (공유 메모리 프레임 슬롯)
+from detection_pool import DetectionPool
+
+# 생체신호 배치 메시지 (지표별 토픽은 로컬 재발행기가 복원)
+from biometrics_batch import BATCH_TOPIC, build_batch_message
+
+# MQTT 페이로드 코덱 (json / msgpack / cbor / struct)
+from mqtt_codecs import CODECS, CodecRegistry
+
+# 브로커가 끊긴 동안의 MQTT 메시지 디스크 큐 (SQLite WAL)
+from mqtt_outbox import MQTTOutbox, paho_publish_batch
+
+# 공용 주기 작업 스케줄러 (전송 주기 마감 시각에만 깨어남)
+from scheduler import get_scheduler
+
 
 class MQTTBiometricsSender:
     """MQTT 생체신호 전송기"""
     
     def __init__(self, broker_host="localhost", broker_port=1883, 
-                 client_id="biometrics_sensor", topic_prefix="biometrics"):
+                 client_id="biometrics_sensor", topic_prefix="biometrics", batched=False,
+                 codec="json", topic_codecs=None, outbox=None):
         """
         MQTT 생체신호 전송기 초기화
         
@@ -105,11 +148,31 @@ class MQTTBiometricsSender:
             broker_port: MQTT 브로커 포트
             client_id: MQTT 클라이언트 ID
             topic_prefix: 토픽 접두사
+            batched: True면 주기마다 <topic_prefix>/batch 메시지 하나만 전송
+                     (지표별 토픽은 biometrics_batch.py 재발행기로 복원)
+            codec: 페이로드 코덱 (json / msgpack / cbor / struct, JSON이 아니면 토픽 끝에 /<코덱 이름>)
+            topic_codecs: MQTT 패턴 -> 코덱 이름 (codec보다 우선)
+            outbox: MQTTOutbox 설정 dict (예: {"path": "mqtt_outbox.db"}) - 브로커가 끊긴 동안 저장 후 재연결 시 전송
         """
         self.broker_host = broker_host
         self.broker_port = broker_port
         self.client_id = client_id
         self.topic_prefix = topic_prefix
+        self.batched = batched
+        
+        # 전송 통계
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        
+        # 페이로드 코덱 (라이브러리가 없으면 JSON)
+        try:
+            self.codecs = CodecRegistry(codec, topic_codecs)
+        except RuntimeError as e:
+            print(f"⚠️ MQTT codec unavailable ({e}) - using JSON")
+            self.codecs = CodecRegistry()
+        
+        # 원격 명령 콜백 (설정하면 <topic_prefix>/command 구독)
+        self.command_callback = None
         
         # MQTT 사용 가능 여부 확인
         if not MQTT_AVAILABLE:
@@ -123,28 +186,40 @@ class MQTTBiometricsSender:
         self.client.on_connect = self.on_connect
         self.client.on_disconnect = self.on_disconnect
         self.client.on_publish = self.on_publish
+        self.client.on_message = self.on_message
         
         # 연결 상태
         self.connected = False
         
-        # 데이터 버퍼 (최근 값들의 평균을 위해)
-        self.hr_buffer = deque(maxlen=30)  # 1초 평균 (30fps 기준)
-        self.stress_buffer = deque(maxlen=30)
-        self.spo2_buffer = deque(maxlen=30)
+        # 저장 후 전달 큐 (이전 실행에서 남은 메시지도 재연결되면 전송)
+        self.outbox = MQTTOutbox(**outbox) if outbox else None
+        
+        # 데이터 버퍼 (최근 값들의 평균을 위해, 미리 할당된 numpy 링 버퍼)
+        self.hr_buffer = RingBuffer(30)  # 1초 평균 (30fps 기준)
+        self.stress_buffer = RingBuffer(30)
+        self.spo2_buffer = RingBuffer(30)
+        # add_biometric_data는 프레임 루프, 전송은 스케줄러 스레드에서 실행되므로 추가 / 버퍼 교체는 락 안에서
+        self.buffer_lock = threading.Lock()
         
         # 전송 간격 (초)
         self.send_interval = 5.0
-        self.last_send_time = 0
         
-        # 스레드 제어
+        # 주기 전송 작업 (공용 스케줄러에 등록)
         self.running = False
-        self.send_thread = None
+        self.scheduler = get_scheduler()
+        self.send_job = None
         
     def on_connect(self, client, userdata, flags, rc):
         """MQTT 연결 콜백"""
         if rc == 0:
             self.connected = True
             print(f"✓ MQTT Connected to {self.broker_host}:{self.broker_port}")
+            if self.outbox is not None:
+                self.outbox.wake()
+            
+            # 명령 토픽 구독 (재연결 시에도 다시 구독)
+            if self.command_callback:
+                client.subscribe(f"{self.topic_prefix}/command")
         else:
             self.connected = False
             print(f"✗ MQTT Connection failed with code {rc}")
@@ -158,6 +233,21 @@ class MQTTBiometricsSender:
         """MQTT 발행 콜백"""
         print(f"📤 Message published (mid: {mid})")
     
+    def on_message(self, client, userdata, msg):
+        """MQTT 명령 수신 콜백 (평문 "reset" 또는 JSON {"command": "reset"})"""
+        if not self.command_callback:
+            return
+        
+        command = msg.payload.decode('utf-8', errors='ignore').strip()
+        try:
+            data = json.loads(command)
+            command = data.get('command', '') if isinstance(data, dict) else str(data)
+        except ValueError:
+            pass
+        
+        if command:
+            self.command_callback(command.strip().lower())
+    
     def connect(self):
         """MQTT 브로커에 연결"""
         if not self.enabled:
@@ -165,7 +255,12 @@ class MQTTBiometricsSender:
             
         try:
             print(f"🔄 Connecting to MQTT broker {self.broker_host}:{self.broker_port}...")
-            self.client.connect(self.broker_host, self.broker_port, 60)
+            if self.outbox is not None:
+                # 브로커가 없어도 네트워크 루프가 계속 재연결 시도 (그동안은 outbox에 저장)
+                self.outbox.start(lambda rows: paho_publish_batch(self.client, rows), lambda: self.connected)
+                self.client.connect_async(self.broker_host, self.broker_port, 60)
+            else:
+                self.client.connect(self.broker_host, self.broker_port, 60)
             self.client.loop_start()
             
             # 연결 대기 (최대 5초)
@@ -174,20 +269,23 @@ class MQTTBiometricsSender:
                 time.sleep(0.1)
                 wait_time += 0.1
             
-            return self.connected
+            if self.outbox is not None and not self.connected:
+                print(f"💾 Storing messages in {self.outbox.path} until the broker is reachable "
+                      f"({len(self.outbox)} pending)")
+            return self.connected or self.outbox is not None
         except Exception as e:
             print(f"✗ MQTT connection error: {e}")
             return False
     
     def disconnect(self):
         """MQTT 브로커 연결 해제"""
-        self.running = False
-        if self.send_thread:
-            self.send_thread.join()
+        self._cancel_send_job()
         
-        if self.enabled and self.connected:
+        if self.enabled and (self.connected or self.outbox is not None):
             self.client.loop_stop()
             self.client.disconnect()
+        if self.outbox is not None:
+            self.outbox.close()  # 남은 메시지는 다음 실행에서 전송
         print("✓ MQTT Disconnected")
     
     def add_biometric_data(self, heart_rate=None, stress_index=None, spo2=None):
@@ -202,22 +300,39 @@ class MQTTBiometricsSender:
         if not self.enabled:
             return
             
-        if heart_rate is not None and 40 <= heart_rate <= 180:
-            self.hr_buffer.append(heart_rate)
+        with self.buffer_lock:
+            if heart_rate is not None and 40 <= heart_rate <= 180:
+                self.hr_buffer.append(heart_rate)
         
-        if stress_index is not None and stress_index > 0:
-            self.stress_buffer.append(stress_index)
+            if stress_index is not None and stress_index > 0:
+                self.stress_buffer.append(stress_index)
         
-        if spo2 is not None and 85 <= spo2 <= 100:
-            self.spo2_buffer.append(spo2)
+            if spo2 is not None and 85 <= spo2 <= 100:
+                self.spo2_buffer.append(spo2)
     
-    def get_averaged_data(self):
-        """버퍼된 데이터의 평균값 계산"""
-        avg_hr = np.mean(list(self.hr_buffer)) if self.hr_buffer else None
-        avg_stress = np.mean(list(self.stress_buffer)) if self.stress_buffer else None
-        avg_spo2 = np.mean(list(self.spo2_buffer)) if self.spo2_buffer else None
+    def swap_buffers(self):
+        """
+        주기 버퍼를 새 버퍼로 교체하고 이전 버퍼 반환
+        (전송 중에 들어온 샘플은 새 버퍼에 쌓여 다음 주기에 포함)
         
-        return avg_hr, avg_stress, avg_spo2
+        Returns:
+            (hr_buffer, stress_buffer, spo2_buffer)
+        """
+        with self.buffer_lock:
+            buffers = (self.hr_buffer, self.stress_buffer, self.spo2_buffer)
+            self.hr_buffer = RingBuffer(self.hr_buffer.capacity)
+            self.stress_buffer = RingBuffer(self.stress_buffer.capacity)
+            self.spo2_buffer = RingBuffer(self.spo2_buffer.capacity)
+        return buffers
+    
+    def get_averaged_data(self, buffers=None):
+        """버퍼된 데이터의 평균값 계산 (buffers: swap_buffers() 결과, 없으면 현재 버퍼를 락 안에서)"""
+        if buffers is None:
+            with self.buffer_lock:
+                return self.hr_buffer.mean(), self.stress_buffer.mean(), self.spo2_buffer.mean()
+        
+        hr_buffer, stress_buffer, spo2_buffer = buffers
+        return hr_buffer.mean(), stress_buffer.mean(), spo2_buffer.mean()
     
     def create_sensor_message(self, sensor_type, value, unit=""):
         """센서 메시지 생성"""
@@ -230,32 +345,78 @@ class MQTTBiometricsSender:
             "gpio_lib": GPIO_LIB if IS_RASPBERRY_PI else "none"
         }
     
+    def publish_data(self, topic, message):
+        """
+        토픽별 코덱으로 메시지 발행 + 전송 통계 (연결이 없거나 백로그가 있으면 outbox 뒤에 저장)
+        
+        소켓이 끊겼는데 on_disconnect가 아직 호출되지 않은 경우 publish가 실패 코드를 반환하므로
+        (MQTTConnectionManager.publish와 같이) 그 메시지도 outbox에 저장하고, 전송 통계는 성공한 발행만 센다.
+        
+        Returns:
+            발행했거나 outbox에 저장했으면 True
+        """
+        topic, payload = self.codecs.encode(topic, message)
+        if self.outbox is not None and (not self.connected or len(self.outbox)):
+            return self.outbox.put(topic, payload)
+        result = self.client.publish(topic, payload)
+        if result.rc != 0:
+            if self.outbox is not None:
+                return self.outbox.put(topic, payload)
+            print(f"✗ MQTT publish failed on {topic} (rc {result.rc})")
+            return False
+        self.messages_sent += 1
+        self.bytes_sent += len(payload)
+        return True
+    
+    def send_batch(self):
+        """주기 동안의 모든 지표를 배치 메시지 하나로 전송 (평균 / 최소 / 최대 / 표준편차 / 샘플 수)"""
+        hr_buffer, stress_buffer, spo2_buffer = self.swap_buffers()
+        message = build_batch_message(
+            {
+                "heart_rate": hr_buffer.values(),
+                "stress_index": stress_buffer.values(),
+                "spo2": spo2_buffer.values()
+            },
+            self.client_id,
+            GPIO_LIB if IS_RASPBERRY_PI else "none",
+            self.send_interval
+        )
+        self.publish_data(f"{self.topic_prefix}/{BATCH_TOPIC}", message)
+        
+        metrics = message["metrics"]
+        summary = " | ".join(f"{key} {m['mean']} (n={m['n']})" for key, m in metrics.items())
+        print(f"📤 Batch: {summary or 'no samples'}")
+        
     def send_biometrics(self):
-        """생체신호 데이터를 MQTT로 전송"""
-        if not self.enabled or not self.connected:
+        """생체신호 데이터를 MQTT로 전송 (연결이 없으면 outbox에 저장, outbox가 없으면 건너뜀)"""
+        if not self.enabled or not (self.connected or self.outbox is not None):
             return
         
-        avg_hr, avg_stress, avg_spo2 = self.get_averaged_data()
+        if self.batched:
+            self.send_batch()
+            return
+        
+        avg_hr, avg_stress, avg_spo2 = self.get_averaged_data(self.swap_buffers())
         
         # 심박수 전송
         if avg_hr is not None:
             hr_message = self.create_sensor_message("heart_rate", round(avg_hr, 1), "BPM")
             topic = f"{self.topic_prefix}/heart_rate"
-            self.client.publish(topic, json.dumps(hr_message))
+            self.publish_data(topic, hr_message)
             print(f"📤 Heart Rate: {avg_hr:.1f} BPM")
         
         # 스트레스 지수 전송
         if avg_stress is not None:
             stress_message = self.create_sensor_message("stress_index", round(avg_stress, 1), "%")
             topic = f"{self.topic_prefix}/stress"
-            self.client.publish(topic, json.dumps(stress_message))
+            self.publish_data(topic, stress_message)
             print(f"📤 Stress Index: {avg_stress:.1f}%")
         
         # 산소포화도 전송
         if avg_spo2 is not None:
             spo2_message = self.create_sensor_message("spo2", round(avg_spo2, 1), "%")
             topic = f"{self.topic_prefix}/spo2"
-            self.client.publish(topic, json.dumps(spo2_message))
+            self.publish_data(topic, spo2_message)
             print(f"📤 SpO2: {avg_spo2:.1f}%")
         
         # 통합 메시지 전송
@@ -277,68 +438,146 @@ class MQTTBiometricsSender:
         }
         
         combined_topic = f"{self.topic_prefix}/combined"
-        self.client.publish(combined_topic, json.dumps(combined_message))
+        self.publish_data(combined_topic, combined_message)
         print(f"📤 Combined biometrics sent")
+    
+    def publish_diagnostics(self, stats):
+        """단계별 지연 통계를 진단 토픽으로 전송"""
+        if not self.enabled or not self.connected:
+            return
         
-        # 버퍼 초기화
-        self.hr_buffer.clear()
-        self.stress_buffer.clear()
-        self.spo2_buffer.clear()
+        message = {
+            "type": "diagnostics",
+            "timestamp": datetime.now().isoformat(),
+            "data": stats,
+            "device_id": self.client_id
+        }
+        self.publish_data(f"{self.topic_prefix}/diagnostics", message)
     
-    def send_loop(self):
-        """주기적 전송 루프"""
-        while self.running:
-            current_time = time.time()
-            
-            if current_time - self.last_send_time >= self.send_interval:
-                try:
-                    self.send_biometrics()
-                    self.last_send_time = current_time
-                except Exception as e:
-                    print(f"✗ Send error: {e}")
+    def send_tick(self):
+        """전송 주기 마감마다 스케줄러가 호출"""
+        try:
+            self.send_biometrics()
+        except Exception as e:
+            print(f"✗ Send error: {e}")
             
-            time.sleep(0.1)
-    
     def start_sending(self):
-        """전송 시작"""
-        if not self.enabled or not self.connected:
+        """전송 시작 (send_interval마다 스케줄러가 send_tick 호출)"""
+        if not self.enabled or not (self.connected or self.outbox is not None):
             return False
         
         self.running = True
-        self.send_thread = threading.Thread(target=self.send_loop, daemon=True)
-        self.send_thread.start()
+        if self.send_job is None:
+            self.send_job = self.scheduler.every(self.send_interval, self.send_tick, name="biometrics_send")
         print(f"✓ MQTT sending started (interval: {self.send_interval}s)")
         return True
     
+    def _cancel_send_job(self):
+        """주기 전송 작업 취소 (진행 중인 전송이 끝날 때까지 대기)"""
+        self.running = False
+        if self.send_job is not None:
+            self.send_job.cancel()
+            self.send_job = None
+    
     def stop_sending(self):
         """전송 중지"""
-        self.running = False
-        if self.send_thread:
-            self.send_thread.join()
+        self._cancel_send_job()
         print("✓ MQTT sending stopped")
 
 
 class AICamera:
     """Picamera2를 OpenCV VideoCapture 인터페이스로 래핑"""
     
-    def __init__(self, width=640, height=480, fps=30):
+    # 캡처 포맷별 Picamera2 main 스트림 포맷
+    # libcamera의 RGB888은 메모리상 [B, G, R] 순서라 OpenCV BGR로 바로 사용 가능
+    #   rgb    - 기존 방식 (RGB888 + 프레임마다 cvtColor)
+    #   bgr    - 변환 없이 버퍼 그대로 사용
+    #   yuv420 - I420 버퍼, 감지는 Y 평면(그레이), 컬러는 ROI만 변환
+    CAPTURE_FORMATS = {
+        "rgb": "RGB888",
+        "bgr": "RGB888",
+        "yuv420": "YUV420"
+    }
+    
+    # 생체신호 ROI를 모두 덮는 얼굴 내 영역 (x, y, w, h 비율)
+    # rPPG 이마(0.25~0.75, 0.15~0.35) + SpO2 이마(0.2~0.8, 0.05~0.30)
+    BIOMETRIC_REGION = (0.2, 0.05, 0.6, 0.30)
+    
+    def __init__(self, width=640, height=480, fps=30, threaded=False, ring_size=4,
+                 capture_format="rgb", lores_size=None, imx500_model=None, imx500_threshold=0.5,
+                 imx500_classes=None):
+        """
+        Args:
+            width, height, fps: 캡처 해상도 / 프레임레이트
+            threaded: True면 백그라운드 스레드가 캡처하고 read()는 최신 프레임만 반환
+            ring_size: 스레드 모드 프레임 링 버퍼 크기 (최소 3)
+            capture_format: "rgb" (기존), "bgr" (변환 없음), "yuv420" (Y 평면 감지)
+            lores_size: (w, h) - 감지용 lores 스트림 크기 (예: (320, 240)), None이면 미사용
+            imx500_model: IMX500 네트워크 파일 (.rpk) - 지정하면 온센서 얼굴 감지 사용
+            imx500_threshold: IMX500 감지 최소 점수
+            imx500_classes: 얼굴로 볼 IMX500 클래스 id 목록 (None이면 전체 - 얼굴 전용 네트워크만)
+        """
+        if capture_format not in self.CAPTURE_FORMATS:
+            raise ValueError(f"Unsupported capture format: {capture_format}")
+        
         self.width = width
         self.height = height
         self.fps = fps
+        self.capture_format = capture_format
+        self.lores_size = tuple(lores_size) if lores_size else None
         self.picam2 = None
         self.started = False
         
+        # IMX500 온센서 추론 (start()에서 Picamera2보다 먼저 로드)
+        self.imx500_model = imx500_model
+        self.imx500_threshold = imx500_threshold
+        self.imx500_classes = imx500_classes
+        self.ai_detector = None
+        
+        # yuv420 모드에서 ROI만 변환해 채우는 BGR 캔버스
+        self.roi_canvas = None
+        
+        # 스레드 캡처 모드 설정
+        self.threaded = threaded
+        self.ring_size = max(3, ring_size)  # 최신 / 읽는 중 / 쓰는 중 슬롯
+        self.capture_thread = None
+        self.capture_running = False
+        
+        # 프레임 정보 (seq, timestamp, 누적 드롭 수)
+        self.frame_seq = 0
+        self.last_read_seq = 0
+        self.dropped_frames = 0
+        
     def start(self):
         """카메라 시작"""
         try:
-            self.picam2 = Picamera2()
+            # IMX500 네트워크 펌웨어는 카메라를 열기 전에 로드해야 함
+            if self.imx500_model and self.ai_detector is None:
+                try:
+                    self.ai_detector = IMX500Detector(self.imx500_model,
+                                                      score_threshold=self.imx500_threshold,
+                                                      class_ids=self.imx500_classes)
+                    print(f"✓ IMX500 network loaded: {self.imx500_model}")
+                except Exception as e:
+                    print(f"⚠️ IMX500 network not available ({e}) - using Haar cascade")
+            
+            if self.ai_detector:
+                self.picam2 = Picamera2(self.ai_detector.camera_num)
+            else:
+                self.picam2 = Picamera2()
+            
+            # 감지용 lores 스트림 (YUV420 - Y 평면을 그레이로 사용)
+            lores = None
+            if self.lores_size:
+                lores = {"size": self.lores_size, "format": "YUV420"}
             
             # AI 카메라 최적 설정
             config = self.picam2.create_preview_configuration(
                 main={
                     "size": (self.width, self.height),
-                    "format": "RGB888"
+                    "format": self.CAPTURE_FORMATS[self.capture_format]
                 },
+                lores=lores,
                 controls={
                     "FrameRate": self.fps,
                     "AeEnable": True,
@@ -352,28 +591,267 @@ class AICamera:
             
             # 카메라 안정화 대기
             time.sleep(2)
-            print(f"✓ AI Camera started: {self.width}x{self.height} @ {self.fps}fps")
+            
+            if self.threaded:
+                self._start_capture_thread()
+            
+            mode_text = f", threaded x{self.ring_size}" if self.threaded else ""
+            if self.lores_size:
+                mode_text += f", lores {self.lores_size[0]}x{self.lores_size[1]}"
+            if self.ai_detector:
+                mode_text += ", IMX500"
+            print(f"✓ AI Camera started: {self.width}x{self.height} @ {self.fps}fps "
+                  f"({self.capture_format}{mode_text})")
             return True
             
         except Exception as e:
             print(f"✗ Camera initialization failed: {e}")
             return False
     
+    def _start_capture_thread(self):
+        """캡처 스레드 + 미리 할당한 프레임 링 준비"""
+        self.ring = np.empty((self.ring_size,) + self._frame_shape(), dtype=np.uint8)
+        self.ring_metadata = [{} for _ in range(self.ring_size)]
+        if self.lores_size:
+            lores_w, lores_h = self.lores_size
+            self.lores_ring = np.empty((self.ring_size, lores_h, lores_w), dtype=np.uint8)
+        self.slot_seq = [0] * self.ring_size  # 슬롯별 seq (-1 = 쓰는 중)
+        
+        # (slot, seq, timestamp) 튜플 - 통째로 교체되므로 락 없이 읽을 수 있음
+        self.latest = None
+        self.reader_slot = -1
+        self.frame_event = threading.Event()
+        
+        self.capture_running = True
+        self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.capture_thread.start()
+    
+    def _claim_slot(self, start):
+        """쓸 슬롯 선택 (최신 슬롯과 소비자가 읽는 슬롯은 건너뜀)"""
+        latest_slot = self.latest[0] if self.latest else -1
+        for i in range(1, self.ring_size + 1):
+            slot = (start + i) % self.ring_size
+            if slot == latest_slot:
+                continue
+            # 먼저 쓰는 중으로 표시한 뒤 소비자 슬롯 확인 (read 쪽과 순서가 반대)
+            self.slot_seq[slot] = -1
+            if slot != self.reader_slot:
+                return slot
+        return None
+    
+    def _capture_loop(self):
+        """백그라운드 캡처 루프 (생산자)"""
+        slot = 0
+        while self.capture_running:
+            try:
+                frame, lores_gray, metadata = self._capture()
+                timestamp = time.time()
+                
+                next_slot = self._claim_slot(slot)
+                if next_slot is None:
+                    continue
+                slot = next_slot
+                
+                # 링 슬롯에 바로 기록 (추가 할당 없음)
+                self._convert(frame, dst=self.ring[slot])
+                if lores_gray is not None:
+                    np.copyto(self.lores_ring[slot], lores_gray)
+                self.ring_metadata[slot] = metadata
+                
+                self.frame_seq += 1
+                self.slot_seq[slot] = self.frame_seq
+                self.latest = (slot, self.frame_seq, timestamp)
+                self.frame_event.set()
+            
+            except Exception as e:
+                if self.capture_running:
+                    print(f"✗ Capture thread error: {e}")
+                    time.sleep(0.1)
+    
+    def read_latest(self, timeout=1.0):
+        """최신 프레임 읽기
+        
+        스레드 모드에서는 마지막으로 읽은 뒤 새로 들어온 프레임 중 가장 최신 것만
+        반환하고 그 사이 프레임은 건너뛴다 (지연 대신 드롭). 반환된 프레임은 다음
+        read 호출 전까지 캡처 스레드가 덮어쓰지 않는다.
+        
+        Returns:
+            (ret, frame, info) - info: seq, timestamp, dropped, metadata, lores
+            frame은 yuv420 모드에서 I420 버퍼, 그 외에는 BGR
+            lores는 lores 스트림의 Y 평면 (lores_size 미설정 시 None)
+        """
+        if not self.started:
+            return False, None, {}
+        
+        if not self.threaded:
+            try:
+                frame, lores_gray, metadata = self._capture()
+                timestamp = time.time()
+                frame = self._convert(frame)
+            except:
+                return False, None, {}
+            
+            self.frame_seq += 1
+            self.last_read_seq = self.frame_seq
+            return True, frame, {
+                'seq': self.frame_seq,
+                'timestamp': timestamp,
+                'dropped': self.dropped_frames,
+                'metadata': metadata,
+                'lores': lores_gray
+            }
+        
+        deadline = time.time() + timeout
+        while True:
+            latest = self.latest
+            if latest is None or latest[1] == self.last_read_seq:
+                # 새 프레임 대기 (clear 후 재확인으로 신호 유실 방지)
+                self.frame_event.clear()
+                latest = self.latest
+                if latest is None or latest[1] == self.last_read_seq:
+                    remaining = deadline - time.time()
+                    if remaining <= 0 or not self.capture_running:
+                        return False, None, {}
+                    self.frame_event.wait(remaining)
+                    continue
+            
+            slot, seq, timestamp = latest
+            # 슬롯을 먼저 점유한 뒤 아직 같은 프레임인지 확인
+            self.reader_slot = slot
+            if self.slot_seq[slot] != seq:
+                continue
+            
+            if seq > self.last_read_seq + 1:
+                self.dropped_frames += seq - self.last_read_seq - 1
+            self.last_read_seq = seq
+            
+            return True, self.ring[slot], {
+                'seq': seq,
+                'timestamp': timestamp,
+                'dropped': self.dropped_frames,
+                'metadata': self.ring_metadata[slot],
+                'lores': self.lores_ring[slot] if self.lores_size else None
+            }
+    
     def read(self):
         """프레임 읽기 (VideoCapture 호환)"""
         if not self.started:
             return False, None
+        
+        if self.threaded:
+            ret, frame, _ = self.read_latest()
+            return ret, frame
             
         try:
             frame = self.picam2.capture_array()
-            # RGB를 BGR로 변환 (OpenCV 호환성)
-            frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            return True, frame_bgr
+            return True, self._convert(frame)
         except:
             return False, None
     
+    def read_with_metadata(self):
+        """프레임 + 메타데이터 읽기 (단일 요청)
+        
+        capture_array()/capture_metadata()를 따로 부르면 요청을 두 번 기다리고
+        메타데이터가 다른 프레임의 것일 수 있으므로 한 request에서 함께 꺼낸다.
+        """
+        ret, frame, info = self.read_latest()
+        if not ret:
+            return False, None, {}
+        return True, frame, info['metadata']
+    
+    def _capture(self):
+        """한 request에서 main 프레임, lores Y 평면, 메타데이터를 함께 꺼냄"""
+        request = self.picam2.capture_request()
+        try:
+            frame = request.make_array("main")
+            lores_gray = None
+            if self.lores_size:
+                lores_w, lores_h = self.lores_size
+                lores_gray = request.make_array("lores")[:lores_h, :lores_w]
+            metadata = request.get_metadata()
+        finally:
+            request.release()
+        return frame, lores_gray, metadata
+    
+    def _frame_shape(self):
+        """캡처 포맷별 프레임 배열 shape"""
+        if self.capture_format == "yuv420":
+            return (self.height * 3 // 2, self.width)
+        return (self.height, self.width, 3)
+    
+    def _convert(self, frame, dst=None):
+        """캡처 버퍼 정리 (rgb 모드만 전체 프레임 변환)"""
+        if self.capture_format == "rgb":
+            # RGB를 BGR로 변환 (기존 방식)
+            if dst is None:
+                return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=dst)
+        if dst is None:
+            return frame
+        np.copyto(dst, frame)
+        return dst
+    
+    def gray(self, frame):
+        """감지용 그레이 이미지 (yuv420 모드는 Y 평면 뷰, 복사 없음)"""
+        if self.capture_format == "yuv420":
+            return frame[:self.height, :self.width]
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    
+    def to_bgr(self, frame):
+        """화면 표시용 전체 BGR 프레임"""
+        if self.capture_format == "yuv420":
+            return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+        return frame
+    
+    def roi_bgr(self, frame, face_bbox):
+        """생체신호용 BGR 프레임
+        
+        yuv420 모드에서는 BIOMETRIC_REGION만 변환해 전체 크기 캔버스에 채운다.
+        좌표계는 그대로라 rPPG/SpO2 ROI 계산을 바꿀 필요가 없다.
+        """
+        if self.capture_format != "yuv420":
+            return frame
+        
+        if self.roi_canvas is None:
+            self.roi_canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        if face_bbox is None:
+            return self.roi_canvas
+        
+        x, y, w, h = face_bbox
+        fx, fy, fw, fh = self.BIOMETRIC_REGION
+        # I420 크로마가 2x2 단위라 짝수 좌표로 정렬 (반올림 여유 2px)
+        x0 = max(0, (int(x + w * fx) - 2) & ~1)
+        y0 = max(0, (int(y + h * fy) - 2) & ~1)
+        x1 = min(self.width, (int(x + w * (fx + fw)) + 3) & ~1)
+        y1 = min(self.height, (int(y + h * (fy + fh)) + 3) & ~1)
+        if x1 <= x0 or y1 <= y0:
+            return self.roi_canvas
+        
+        # I420 평면 뷰 (Y: HxW, U/V: H/2 x W/2)
+        H, W = self.height, self.width
+        y_plane = frame[:H]
+        u_plane = frame[H:H + H // 4].reshape(H // 2, W // 2)
+        v_plane = frame[H + H // 4:H + H // 2].reshape(H // 2, W // 2)
+        
+        # ROI 부분만 작은 I420 버퍼로 모아서 변환
+        rh, rw = y1 - y0, x1 - x0
+        sub = np.empty(rh * rw * 3 // 2, dtype=np.uint8)
+        sub[:rh * rw] = y_plane[y0:y1, x0:x1].ravel()
+        sub[rh * rw:rh * rw * 5 // 4] = u_plane[y0 // 2:y1 // 2, x0 // 2:x1 // 2].ravel()
+        sub[rh * rw * 5 // 4:] = v_plane[y0 // 2:y1 // 2, x0 // 2:x1 // 2].ravel()
+        self.roi_canvas[y0:y1, x0:x1] = cv2.cvtColor(
+            sub.reshape(rh * 3 // 2, rw), cv2.COLOR_YUV2BGR_I420
+        )
+        return self.roi_canvas
+    
     def release(self):
         """카메라 해제"""
+        # 캡처 스레드 먼저 종료
+        if self.capture_thread:
+            self.capture_running = False
+            self.capture_thread.join(timeout=2.0)
+            self.capture_thread = None
+        
         if self.picam2 and self.started:
             try:
                 self.picam2.stop()
@@ -389,6 +867,21 @@ class AICamera:
         """OpenCV set 메서드 호환 (무시)"""
         pass
     
+    def detect_ai_faces(self, metadata):
+        """
+        같은 요청 메타데이터의 IMX500 출력 텐서에서 얼굴 감지
+        
+        Returns:
+            [(x, y, w, h), ...] main 좌표, 점수 내림차순
+            네트워크가 없거나 텐서가 아직 없으면 None (Haar 폴백)
+        """
+        if self.ai_detector is None:
+            return None
+        faces = self.ai_detector.detect(metadata, (self.width, self.height), self.picam2)
+        if faces is None:
+            return None
+        return [face[:4] for face in faces]
+    
     def get_metadata(self):
         """AI 카메라 메타데이터 가져오기"""
         if self.picam2 and self.started:
@@ -465,9 +958,20 @@ class PIRSensorGPIOD:
 class FaceTrackerWithAIMQTT(FaceTracker):
     """AI 카메라를 사용한 얼굴 트래킹 + 생체신호 측정 + MQTT 전송 (라즈베리파이 5 호환)"""
     
+    # 키 입력 -> 제어 명령 (헤드리스 모드는 MQTT 명령 토픽 / 시그널로 같은 명령 사용)
+    KEY_COMMANDS = {'q': 'quit', 'r': 'reset', 's': 'search', 'h': 'hr', 't': 'stress',
+                    'o': 'spo2', 'd': 'debug', 'a': 'ai', 'm': 'mqtt'}
+    
     def __init__(self, pir_pin=17, start_off=False, 
                  mqtt_broker="localhost", mqtt_port=1883, 
-                 mqtt_topic="healthcare/biometrics"):
+                 mqtt_topic="healthcare/biometrics", threaded_capture=False,
+                 capture_format="rgb", lores_size=None,
+                 face_strategy="detect", redetect_interval=10, track_confidence=0.6,
+                 window_misses=3, imx500_model=None, imx500_threshold=0.5, imx500_classes=None,
+                 profile_interval=10.0, mqtt_diagnostics=False, headless=False,
+                 rppg_algorithm="green", detect_workers=0, detector="haar", detector_model=None,
+                 detector_input=None, detector_threads=None, mqtt_batch=False, mqtt_codec="json",
+                 mqtt_outbox=None):
         # 실행 제어
         self.running = True
         
@@ -486,7 +990,13 @@ class FaceTrackerWithAIMQTT(FaceTracker):
             self.pir_thread.start()
         
         # AI 카메라로 초기화
-        self.cap = AICamera(width=640, height=480, fps=30)
+        self.threaded_capture = threaded_capture
+        self.capture_format = capture_format
+        self.lores_size = lores_size
+        self.imx500_model = imx500_model
+        self.imx500_threshold = imx500_threshold
+        self.imx500_classes = imx500_classes
+        self.cap = self._create_camera()
         if self.camera_active:
             if not self.cap.start():
                 print("✗ Failed to start AI Camera")
@@ -521,15 +1031,47 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         self.pan_pid = PIDController(kp=0.08, ki=0.001, kd=0.002)
         self.tilt_pid = PIDController(kp=0.08, ki=0.001, kd=0.002)
         
-        # 얼굴 감지기
-        self.face_cascade = cv2.CascadeClassifier(
-            cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-        )
+        # 얼굴 감지기 백엔드 (시작 시 워밍업, 모델이 없으면 Haar로 대체)
+        self.detector_config = {'backend': detector, 'model': detector_model,
+                                'input_size': detector_input, 'threads': detector_threads}
+        try:
+            self.face_detector = create_detector(**self.detector_config)
+        except RuntimeError as e:
+            print(f"⚠️ {detector} detector unavailable ({e}) - using Haar")
+            self.detector_config = {'backend': 'haar', 'input_size': detector_input}
+            self.face_detector = create_detector(**self.detector_config)
+        warmup_ms = self.face_detector.warmup()
+        print(f"✓ Face detector: {self.face_detector.name} (warm-up {warmup_ms:.1f} ms)")
+        
+        # 감지 프로세스 풀 (옵션: 전체 감지를 워커 프로세스에서, 가장 최근 완료 결과 사용)
+        self.detection_pool = None
+        if detect_workers > 0:
+            self.detection_pool = DetectionPool(workers=detect_workers, detector_config=self.detector_config)
+        
+        # 얼굴 감지 전략 (detect: 매 프레임 감지, track: N 프레임마다 감지 + 템플릿 추적,
+        # window: 직전 얼굴 주변 탐색 창에서만 재감지)
+        self.face_strategy = face_strategy
+        self.face_tracker = None
+        self.window_detector = None
+        if face_strategy == "track":
+            self.face_tracker = DetectThenTrack(
+                redetect_interval=redetect_interval,
+                min_confidence=track_confidence
+            )
+        elif face_strategy == "window":
+            # 탐색 창도 선택한 감지기 백엔드로 스캔 (전체 스캔은 detect_face에서 감지 프로세스 풀 사용 가능)
+            self.window_detector = SearchWindowDetector(self.face_detector, max_misses=window_misses)
         
         # 생체 신호 프로세서들
-        self.rppg = rPPGProcessor(fps=30)
+        self.rppg = rPPGProcessor(fps=30, algorithm=rppg_algorithm)
         self.stress_analyzer = StressAnalyzer()
         self.spo2_estimator = SpO2Estimator(fps=30)
+        self.roi_stats = ROIStatsStage()
+        
+        # 생체신호 워커 (프레임 루프는 ROI 샘플만 넘기고 결과는 최신값 저장소에서 읽음)
+        self.bio_pipeline = BiometricsPipeline(self.rppg, self.stress_analyzer, self.spo2_estimator)
+        self.bio_pipeline.start()
+        self.bio_version = 0
         
         # 기능 활성화 여부
         self.rppg_enabled = True
@@ -539,10 +1081,19 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         # 디버그 모드
         self.debug_mode = False
         
+        # 단계별 지연 측정 (주기 요약, 옵션: MQTT 진단 토픽)
+        self.profiler = StageProfiler(report_interval=profile_interval)
+        self.mqtt_diagnostics = mqtt_diagnostics
+        
+        # 헤드리스 모드 (그리기 / GUI 없음, MQTT 명령 토픽 / 시그널로 제어)
+        self.headless = headless
+        self.command_queue = queue.Queue()
+        self.auto_search_enabled = False
+        
         # 5초 평균 계산용 버퍼
-        self.hr_buffer = deque(maxlen=150)
-        self.stress_buffer = deque(maxlen=150)
-        self.spo2_buffer = deque(maxlen=150)
+        self.hr_buffer = RingBuffer(150)
+        self.stress_buffer = RingBuffer(150)
+        self.spo2_buffer = RingBuffer(150)
         self.last_avg_time = time.time()
         
         # AI 기능 활성화
@@ -553,8 +1104,12 @@ class FaceTrackerWithAIMQTT(FaceTracker):
             broker_host=mqtt_broker,
             broker_port=mqtt_port,
             client_id=f"ai_camera_{int(time.time())}",
-            topic_prefix=mqtt_topic
+            topic_prefix=mqtt_topic,
+            batched=mqtt_batch,
+            codec=mqtt_codec,
+            outbox={"path": mqtt_outbox} if mqtt_outbox else None
         )
+        self.mqtt_sender.command_callback = self.command_queue.put
         
         # MQTT 연결
         self.mqtt_enabled = self.mqtt_sender.connect()
@@ -586,8 +1141,16 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         print("'d' - Toggle debug mode")
         print("'a' - Toggle AI enhancement")
         print("'m' - Toggle MQTT transmission")
+        print(f"Headless: send quit/reset/search/hr/stress/spo2/debug/ai/mqtt to {mqtt_topic}/command")
         print("="*70 + "\n")
     
+    def _create_camera(self):
+        """현재 설정으로 AICamera 생성 (PIR 재시작 시에도 동일 설정 유지)"""
+        return AICamera(width=640, height=480, fps=30, threaded=self.threaded_capture,
+                        capture_format=self.capture_format, lores_size=self.lores_size,
+                        imx500_model=self.imx500_model, imx500_threshold=self.imx500_threshold,
+                        imx500_classes=self.imx500_classes)
+    
     def monitor_pir_sensor(self):
         """PIR 센서 모니터링 스레드"""
         print("📡 PIR sensor monitoring started...")
@@ -655,16 +1218,18 @@ class FaceTrackerWithAIMQTT(FaceTracker):
                 try:
                     # AICamera 재시작
                     if not self.cap.started:
-                        self.cap = AICamera(width=640, height=480, fps=30)
+                        self.cap = self._create_camera()
                         self.cap.start()
                     
                     self.camera_active = True
                     print("✓ Camera turned ON")
                     
                     # 생체신호 프로세서 재초기화
-                    self.rppg.reset()
-                    self.stress_analyzer.reset()
-                    self.spo2_estimator.reset()
+                    self.bio_pipeline.reset(rppg=True, stress=True, spo2=True)
+                    if self.face_tracker:
+                        self.face_tracker.reset()
+                    if self.window_detector:
+                        self.window_detector.reset()
                     
                 except Exception as e:
                     print(f"✗ Failed to turn camera on: {e}")
@@ -686,30 +1251,45 @@ class FaceTrackerWithAIMQTT(FaceTracker):
                 except Exception as e:
                     print(f"✗ Failed to turn camera off: {e}")
     
-    def detect_face(self, frame):
-        """얼굴 감지 (AI 향상 옵션)"""
+    def detect_face(self, frame, metadata=None, gray=None):
+        """얼굴 감지 (AI 향상 옵션)
+        
+        Args:
+            frame: 카메라 프레임
+            metadata: 같은 요청에서 얻은 카메라 메타데이터 (없으면 별도 조회)
+            gray: 감지용 그레이 이미지 (없으면 frame에서 변환)
+        """
         # AI 카메라 메타데이터 확인
-        if self.ai_enhanced and hasattr(self.cap, 'get_metadata'):
-            metadata = self.cap.get_metadata()
+        if self.ai_enhanced:
+            if metadata is None and hasattr(self.cap, 'get_metadata'):
+                metadata = self.cap.get_metadata()
             
-            # AI 감지 결과가 있으면 사용
-            if 'AI.FaceDetection' in metadata:
-                faces = metadata['AI.FaceDetection']
-                if len(faces) > 0:
-                    # AI 감지 결과를 OpenCV 형식으로 변환
-                    face = faces[0]
-                    x, y, w, h = face['bbox']
-                    return (int(x), int(y), int(w), int(h))
-        
-        # 기본 Haar Cascade 감지
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = self.face_cascade.detectMultiScale(
-            gray, scaleFactor=1.1, minNeighbors=5, minSize=(80, 80)
-        )
-        
-        if len(faces) > 0:
-            return max(faces, key=lambda f: f[2] * f[3])
-        return None
+            # IMX500 출력 텐서가 있으면 사용 (얼굴 없음도 그대로 반환 - Haar 생략)
+            faces = self.cap.detect_ai_faces(metadata)
+            if faces is not None:
+                return faces[0] if faces else None
+        
+        # 기본 감지 (감지기 백엔드 / 탐색 창 / 감지 프로세스 풀)
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        # lores 그레이면 최소 크기를 같은 비율로 줄여 감지하고 main 좌표로 되돌림
+        scale_x = self.cap.width / gray.shape[1]
+        scale_y = self.cap.height / gray.shape[0]
+        
+        def full_detect():
+            # 감지 프로세스 풀: 현재 프레임을 넘기고 완료된 감지 중 가장 최근 결과 사용
+            if self.detection_pool is not None:
+                return self.detection_pool.detect(gray, (scale_x, scale_y))
+            # 감지기 백엔드 (기본 Haar: 기존과 같은 detectMultiScale 설정)
+            return self.face_detector.detect(gray, (scale_x, scale_y))
+        
+        # 탐색 창 모드: 직전 얼굴 주변만 감지기 백엔드로 스캔 (K번 연속 실패 시 full_detect로 전체 스캔)
+        if self.window_detector is not None:
+            return self.window_detector.detect(
+                gray, getattr(self, 'last_face_center', None), (scale_x, scale_y), full_detect
+            )
+        return full_detect()
     
     def calculate_error(self, face_bbox, frame_shape):
         """중심점 오차 계산"""
@@ -784,6 +1364,16 @@ class FaceTrackerWithAIMQTT(FaceTracker):
             self.kit.servo[self.pan_channel].angle = self.current_pan
             self.kit.servo[self.tilt_channel].angle = self.current_tilt
     
+    def find_face(self, frame, metadata, gray):
+        """감지 전략에 따라 얼굴 찾기 (track 모드는 주기적으로만 전체 감지)"""
+        if self.face_tracker is None:
+            return self.detect_face(frame, metadata, gray)
+        
+        scale = (self.cap.width / gray.shape[1], self.cap.height / gray.shape[0])
+        return self.face_tracker.update(
+            gray, lambda: self.detect_face(frame, metadata, gray), scale
+        )
+    
     def draw_clean_biometrics(self, frame):
         """생체 신호 표시"""
         panel_height = 160
@@ -793,9 +1383,12 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         cv2.rectangle(frame, (10, panel_y), (380, panel_y + panel_height), 
                      (100, 100, 100), 2)
         
+        # 워커가 마지막으로 기록한 값
+        _, values = self.bio_pipeline.store.snapshot()
+        
         # 심박수
         if self.rppg_enabled:
-            hr, _ = self.rppg.get_heart_rate()
+            hr = values.get('heart_rate', 0)
             if hr > 0 and 40 < hr < 180:
                 cv2.putText(frame, f"HR: {hr:.0f} BPM", 
                            (30, panel_y + 35), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
@@ -805,7 +1398,7 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         
         # 스트레스
         if self.stress_enabled:
-            stress_data = self.stress_analyzer.get_stress_data()
+            stress_data = values.get('stress') or {'stress_index': 0}
             if stress_data['stress_index'] > 0:
                 color = (0, 128, 255) if stress_data['stress_index'] >= 60 else \
                         (0, 255, 255) if stress_data['stress_index'] >= 40 else (0, 255, 0)
@@ -817,7 +1410,7 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         
         # SpO2
         if self.spo2_enabled:
-            spo2_data = self.spo2_estimator.get_spo2_data()
+            spo2_data = {'spo2': values.get('spo2', 0)}
             if spo2_data['spo2'] > 0 and 85 <= spo2_data['spo2'] <= 100:
                 color = (0, 255, 0) if spo2_data['spo2'] >= 95 else \
                         (0, 255, 255) if spo2_data['spo2'] >= 90 else (0, 0, 255)
@@ -848,13 +1441,16 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         current_time = time.time()
         
         if current_time - self.last_avg_time >= 5.0:
-            valid_hr = [h for h in self.hr_buffer if 40 < h < 180]
-            valid_stress = [s for s in self.stress_buffer if s > 0]
-            valid_spo2 = [o for o in self.spo2_buffer if 85 <= o <= 100]
+            hr_values = self.hr_buffer.values()
+            stress_values = self.stress_buffer.values()
+            spo2_values = self.spo2_buffer.values()
+            valid_hr = hr_values[(hr_values > 40) & (hr_values < 180)]
+            valid_stress = stress_values[stress_values > 0]
+            valid_spo2 = spo2_values[(spo2_values >= 85) & (spo2_values <= 100)]
             
-            avg_hr = np.mean(valid_hr) if valid_hr else 0
-            avg_stress = np.mean(valid_stress) if valid_stress else 0
-            avg_spo2 = np.mean(valid_spo2) if valid_spo2 else 0
+            avg_hr = valid_hr.mean() if len(valid_hr) else 0
+            avg_stress = valid_stress.mean() if len(valid_stress) else 0
+            avg_spo2 = valid_spo2.mean() if len(valid_spo2) else 0
             
             print("\n" + "="*50)
             print(f"[{time.strftime('%H:%M:%S')}] 5-second Average Biometrics")
@@ -883,41 +1479,51 @@ class FaceTrackerWithAIMQTT(FaceTracker):
             self.last_avg_time = current_time
     
     def process_biometrics_with_mqtt(self, frame, face_bbox):
-        """생체신호 처리 및 MQTT 전송"""
+        """ROI 샘플을 생체신호 워커에 넘기고, 새 결과가 있으면 평균 버퍼 / MQTT에 반영"""
         if face_bbox is None:
             return
         
-        # 기존 생체신호 처리
+        # 0. ROI 통계 (rPPG / SpO2가 같은 타임스탬프 샘플을 공유)
+        if self.rppg_enabled or self.spo2_enabled:
+            sample = self.roi_stats.compute(frame, face_bbox)
+            self.profiler.mark('roi')
+            
+            # 1. 추정기는 워커에서 실행 (큐에 넣기만 하고 바로 반환)
+            self.bio_pipeline.submit(sample, rppg=self.rppg_enabled,
+                                     stress=self.stress_enabled and self.rppg_enabled,
+                                     spo2=self.spo2_enabled)
+            self.profiler.mark('bio_queue')
+        
+        self.collect_biometrics()
+    
+    def collect_biometrics(self):
+        """워커의 최신 결과가 바뀌었으면 5초 평균 버퍼와 MQTT 전송기에 추가"""
+        version, values = self.bio_pipeline.store.snapshot()
+        if version == self.bio_version:
+            return
+        self.bio_version = version
+        
         heart_rate = None
         stress_index = None
         spo2_value = None
         
-        # 1. rPPG 처리 (심박수)
-        if self.rppg_enabled:
-            self.rppg.process_frame(frame, face_bbox)
-            hr, _ = self.rppg.get_heart_rate()
-            if hr > 0 and 40 < hr < 180:
-                heart_rate = hr
-                self.hr_buffer.append(hr)
+        # 1. 심박수
+        hr = values.get('heart_rate', 0)
+        if self.rppg_enabled and hr > 0 and 40 < hr < 180:
+            heart_rate = hr
+            self.hr_buffer.append(hr)
                 
-                # 스트레스 분석기에 심박수 전달
-                if self.stress_enabled:
-                    self.stress_analyzer.update_heart_rate(hr)
-        
-        # 2. SpO2 처리
-        if self.spo2_enabled:
-            self.spo2_estimator.process_frame(frame, face_bbox)
-            spo2_data = self.spo2_estimator.get_spo2_data()
-            if spo2_data['spo2'] > 0 and 85 <= spo2_data['spo2'] <= 100:
-                spo2_value = spo2_data['spo2']
-                self.spo2_buffer.append(spo2_value)
-        
-        # 3. 스트레스 처리
-        if self.stress_enabled:
-            stress_data = self.stress_analyzer.get_stress_data()
-            if stress_data['stress_index'] > 0:
-                stress_index = stress_data['stress_index']
-                self.stress_buffer.append(stress_index)
+        # 2. SpO2
+        spo2 = values.get('spo2', 0)
+        if self.spo2_enabled and spo2 > 0 and 85 <= spo2 <= 100:
+            spo2_value = spo2
+            self.spo2_buffer.append(spo2_value)
+        
+        # 3. 스트레스
+        stress_data = values.get('stress')
+        if self.stress_enabled and stress_data and stress_data['stress_index'] > 0:
+            stress_index = stress_data['stress_index']
+            self.stress_buffer.append(stress_index)
         
         # 4. MQTT로 데이터 전송
         if self.mqtt_enabled:
@@ -926,6 +1532,7 @@ class FaceTrackerWithAIMQTT(FaceTracker):
                 stress_index=stress_index,
                 spo2=spo2_value
             )
+            self.profiler.mark('mqtt')
     
     def draw_overlay(self, frame, face_bbox=None):
         """오버레이 그리기"""
@@ -950,13 +1557,150 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         
         return frame
     
+    def render_frame(self, frame, face_bbox, fps):
+        """화면용 프레임 그리기 (yuv420 모드는 여기서만 전체 변환)"""
+        frame = self.cap.to_bgr(frame)
+        self.profiler.mark('convert')
+        frame = self.draw_overlay(frame, face_bbox)
+        
+        if not self.debug_mode:
+            self.draw_clean_biometrics(frame)
+        else:
+            # 디버그 모드
+            if self.rppg_enabled:
+                self.rppg.draw_roi(frame)
+                self.rppg.draw_heart_rate(frame, x=10, y=180)
+                self.rppg.draw_signal_plot(frame, x=10, y=280)
+            
+            if self.stress_enabled and self.rppg_enabled:
+                self.stress_analyzer.draw_stress_info(frame, x=10, y=380)
+            
+            if self.spo2_enabled:
+                self.spo2_estimator.draw_spo2_info(frame, x=10, y=450)
+            
+            cv2.putText(frame, f"FPS: {fps:.1f} | Drop: {self.cap.dropped_frames} | {GPIO_LIB}", 
+                       (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+            
+            if self.face_tracker:
+                track_stats = self.face_tracker.get_stats()
+                cv2.putText(frame, f"Detect: {track_stats['detect_ratio']*100:.0f}% | "
+                           f"Track conf: {track_stats['confidence']:.2f}", 
+                           (10, 115), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            elif self.window_detector:
+                window_stats = self.window_detector.get_stats()
+                cv2.putText(frame, f"Window scans: {window_stats['window_ratio']*100:.0f}% | "
+                           f"Misses: {window_stats['misses']}", 
+                           (10, 115), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+        
+        return frame
+    
+    def install_signal_handlers(self):
+        """헤드리스 모드 시그널 제어 (SIGTERM: 종료, SIGUSR1: 서보 중앙 복귀, SIGUSR2: MQTT 전송 토글)"""
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.command_queue.put('quit'))
+        signal.signal(signal.SIGUSR1, lambda signum, frame: self.command_queue.put('reset'))
+        signal.signal(signal.SIGUSR2, lambda signum, frame: self.command_queue.put('mqtt'))
+    
+    def next_command(self, key=255):
+        """키 입력 명령, 없으면 대기 중인 원격 명령 (MQTT 명령 토픽 / 시그널) 하나 반환"""
+        if key != 255:
+            return self.KEY_COMMANDS.get(chr(key))
+        try:
+            return self.command_queue.get_nowait()
+        except queue.Empty:
+            return None
+    
+    def handle_command(self, command):
+        """제어 명령 처리 ('quit'이면 False 반환)"""
+        if command is None:
+            return True
+        
+        if command == 'quit':
+            return False
+        elif command == 'reset':
+            self.current_pan = 90
+            self.current_tilt = 90
+            if self.kit:
+                self.kit.servo[self.pan_channel].angle = 90
+                self.kit.servo[self.tilt_channel].angle = 90
+            print("🔄 Position reset")
+        elif command == 'search':
+            self.auto_search_enabled = not self.auto_search_enabled
+            print(f"🔍 Auto search: {'ON' if self.auto_search_enabled else 'OFF'}")
+        elif command == 'hr':
+            self.rppg_enabled = not self.rppg_enabled
+            if not self.rppg_enabled:
+                self.bio_pipeline.reset(rppg=True, stress=True)
+            print(f"💓 Heart rate: {'ON' if self.rppg_enabled else 'OFF'}")
+        elif command == 'stress':
+            self.stress_enabled = not self.stress_enabled
+            if not self.stress_enabled:
+                self.bio_pipeline.reset(stress=True)
+            print(f"😰 Stress: {'ON' if self.stress_enabled else 'OFF'}")
+        elif command == 'spo2':
+            self.spo2_enabled = not self.spo2_enabled
+            if not self.spo2_enabled:
+                self.bio_pipeline.reset(spo2=True)
+            print(f"🫁 SpO2: {'ON' if self.spo2_enabled else 'OFF'}")
+        elif command == 'debug':
+            self.debug_mode = not self.debug_mode
+            print(f"🐛 Debug mode: {'ON' if self.debug_mode else 'OFF'}")
+        elif command == 'ai':
+            self.ai_enhanced = not self.ai_enhanced
+            print(f"🤖 AI enhancement: {'ON' if self.ai_enhanced else 'OFF'}")
+        elif command == 'mqtt':
+            # 연결은 유지하고 전송만 토글 (명령 토픽 수신 유지)
+            if self.mqtt_enabled:
+                if self.mqtt_sender.running:
+                    self.mqtt_sender.stop_sending()
+                    print("📤 MQTT transmission: OFF")
+                elif self.mqtt_sender.connected or self.mqtt_sender.connect():
+                    self.mqtt_sender.start_sending()
+                    print("📤 MQTT transmission: ON")
+            else:
+                print("⚠️ MQTT not available")
+        else:
+            print(f"⚠️ Unknown command: {command}")
+        return True
+    
+    def get_latency_stats(self):
+        """단계별 지연 통계 (p50/p95/p99 ms) + 생체신호 워커 큐 / 지연"""
+        stats = self.profiler.get_stats()
+        stats['biometrics'] = self.bio_pipeline.get_stats()
+        if self.detection_pool is not None:
+            stats['detection_pool'] = self.detection_pool.get_stats()
+        if self.mqtt_sender.enabled and self.mqtt_sender.outbox is not None:
+            stats['mqtt_outbox'] = self.mqtt_sender.outbox.get_stats()
+        stats['scheduler'] = self.mqtt_sender.scheduler.get_stats()
+        return stats
+    
+    def report_profile(self):
+        """주기적으로 단계별 지연 요약 출력 (옵션: MQTT 진단 토픽 전송)"""
+        if not self.profiler.report_due():
+            return
+        
+        stats = self.get_latency_stats()
+        print(self.profiler.format_summary(stats))
+        print(self.bio_pipeline.format_summary(stats['biometrics']))
+        if self.detection_pool is not None:
+            print(self.detection_pool.format_summary(stats['detection_pool']))
+        if 'mqtt_outbox' in stats:
+            print(self.mqtt_sender.outbox.format_summary(stats['mqtt_outbox']))
+        if stats['scheduler']['jobs']:
+            print(self.mqtt_sender.scheduler.format_summary(stats['scheduler']))
+        if self.mqtt_diagnostics and self.mqtt_enabled:
+            self.mqtt_sender.publish_diagnostics(stats)
+    
     def run(self):
         """메인 실행 루프"""
         print("🚀 Starting AI Camera Face Tracking + Biometrics + MQTT (Pi 5)...")
         
         self.running = True
-        auto_search_enabled = False
         no_face_counter = 0
+        
+        if self.headless:
+            self.install_signal_handlers()
+            print("🖥️ Headless mode: no display, control via MQTT command topic or signals")
+        
         fps_time = time.time()
         fps = 0
         
@@ -964,21 +1708,29 @@ class FaceTrackerWithAIMQTT(FaceTracker):
             while True:
                 # 카메라가 꺼져있으면 대기
                 if not self.camera_active:
-                    cv2.putText(blank_frame := np.zeros((480, 640, 3), dtype=np.uint8),
-                               "Camera OFF - Waiting for motion...", 
-                               (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (100, 100, 100), 2)
-                    cv2.imshow('AI Camera Face Tracking + MQTT (Pi 5)', blank_frame)
+                    key = 255
+                    if self.headless:
+                        time.sleep(0.1)
+                    else:
+                        cv2.putText(blank_frame := np.zeros((480, 640, 3), dtype=np.uint8),
+                                   "Camera OFF - Waiting for motion...", 
+                                   (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 1, (100, 100, 100), 2)
+                        cv2.imshow('AI Camera Face Tracking + MQTT (Pi 5)', blank_frame)
+                        key = cv2.waitKey(100) & 0xFF
                     
-                    if cv2.waitKey(100) & 0xFF == ord('q'):
+                    if not self.handle_command(self.next_command(key)):
                         break
                     continue
                 
-                ret, frame = self.cap.read()
+                # 프레임, 메타데이터, lores를 한 번의 요청으로 읽기
+                self.profiler.begin_frame()
+                ret, frame, frame_info = self.cap.read_latest()
                 if not ret:
                     if self.camera_active:  # 카메라가 켜져있는데 읽기 실패
                         print("✗ Camera read failed")
                         time.sleep(0.1)
                     continue
+                self.profiler.mark('capture')
                 
                 # FPS 계산
                 fps_time_now = time.time()
@@ -987,109 +1739,61 @@ class FaceTrackerWithAIMQTT(FaceTracker):
                 fps_time = fps_time_now
                 
                 # 얼굴 감지
-                face_bbox = self.detect_face(frame)
+                # 감지용 그레이 (lores 스트림 우선, yuv420 모드는 Y 평면 그대로)
+                gray = frame_info['lores']
+                if gray is None:
+                    gray = self.cap.gray(frame)
+                self.profiler.mark('convert')
+                face_bbox = self.find_face(frame, frame_info['metadata'], gray)
+                self.profiler.mark('detect')
                 
                 if face_bbox is not None:
                     no_face_counter = 0
                     
                     # 1. 얼굴 트래킹
-                    error_x, error_y = self.calculate_error(face_bbox, frame.shape)
+                    error_x, error_y = self.calculate_error(face_bbox, (self.cap.height, self.cap.width))
                     self.update_servo_position(error_x, error_y)
+                    self.profiler.mark('servo')
                     
                     # 2. 생체신호 처리 및 MQTT 전송
-                    self.process_biometrics_with_mqtt(frame, face_bbox)
+                    # (yuv420 모드는 생체신호 영역만 BGR 변환)
+                    bio_frame = self.cap.roi_bgr(frame, face_bbox)
+                    self.profiler.mark('convert')
+                    self.process_biometrics_with_mqtt(bio_frame, face_bbox)
                 else:
                     no_face_counter += 1
                     self.last_face_center = None
                     
                     # 리셋
                     if no_face_counter > 60:
-                        if self.rppg_enabled:
-                            self.rppg.reset()
-                        if self.stress_enabled:
-                            self.stress_analyzer.reset()
-                        if self.spo2_enabled:
-                            self.spo2_estimator.reset()
+                        self.bio_pipeline.reset(rppg=self.rppg_enabled, stress=self.stress_enabled,
+                                                spo2=self.spo2_enabled)
                     
                     # 자동 탐색
-                    if auto_search_enabled and no_face_counter > 30:
+                    if self.auto_search_enabled and no_face_counter > 30:
                         self.auto_search()
                 
-                # 화면 표시
-                frame = self.draw_overlay(frame, face_bbox)
-                
-                if not self.debug_mode:
-                    self.draw_clean_biometrics(frame)
-                else:
-                    # 디버그 모드
-                    if self.rppg_enabled:
-                        self.rppg.draw_roi(frame)
-                        self.rppg.draw_heart_rate(frame, x=10, y=180)
-                        self.rppg.draw_signal_plot(frame, x=10, y=280)
-                    
-                    if self.stress_enabled and self.rppg_enabled:
-                        self.stress_analyzer.draw_stress_info(frame, x=10, y=380)
-                    
-                    if self.spo2_enabled:
-                        self.spo2_estimator.draw_spo2_info(frame, x=10, y=450)
-                    
-                    cv2.putText(frame, f"FPS: {fps:.1f} | {GPIO_LIB}", 
-                               (10, 90), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+                # 화면 표시 (헤드리스 모드는 그리기 / GUI 생략 - 측정 경로는 동일)
+                if not self.headless:
+                    frame = self.render_frame(frame, face_bbox, fps)
+                self.profiler.mark('overlay')
                 
                 # 5초 평균 출력
                 self.calculate_and_print_averages()
+                self.profiler.mark('report')
                 
-                # 화면 표시
-                cv2.imshow('AI Camera Face Tracking + MQTT (Pi 5)', frame)
+                # 화면 표시 + 키 입력
+                key = 255
+                if not self.headless:
+                    cv2.imshow('AI Camera Face Tracking + MQTT (Pi 5)', frame)
+                    key = cv2.waitKey(1) & 0xFF
+                self.profiler.mark('display')
+                self.profiler.end_frame()
+                self.report_profile()
                 
-                # 키 입력 처리
-                key = cv2.waitKey(1) & 0xFF
-                if key == ord('q'):
+                # 제어 명령 처리 (키 입력 / MQTT 명령 토픽 / 시그널)
+                if not self.handle_command(self.next_command(key)):
                     break
-                elif key == ord('r'):
-                    self.current_pan = 90
-                    self.current_tilt = 90
-                    if self.kit:
-                        self.kit.servo[self.pan_channel].angle = 90
-                        self.kit.servo[self.tilt_channel].angle = 90
-                    print("🔄 Position reset")
-                elif key == ord('s'):
-                    auto_search_enabled = not auto_search_enabled
-                    print(f"🔍 Auto search: {'ON' if auto_search_enabled else 'OFF'}")
-                elif key == ord('h'):
-                    self.rppg_enabled = not self.rppg_enabled
-                    if not self.rppg_enabled:
-                        self.rppg.reset()
-                        self.stress_analyzer.reset()
-                    print(f"💓 Heart rate: {'ON' if self.rppg_enabled else 'OFF'}")
-                elif key == ord('t'):
-                    self.stress_enabled = not self.stress_enabled
-                    if not self.stress_enabled:
-                        self.stress_analyzer.reset()
-                    print(f"😰 Stress: {'ON' if self.stress_enabled else 'OFF'}")
-                elif key == ord('o'):
-                    self.spo2_enabled = not self.spo2_enabled
-                    if not self.spo2_enabled:
-                        self.spo2_estimator.reset()
-                    print(f"🫁 SpO2: {'ON' if self.spo2_enabled else 'OFF'}")
-                elif key == ord('d'):
-                    self.debug_mode = not self.debug_mode
-                    print(f"🐛 Debug mode: {'ON' if self.debug_mode else 'OFF'}")
-                elif key == ord('a'):
-                    self.ai_enhanced = not self.ai_enhanced
-                    print(f"🤖 AI enhancement: {'ON' if self.ai_enhanced else 'OFF'}")
-                elif key == ord('m'):
-                    if self.mqtt_enabled:
-                        if self.mqtt_sender.connected:
-                            self.mqtt_sender.stop_sending()
-                            self.mqtt_sender.disconnect()
-                            print("📤 MQTT transmission: OFF")
-                        else:
-                            if self.mqtt_sender.connect():
-                                self.mqtt_sender.start_sending()
-                                print("📤 MQTT transmission: ON")
-                    else:
-                        print("⚠️ MQTT not available")
         
         except KeyboardInterrupt:
             print("\n👋 User interrupted")
@@ -1103,6 +1807,14 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         # PIR 모니터링 종료
         self.running = False
         
+        # 생체신호 워커 / HRV 주파수 분석 워커 종료
+        self.bio_pipeline.stop()
+        self.stress_analyzer.stop()
+        
+        # 감지 프로세스 / 공유 메모리 해제
+        if self.detection_pool is not None:
+            self.detection_pool.close()
+        
         # MQTT 정리
         if self.mqtt_enabled:
             self.mqtt_sender.stop_sending()
@@ -1119,7 +1831,8 @@ class FaceTrackerWithAIMQTT(FaceTracker):
         # 카메라 해제
         if self.camera_active:
             self.cap.release()
-        cv2.destroyAllWindows()
+        if not self.headless:
+            cv2.destroyAllWindows()
         
         # PIR 센서 정리
         if self.pir_enabled:
@@ -1169,8 +1882,63 @@ if __name__ == "__main__":
                        help='MQTT broker port (default: 1883)')
     parser.add_argument('--mqtt-topic', default='healthcare/biometrics',
                        help='MQTT topic prefix (default: healthcare/biometrics)')
+    parser.add_argument('--threaded-capture', action='store_true',
+                       help='Capture in a background thread and always process the newest frame')
+    parser.add_argument('--capture-format', choices=['rgb', 'bgr', 'yuv420'], default='rgb',
+                       help='Camera buffer format: rgb (convert every frame), bgr (native), '
+                            'yuv420 (detect on Y plane, convert only the biometrics ROI)')
+    parser.add_argument('--lores', metavar='WxH', default=None,
+                       help='Run face detection on a lores stream of this size (e.g. 320x240)')
+    parser.add_argument('--face-strategy', choices=['detect', 'track', 'window'], default='detect',
+                       help='detect: full detection every frame, track: detect every N frames and track in between, '
+                            'window: re-detect only around the last face')
+    parser.add_argument('--redetect-interval', type=int, default=10,
+                       help='Frames between full detections in track mode (default: 10)')
+    parser.add_argument('--track-confidence', type=float, default=0.6,
+                       help='Re-detect when the tracking match score drops below this (default: 0.6)')
+    parser.add_argument('--window-misses', type=int, default=3,
+                       help='Consecutive search-window misses before a full-frame scan (default: 3)')
+    parser.add_argument('--imx500-model', default=None,
+                       help='IMX500 face detection network (.rpk) for on-sensor inference')
+    parser.add_argument('--imx500-threshold', type=float, default=0.5,
+                       help='Minimum IMX500 detection score (default: 0.5)')
+    parser.add_argument('--imx500-classes', metavar='ID[,ID...]', default=None,
+                       help='IMX500 class ids treated as faces (required with --imx500-model, '
+                            'e.g. 0 for a face-only network)')
+    parser.add_argument('--profile-interval', type=float, default=10.0,
+                       help='Seconds between stage latency summaries (0 = off, default: 10)')
+    parser.add_argument('--mqtt-diagnostics', action='store_true',
+                       help='Also publish stage latency stats to <topic>/diagnostics')
+    parser.add_argument('--headless', action='store_true',
+                       help='No display or overlay; control via <topic>/command or signals '
+                            '(SIGTERM quit, SIGUSR1 reset, SIGUSR2 toggle MQTT)')
+    parser.add_argument('--rppg-algorithm', choices=['green', 'chrom', 'pos'], default='green',
+                       help='rPPG pulse extraction: green channel, or motion-robust CHROM / POS '
+                            '(shorter warm-up)')
+    parser.add_argument('--detect-workers', type=int, default=0,
+                       help='Run face detection in N worker processes with shared-memory frames '
+                            '(0 = inline, default)')
+    parser.add_argument('--detector', choices=BACKENDS, default='haar',
+                       help='Face detector backend (dnn: YuNet .onnx or SSD .caffemodel, tflite: SSD .tflite)')
+    parser.add_argument('--detector-model', default=None,
+                       help='Model file for the dnn / tflite detector')
+    parser.add_argument('--detector-input', metavar='WxH', default=None,
+                       help='Detector input size (image is resized to this before detection)')
+    parser.add_argument('--detector-threads', type=int, default=None,
+                       help='Inference threads (dnn: OpenCV global, tflite: interpreter)')
+    parser.add_argument('--mqtt-batch', action='store_true',
+                       help='Publish one <topic>/batch message per interval with all metrics '
+                            '(run biometrics_batch.py to republish the per-metric topics)')
+    parser.add_argument('--mqtt-codec', choices=CODECS, default='json',
+                       help='Payload codec (non-JSON topics get a /<codec> suffix, see mqtt_codecs.py)')
+    parser.add_argument('--mqtt-outbox', metavar='PATH', default=None,
+                       help='Store messages in this SQLite file while the broker is unreachable and '
+                            'send them in order after reconnecting (see mqtt_outbox.py)')
     
     args = parser.parse_args()
+    # 클래스 필터 없이 일반 COCO 네트워크를 쓰면 컵 / 의자 등도 얼굴로 처리되고 Haar 폴백도 건너뜀
+    if args.imx500_model and not args.imx500_classes:
+        parser.error('--imx500-model needs --imx500-classes (the face class ids of the network)')
     
     try:
         # 시스템 정보 출력
@@ -1194,6 +1962,10 @@ if __name__ == "__main__":
         # MQTT 정보 출력
         print(f"📤 MQTT Broker: {args.mqtt_broker}:{args.mqtt_port}")
         print(f"📋 MQTT Topic: {args.mqtt_topic}")
+        if args.mqtt_batch:
+            print(f"📦 MQTT Batch: {args.mqtt_topic}/{BATCH_TOPIC} (per-metric topics via biometrics_batch.py)")
+        if args.mqtt_codec != 'json':
+            print(f"🗜️ MQTT Codec: {args.mqtt_codec} (topics end in /{args.mqtt_codec})")
         print(f"🔬 Biometrics: Heart Rate, Stress Index, SpO2")
         print("="*70)
         
@@ -1203,7 +1975,29 @@ if __name__ == "__main__":
             start_off=args.start_off,
             mqtt_broker=args.mqtt_broker,
             mqtt_port=args.mqtt_port,
-            mqtt_topic=args.mqtt_topic
+            mqtt_topic=args.mqtt_topic,
+            threaded_capture=args.threaded_capture,
+            capture_format=args.capture_format,
+            lores_size=tuple(int(v) for v in args.lores.split('x')) if args.lores else None,
+            face_strategy=args.face_strategy,
+            redetect_interval=args.redetect_interval,
+            track_confidence=args.track_confidence,
+            window_misses=args.window_misses,
+            imx500_model=args.imx500_model,
+            imx500_threshold=args.imx500_threshold,
+            imx500_classes=[int(v) for v in args.imx500_classes.split(',')] if args.imx500_classes else None,
+            profile_interval=args.profile_interval,
+            mqtt_diagnostics=args.mqtt_diagnostics,
+            headless=args.headless,
+            rppg_algorithm=args.rppg_algorithm,
+            detect_workers=args.detect_workers,
+            detector=args.detector,
+            detector_model=args.detector_model,
+            detector_input=tuple(int(v) for v in args.detector_input.split('x')) if args.detector_input else None,
+            detector_threads=args.detector_threads,
+            mqtt_batch=args.mqtt_batch,
+            mqtt_codec=args.mqtt_codec,
+            mqtt_outbox=args.mqtt_outbox
         )
         tracker.run()
         
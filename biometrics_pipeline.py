@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+생체신호 워커 파이프라인
+캡처 / 감지 / 서보 루프는 ROI 통계 샘플 (ROIStatsStage.compute 결과)만 큐에 넣고,
+전용 워커 스레드가 rPPG -> 박동 / HRV -> SpO2 추정기를 실행해서 결과를 최신값 저장소에 기록
+분석 비용과 무관하게 프레임 루프는 큐에 넣는 비용만 부담 (큐가 가득 차면 가장 오래된 샘플을 버림)
+큐 깊이 / 버린 샘플 수 / 워커 단계별 지연은 get_stats()로 확인
+"""
+
+import queue
+import threading
+import time
+
+from stage_profiler import StageProfiler
+
+# 워커 종료 신호
+_STOP = ('stop', None, None, None)
+
+
+class LatestValueStore:
+    """최신 결과 저장소 (쓰기: 워커, 읽기: 프레임 루프 / 화면 / MQTT)
+    
+    갱신할 때마다 dict를 새로 만들어 교체하므로 읽는 쪽은 항상 한 시점의 일관된 값을 본다.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.version = 0  # 갱신 횟수 (새 결과 확인용)
+    
+    def update(self, **values):
+        """값 갱신 (기존 키는 유지, 같은 키는 덮어씀)"""
+        with self.lock:
+            merged = dict(self.values)
+            merged.update(values)
+            merged['updated'] = time.time()
+            self.values = merged
+            self.version += 1
+    
+    def snapshot(self):
+        """(버전, 값 dict) - 반환된 dict는 읽기 전용으로 사용"""
+        with self.lock:
+            return self.version, self.values
+    
+    def get(self, key, default=None):
+        """한 값 조회"""
+        return self.values.get(key, default)
+
+
+class BiometricsPipeline:
+    """ROI 샘플 큐 + 생체신호 워커 스레드 + 최신값 저장소
+    
+    사용법:
+        pipeline = BiometricsPipeline(rppg, stress_analyzer, spo2_estimator)
+        pipeline.start()
+        pipeline.submit(sample)               # 프레임 루프 (블록하지 않음)
+        version, values = pipeline.store.snapshot()
+        pipeline.reset(rppg=True)             # 추정기 초기화도 워커에서 실행
+        pipeline.stop()
+    """
+    
+    def __init__(self, rppg, stress_analyzer, spo2_estimator, max_queue=64):
+        """
+        Args:
+            rppg: rPPGProcessor
+            stress_analyzer: StressAnalyzer
+            spo2_estimator: SpO2Estimator
+            max_queue: 큐 최대 샘플 수 (약 2초 @ 30fps, 넘치면 가장 오래된 샘플을 버림)
+        """
+        self.rppg = rppg
+        self.stress_analyzer = stress_analyzer
+        self.spo2_estimator = spo2_estimator
+        self.max_queue = max_queue
+        
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.store = LatestValueStore()
+        
+        # 워커 단계별 지연 (워커 스레드 전용 측정기)
+        self.profiler = StageProfiler(report_interval=0)
+        
+        # 초기화 요청 (다음 샘플 처리 전에 워커에서 적용 - 추정기는 워커 스레드만 수정)
+        self.reset_lock = threading.Lock()
+        self.pending_reset = set()
+        
+        # 통계
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.lag = 0.0  # 마지막 샘플의 큐 입력 -> 결과 기록까지 (초)
+        
+        self.thread = None
+        self.running = False
+    
+    def start(self):
+        """워커 스레드 시작"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._worker_loop, daemon=True)
+        self.thread.start()
+    
+    def stop(self, timeout=2.0):
+        """큐에 남은 샘플을 처리한 뒤 워커 종료 (timeout 안에 끝나지 않으면 그대로 반환)"""
+        if not self.running:
+            return
+        self._put(_STOP)
+        self.thread.join(timeout)
+        self.running = False
+    
+    def submit(self, sample, rppg=True, stress=True, spo2=True):
+        """
+        ROI 샘플 하나를 워커에 전달 (프레임 루프에서 호출, 블록하지 않음)
+        
+        Args:
+            sample: ROIStatsStage.compute 결과
+            rppg / stress / spo2: 이 샘플에 실행할 추정기
+        """
+        if sample is None:
+            return
+        self.submitted += 1
+        self._put(('sample', sample, (rppg, stress, spo2), time.perf_counter()))
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+    
+    def reset(self, rppg=False, stress=False, spo2=False):
+        """추정기 초기화 요청 (워커가 다음 샘플 전에 실행하고 저장소 값도 갱신)"""
+        with self.reset_lock:
+            if rppg:
+                self.pending_reset.add('rppg')
+            if stress:
+                self.pending_reset.add('stress')
+            if spo2:
+                self.pending_reset.add('spo2')
+        # 대기 중인 샘플이 없어도 바로 적용되도록 깨움
+        self._put(('reset', None, None, None))
+    
+    def _put(self, item):
+        """큐에 넣기 - 가득 차면 가장 오래된 항목을 버리고 넣음"""
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    oldest = self.queue.get_nowait()
+                except queue.Empty:
+                    continue
+                if oldest[0] == 'sample':
+                    self.dropped += 1
+    
+    def _worker_loop(self):
+        """큐에서 샘플을 꺼내 추정기 실행"""
+        while True:
+            kind, sample, flags, queued = self.queue.get()
+            try:
+                self._apply_resets()
+                if kind == 'stop':
+                    break
+                if kind == 'sample':
+                    self._process(sample, *flags)
+                    self.lag = time.perf_counter() - queued
+            except Exception as e:
+                print(f"생체신호 워커 오류: {e}")
+    
+    def _apply_resets(self):
+        """대기 중인 초기화 요청 실행"""
+        with self.reset_lock:
+            if not self.pending_reset:
+                return
+            targets = self.pending_reset
+            self.pending_reset = set()
+        
+        values = {}
+        if 'rppg' in targets:
+            self.rppg.reset()
+            values['heart_rate'], values['signal_quality'] = self.rppg.get_heart_rate()
+        if 'stress' in targets:
+            self.stress_analyzer.reset()
+            values['stress'] = self.stress_analyzer.get_stress_data()
+        if 'spo2' in targets:
+            self.spo2_estimator.reset()
+            values['spo2'] = self.spo2_estimator.get_spo2_data()['spo2']
+        self.store.update(**values)
+    
+    def _process(self, sample, rppg, stress, spo2):
+        """샘플 하나에 추정기 실행 후 결과 기록 (기존 프레임 루프 순서와 동일)"""
+        profiler = self.profiler
+        profiler.begin_frame()
+        values = {}
+        
+        # 1. rPPG (심박수) + 박동 시각 / 심박수를 스트레스 분석기에 전달
+        if rppg:
+            self.rppg.process_sample(sample)
+            hr, quality = self.rppg.get_heart_rate()
+            values['heart_rate'] = hr
+            values['signal_quality'] = quality
+            profiler.mark('rppg')
+            
+            if stress:
+                beats = self.rppg.pop_beats()
+                if beats:
+                    self.stress_analyzer.update_beats(beats)
+                if hr > 0 and 40 < hr < 180:
+                    self.stress_analyzer.update_heart_rate(hr)
+                profiler.mark('stress')
+        
+        # 2. SpO2
+        if spo2:
+            self.spo2_estimator.process_sample(sample)
+            values['spo2'] = self.spo2_estimator.get_spo2_data()['spo2']
+            profiler.mark('spo2')
+        
+        # 3. 스트레스 지수
+        if stress:
+            values['stress'] = self.stress_analyzer.get_stress_data()
+            profiler.mark('stress')
+        
+        profiler.end_frame()
+        self.processed += 1
+        self.store.update(**values)
+    
+    def get_stats(self):
+        """큐 / 워커 통계 (워커 단계 지연은 ms 백분위수)"""
+        return {
+            'queue_depth': self.queue.qsize(),
+            'max_depth': self.max_depth,
+            'capacity': self.max_queue,
+            'submitted': self.submitted,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'lag_ms': round(self.lag * 1000, 3),
+            'stages': {stage: self.profiler.get_stage(stage) for stage in list(self.profiler.rings)}
+        }
+    
+    def format_summary(self, stats=None):
+        """요약 텍스트"""
+        stats = stats or self.get_stats()
+        lines = [
+            f"🧵 Biometrics worker: queue {stats['queue_depth']}/{stats['capacity']} "
+            f"(max {stats['max_depth']}) | dropped {stats['dropped']}/{stats['submitted']} | "
+            f"lag {stats['lag_ms']:.1f} ms"
+        ]
+        for stage, s in stats['stages'].items():
+            if s:
+                lines.append(f"   {stage:<10}{s['p50']:>9.2f}{s['p95']:>9.2f}{s['p99']:>9.2f}")
+        return "\n".join(lines)
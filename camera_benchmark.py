@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+AI 카메라 감지 경로 벤치마크
+main 전체 해상도 감지 (기존 경로) vs lores 스트림 감지의 루프 FPS / CPU 사용률 비교
+생체신호(rPPG, SpO2)는 두 경로 모두 main 해상도 ROI에서 측정
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from ai_camera_mqtt_complete import AICamera
+from rppg_addon import rPPGProcessor
+from spo2_estimator import SpO2Estimator
+
+
+def detect(face_cascade, gray, main_width, main_height):
+    """FaceTrackerWithAIMQTT.detect_face와 같은 Haar 감지 (main 좌표 반환)"""
+    scale_x = main_width / gray.shape[1]
+    scale_y = main_height / gray.shape[0]
+    faces = face_cascade.detectMultiScale(
+        gray, scaleFactor=1.1, minNeighbors=5,
+        minSize=(int(80 / scale_x), int(80 / scale_y))
+    )
+    if len(faces) > 0:
+        x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+        return (int(x * scale_x), int(y * scale_y), int(w * scale_x), int(h * scale_y))
+    return None
+
+
+def run_path(name, lores_size, args, face_cascade):
+    """한 감지 경로로 N 프레임 처리 후 결과 반환"""
+    cam = AICamera(width=args.width, height=args.height, fps=args.fps,
+                   threaded=args.threaded, capture_format=args.capture_format,
+                   lores_size=lores_size)
+    if not cam.start():
+        print(f"✗ {name}: camera start failed")
+        return None
+    
+    rppg = rPPGProcessor(fps=args.fps)
+    spo2 = SpO2Estimator(fps=args.fps)
+    
+    detect_times = []
+    frames = 0
+    face_frames = 0
+    
+    try:
+        # 워밍업 (AE/AWB 안정화, 캐시)
+        for _ in range(args.warmup):
+            cam.read_latest()
+        
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        
+        while frames < args.frames:
+            ret, frame, info = cam.read_latest()
+            if not ret:
+                continue
+            
+            t0 = time.perf_counter()
+            gray = info['lores']
+            if gray is None:
+                gray = cam.gray(frame)
+            face_bbox = detect(face_cascade, gray, cam.width, cam.height)
+            detect_times.append((time.perf_counter() - t0) * 1000)
+            
+            if face_bbox is not None:
+                face_frames += 1
+                bio_frame = cam.roi_bgr(frame, face_bbox)
+                rppg.process_frame(bio_frame, face_bbox)
+                spo2.process_frame(bio_frame, face_bbox)
+            
+            frames += 1
+        
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+    finally:
+        cam.release()
+    
+    return {
+        'name': name,
+        'fps': frames / wall,
+        'cpu': cpu / wall * 100,  # 프로세스 CPU (100% = 코어 1개)
+        'detect_p50': np.percentile(detect_times, 50),
+        'detect_p95': np.percentile(detect_times, 95),
+        'face_rate': face_frames / frames * 100,
+        'dropped': cam.dropped_frames
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='AI Camera detection path benchmark (main vs lores)')
+    parser.add_argument('--width', type=int, default=640, help='Main stream width')
+    parser.add_argument('--height', type=int, default=480, help='Main stream height')
+    parser.add_argument('--fps', type=int, default=30, help='Camera FPS')
+    parser.add_argument('--lores', metavar='WxH', default='320x240', help='Lores stream size')
+    parser.add_argument('--frames', type=int, default=300, help='Frames per path')
+    parser.add_argument('--warmup', type=int, default=30, help='Warm-up frames per path')
+    parser.add_argument('--threaded', action='store_true', help='Use threaded capture')
+    parser.add_argument('--capture-format', choices=['rgb', 'bgr', 'yuv420'], default='rgb',
+                        help='Main stream capture format')
+    args = parser.parse_args()
+    
+    face_cascade = cv2.CascadeClassifier(
+        cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    )
+    lores_size = tuple(int(v) for v in args.lores.split('x'))
+    
+    results = []
+    for name, size in [("main (current)", None), (f"lores {args.lores}", lores_size)]:
+        print(f"🔄 Benchmarking {name} ...")
+        result = run_path(name, size, args, face_cascade)
+        if result:
+            results.append(result)
+    
+    print("\n" + "="*78)
+    print(f"{'path':<20}{'loop fps':>10}{'cpu %':>10}{'det p50 ms':>12}{'det p95 ms':>12}"
+          f"{'face %':>8}{'drop':>6}")
+    print("="*78)
+    for r in results:
+        print(f"{r['name']:<20}{r['fps']:>10.1f}{r['cpu']:>10.1f}{r['detect_p50']:>12.2f}"
+              f"{r['detect_p95']:>12.2f}{r['face_rate']:>8.1f}{r['dropped']:>6}")
+    print("="*78)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+생체신호 배치 MQTT 메시지
+전송 주기마다 심박수 / 스트레스 / SpO2를 <topic>/batch 메시지 하나로 보냄 (지표별 평균, 최소, 최대, 표준편차, 샘플 수)
+기존 지표별 토픽 (heart_rate / stress / spo2 / combined)이 필요한 소비자는
+로컬 재발행기 (BatchRepublisher)가 배치 메시지를 받아 기존 형식 그대로 다시 발행
+    python biometrics_batch.py --mqtt-topic healthcare/biometrics
+    python biometrics_batch.py --self-check   # 브로커 없이 메시지 크기 / 변환 확인
+배치 메시지의 코덱은 토픽 접미사로 판별 (<topic>/batch/<코덱>, mqtt_codecs), 재발행 메시지는 기존처럼 JSON
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+from mqtt_codecs import CodecRegistry
+
+# MQTT 라이브러리
+try:
+    import paho.mqtt.client as mqtt
+    MQTT_AVAILABLE = True
+except ImportError:
+    MQTT_AVAILABLE = False
+
+# 배치 메시지 토픽 (<topic_prefix>/batch)
+BATCH_TOPIC = "batch"
+
+# 배치 키 -> (기존 메시지 type, 기존 토픽, 단위)
+METRICS = {
+    "heart_rate": ("heart_rate", "heart_rate", "BPM"),
+    "stress_index": ("stress_index", "stress", "%"),
+    "spo2": ("spo2", "spo2", "%"),
+}
+
+
+def summarize(values):
+    """샘플 배열 -> 평균 / 최소 / 최대 / 표준편차 / 샘플 수 (비어 있으면 None)"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return None
+    return {
+        "mean": round(float(values.mean()), 1),
+        "min": round(float(values.min()), 1),
+        "max": round(float(values.max()), 1),
+        "std": round(float(values.std()), 2),
+        "n": int(len(values))
+    }
+
+
+def build_batch_message(samples, device_id, gpio_lib="none", interval=5.0):
+    """
+    배치 메시지 생성
+    
+    Args:
+        samples: 배치 키 (METRICS) -> 전송 주기 동안의 샘플 배열
+        device_id: 장치 ID (메시지당 한 번만 포함)
+        gpio_lib: GPIO 라이브러리 이름
+        interval: 전송 주기 (초)
+    
+    Returns:
+        dict - 샘플이 없는 지표는 metrics에서 빠짐
+    """
+    metrics = {}
+    for key, values in samples.items():
+        summary = summarize(values)
+        if summary is not None:
+            summary["unit"] = METRICS[key][2]
+            metrics[key] = summary
+    return {
+        "type": "biometrics_batch",
+        "timestamp": datetime.now().isoformat(),
+        "interval": interval,
+        "device_id": device_id,
+        "gpio_lib": gpio_lib,
+        "metrics": metrics
+    }
+
+
+def expand_batch_message(message):
+    """
+    배치 메시지 -> 기존 형식 메시지 목록 [(토픽 접미사, 메시지)]
+    기존 전송기와 같게 값이 있는 지표만 지표별 토픽으로, combined는 항상 (없는 값은 "-")
+    """
+    metrics = message.get("metrics", {})
+    common = {
+        "device_id": message.get("device_id"),
+        "gpio_lib": message.get("gpio_lib", "none")
+    }
+    expanded = []
+    for key, (sensor_type, topic, unit) in METRICS.items():
+        if key in metrics:
+            expanded.append((topic, {
+                "type": sensor_type,
+                "timestamp": message["timestamp"],
+                "data": metrics[key]["mean"],
+                "unit": unit,
+                **common
+            }))
+    
+    expanded.append(("combined", {
+        "type": "biometrics_combined",
+        "timestamp": message["timestamp"],
+        "data": {key: metrics[key]["mean"] if key in metrics else "-" for key in METRICS},
+        "units": {key: unit for key, (_, _, unit) in METRICS.items()},
+        **common
+    }))
+    return expanded
+
+
+class BatchRepublisher:
+    """<topic_prefix>/batch 를 구독해서 기존 지표별 토픽으로 다시 발행하는 호환 재발행기"""
+    
+    def __init__(self, broker_host="localhost", broker_port=1883, topic_prefix="healthcare/biometrics",
+                 client_id=None):
+        """
+        Args:
+            broker_host: MQTT 브로커 호스트 (보통 장치 옆의 로컬 브로커)
+            broker_port: MQTT 브로커 포트
+            topic_prefix: 배치 메시지 토픽 접두사 (기존 토픽도 같은 접두사 아래로 발행)
+            client_id: MQTT 클라이언트 ID
+        """
+        self.broker_host = broker_host
+        self.broker_port = broker_port
+        self.topic_prefix = topic_prefix
+        self.received = 0
+        self.republished = 0
+        self.codecs = CodecRegistry()
+        
+        self.client = mqtt.Client(client_id=client_id or f"batch_republisher_{int(time.time())}")
+        self.client.on_connect = self.on_connect
+        self.client.on_message = self.on_message
+    
+    def on_connect(self, client, userdata, flags, rc):
+        """MQTT 연결 콜백 (재연결 시에도 다시 구독)"""
+        if rc == 0:
+            # <topic>/batch/# 는 <topic>/batch 자체와 코덱 접미사 토픽을 모두 포함
+            client.subscribe(f"{self.topic_prefix}/{BATCH_TOPIC}/#")
+            print(f"✓ Republishing {self.topic_prefix}/{BATCH_TOPIC} on {self.broker_host}:{self.broker_port}")
+        else:
+            print(f"✗ MQTT Connection failed with code {rc}")
+    
+    def on_message(self, client, userdata, msg):
+        """배치 메시지 수신 -> 기존 토픽으로 발행"""
+        try:
+            _, message = self.codecs.decode(msg.topic, msg.payload)
+        except (ValueError, RuntimeError):
+            print(f"✗ Invalid batch message on {msg.topic}")
+            return
+        self.received += 1
+        for suffix, legacy in expand_batch_message(message):
+            client.publish(f"{self.topic_prefix}/{suffix}", json.dumps(legacy))
+            self.republished += 1
+    
+    def run(self):
+        """연결 후 종료될 때까지 실행 (Ctrl+C로 종료)"""
+        self.client.connect(self.broker_host, self.broker_port, 60)
+        try:
+            self.client.loop_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.client.disconnect()
+            print(f"👋 Republisher stopped: {self.received} batches -> {self.republished} messages")
+
+
+def self_check():
+    """브로커 없이 배치 / 기존 형식 메시지 수와 크기 비교 + 변환 확인"""
+    rng = np.random.default_rng(0)
+    samples = {
+        "heart_rate": rng.normal(72, 3, 150),
+        "stress_index": rng.normal(35, 5, 150),
+        "spo2": rng.normal(97, 0.5, 150)
+    }
+    batch = build_batch_message(samples, "ai_camera_1700000000", "gpiod")
+    legacy = expand_batch_message(batch)
+    
+    batch_bytes = len(json.dumps(batch))
+    legacy_bytes = sum(len(json.dumps(message)) for _, message in legacy)
+    print(f"📦 batch:  1 message, {batch_bytes} bytes")
+    print(f"📤 legacy: {len(legacy)} messages, {legacy_bytes} bytes")
+    print(f"   message rate {len(legacy)}x lower | payload {legacy_bytes / batch_bytes:.1f}x smaller")
+    
+    for key, values in samples.items():
+        assert batch["metrics"][key]["mean"] == round(float(np.mean(values)), 1)
+        assert batch["metrics"][key]["n"] == len(values)
+    partial = expand_batch_message(build_batch_message({"heart_rate": samples["heart_rate"], "spo2": []},
+                                                       "ai_camera_1700000000"))
+    assert [suffix for suffix, _ in partial] == ["heart_rate", "combined"]
+    assert partial[-1][1]["data"]["spo2"] == "-"
+    print("✓ self-check passed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Republish batched biometrics as the legacy per-metric topics')
+    parser.add_argument('--mqtt-broker', default='localhost', help='MQTT broker address (default: localhost)')
+    parser.add_argument('--mqtt-port', type=int, default=1883, help='MQTT broker port (default: 1883)')
+    parser.add_argument('--mqtt-topic', default='healthcare/biometrics',
+                        help='MQTT topic prefix (default: healthcare/biometrics)')
+    parser.add_argument('--self-check', action='store_true',
+                        help='Compare batch vs legacy message sizes and verify the conversion (no broker)')
+    args = parser.parse_args()
+    
+    if args.self_check:
+        self_check()
+    elif not MQTT_AVAILABLE:
+        print("✗ paho-mqtt is not installed")
+        raise SystemExit(1)
+    else:
+        BatchRepublisher(args.mqtt_broker, args.mqtt_port, args.mqtt_topic).run()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+얼굴 감지 전략
+매 프레임 전체 detectMultiScale 대신
+- DetectThenTrack: N 프레임마다 감지하고 그 사이에는 가벼운 추적으로 bbox 이동
+- SearchWindowDetector: 직전 얼굴 주변 탐색 창에서만 재감지
+"""
+
+import cv2
+
+
+class DetectThenTrack:
+    """감지 후 추적 전략
+    
+    redetect_interval 프레임마다 (또는 추적 신뢰도가 min_confidence 아래로 떨어지면)
+    전체 감지를 실행하고, 그 사이에는 직전 bbox 주변 탐색 창에서 축소 템플릿 매칭으로
+    bbox를 이동시킨다. bbox는 항상 main 프레임 좌표이고, 매칭은 감지용 그레이
+    (lores 가능) 위에서 scale 비율로 변환해 수행한다.
+    """
+    
+    def __init__(self, redetect_interval=10, min_confidence=0.6,
+                 search_margin=0.5, template_width=32):
+        """
+        Args:
+            redetect_interval: 전체 감지 주기 (프레임)
+            min_confidence: 이 값보다 낮은 매칭 점수(TM_CCOEFF_NORMED)면 즉시 재감지
+            search_margin: 탐색 창 여유 (bbox 크기 대비 비율)
+            template_width: 매칭용 템플릿 폭 (px) - 얼굴 크기와 무관하게 비용 고정
+        """
+        self.redetect_interval = max(1, redetect_interval)
+        self.min_confidence = min_confidence
+        self.search_margin = search_margin
+        self.template_width = template_width
+        
+        # 추적 상태
+        self.bbox = None
+        self.template = None
+        self.track_scale = 1.0
+        self.frames_since_detect = 0
+        self.confidence = 0.0
+        
+        # 통계
+        self.detect_count = 0
+        self.track_count = 0
+        self.lost_count = 0  # 신뢰도 저하로 인한 재감지 횟수
+    
+    def reset(self):
+        """추적 상태 초기화 (다음 프레임은 전체 감지)"""
+        self.bbox = None
+        self.template = None
+        self.frames_since_detect = 0
+        self.confidence = 0.0
+    
+    def update(self, gray, detect_fn, scale=(1.0, 1.0)):
+        """
+        한 프레임 처리
+        
+        Args:
+            gray: 감지용 그레이 이미지 (main 또는 lores)
+            detect_fn: 전체 감지 함수 () -> main 좌표 bbox 또는 None
+            scale: (main 폭 / gray 폭, main 높이 / gray 높이)
+        
+        Returns:
+            main 좌표 (x, y, w, h) 또는 None
+        """
+        if self.bbox is None or self.frames_since_detect >= self.redetect_interval:
+            return self._detect(gray, detect_fn, scale)
+        
+        bbox, confidence = self._track(gray, scale)
+        self.confidence = confidence
+        if bbox is None or confidence < self.min_confidence:
+            self.lost_count += 1
+            return self._detect(gray, detect_fn, scale)
+        
+        self.bbox = bbox
+        self.frames_since_detect += 1
+        self.track_count += 1
+        return bbox
+    
+    def _detect(self, gray, detect_fn, scale):
+        """전체 감지 후 템플릿 갱신"""
+        self.detect_count += 1
+        self.frames_since_detect = 0
+        
+        bbox = detect_fn()
+        if bbox is None:
+            self.reset()
+            return None
+        
+        bbox = tuple(int(v) for v in bbox)
+        self.template = self._make_template(gray, bbox, scale)
+        self.bbox = bbox if self.template is not None else None
+        self.confidence = 1.0 if self.template is not None else 0.0
+        return bbox
+    
+    def _to_gray_coords(self, bbox, scale):
+        """main 좌표 bbox -> 그레이 좌표"""
+        x, y, w, h = bbox
+        sx, sy = scale
+        return int(x / sx), int(y / sy), max(1, int(w / sx)), max(1, int(h / sy))
+    
+    def _make_template(self, gray, bbox, scale):
+        """감지된 얼굴 영역을 고정 폭으로 축소해 템플릿 생성"""
+        gx, gy, gw, gh = self._to_gray_coords(bbox, scale)
+        face = gray[gy:gy + gh, gx:gx + gw]
+        if face.shape[0] < 4 or face.shape[1] < 4:
+            return None
+        
+        self.track_scale = min(1.0, self.template_width / face.shape[1])
+        return cv2.resize(face, None, fx=self.track_scale, fy=self.track_scale,
+                          interpolation=cv2.INTER_AREA)
+    
+    def _track(self, gray, scale):
+        """직전 bbox 주변 탐색 창에서 템플릿 매칭"""
+        if self.template is None:
+            return None, 0.0
+        
+        gx, gy, gw, gh = self._to_gray_coords(self.bbox, scale)
+        margin_x = int(gw * self.search_margin)
+        margin_y = int(gh * self.search_margin)
+        
+        x0 = max(0, gx - margin_x)
+        y0 = max(0, gy - margin_y)
+        x1 = min(gray.shape[1], gx + gw + margin_x)
+        y1 = min(gray.shape[0], gy + gh + margin_y)
+        
+        window = cv2.resize(gray[y0:y1, x0:x1], None, fx=self.track_scale, fy=self.track_scale,
+                            interpolation=cv2.INTER_AREA)
+        th, tw = self.template.shape[:2]
+        if window.shape[0] < th or window.shape[1] < tw:
+            return None, 0.0
+        
+        result = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        
+        # 탐색 창 좌표 -> 그레이 좌표 -> main 좌표 (크기는 감지 시점 그대로 유지)
+        sx, sy = scale
+        new_x = (x0 + max_loc[0] / self.track_scale) * sx
+        new_y = (y0 + max_loc[1] / self.track_scale) * sy
+        _, _, w, h = self.bbox
+        return (int(new_x), int(new_y), w, h), float(max_val)
+    
+    def get_stats(self):
+        """감지/추적 통계 반환"""
+        total = self.detect_count + self.track_count
+        return {
+            'detections': self.detect_count,
+            'tracked': self.track_count,
+            'lost': self.lost_count,
+            'detect_ratio': self.detect_count / total if total else 0.0,
+            'confidence': self.confidence
+        }
+
+
+class SearchWindowDetector:
+    """직전 얼굴 주변 탐색 창 재감지
+    
+    얼굴을 찾은 다음 프레임부터는 직전 얼굴 중심(서보 모드에서는 calculate_error의
+    스무딩된 last_face_center) 주변을 확장한 crop에서만 감지기 (face_detectors.FaceDetector)를 실행하고,
+    얼굴 크기도 직전 bbox 크기 근처로 제한한다 (Haar는 minSize/maxSize로 스케일 단계 자체를 줄임).
+    max_misses번 연속으로 놓치면 전체 프레임 스캔으로 돌아간다. 반환 좌표는 항상 main 프레임 기준.
+    """
+    
+    def __init__(self, detector, expand=0.75, size_tolerance=0.3, max_misses=3):
+        """
+        Args:
+            detector: face_detectors.FaceDetector (create_detector 결과)
+            expand: 탐색 창 여유 (bbox 크기 대비, 양쪽 각각)
+            size_tolerance: 직전 얼굴 크기 대비 허용 크기 변화율
+            max_misses: 전체 스캔으로 돌아가기 전 허용하는 연속 실패 횟수
+        """
+        self.detector = detector
+        self.expand = expand
+        self.size_tolerance = size_tolerance
+        self.max_misses = max_misses
+        
+        self.last_bbox = None
+        self.misses = 0
+        
+        # 통계
+        self.window_scans = 0
+        self.full_scans = 0
+    
+    def reset(self):
+        """다음 프레임은 전체 스캔"""
+        self.last_bbox = None
+        self.misses = 0
+    
+    def detect(self, gray, center=None, scale=(1.0, 1.0), detect_fn=None):
+        """
+        얼굴 감지
+        
+        Args:
+            gray: 감지용 그레이 이미지 (main 또는 lores)
+            center: 탐색 창 중심 (main 좌표), None이면 직전 bbox 중심
+            scale: (main 폭 / gray 폭, main 높이 / gray 높이)
+            detect_fn: 전체 스캔 함수 () -> main 좌표 bbox 또는 None (예: 감지 프로세스 풀),
+                       None이면 detector로 전체 프레임 감지
+        
+        Returns:
+            main 좌표 (x, y, w, h) 또는 None
+        """
+        if self.last_bbox is not None and self.misses < self.max_misses:
+            bbox = self._detect_window(gray, center, scale)
+            if bbox is None:
+                self.misses += 1
+                return None
+        else:
+            bbox = self._detect_full(gray, scale, detect_fn)
+            if bbox is None:
+                self.reset()
+                return None
+        
+        self.last_bbox = bbox
+        self.misses = 0
+        return bbox
+    
+    def _detect_full(self, gray, scale, detect_fn=None):
+        """전체 프레임 스캔"""
+        self.full_scans += 1
+        if detect_fn is not None:
+            return detect_fn()
+        return self.detector.detect(gray, scale)
+    
+    def _detect_window(self, gray, center, scale):
+        """직전 얼굴 주변 crop만 스캔"""
+        self.window_scans += 1
+        sx, sy = scale
+        x, y, w, h = self.last_bbox
+        if center is None:
+            center = (x + w / 2, y + h / 2)
+        cx, cy = center
+        
+        # 탐색 창 (그레이 좌표)
+        half_w = w * (0.5 + self.expand)
+        half_h = h * (0.5 + self.expand)
+        x0 = max(0, int((cx - half_w) / sx))
+        y0 = max(0, int((cy - half_h) / sy))
+        x1 = min(gray.shape[1], int((cx + half_w) / sx))
+        y1 = min(gray.shape[0], int((cy + half_h) / sy))
+        
+        # 직전 얼굴 크기 근처만 검색 (스케일 단계 수 감소)
+        min_w = int(w * (1 - self.size_tolerance) / sx)
+        min_h = int(h * (1 - self.size_tolerance) / sy)
+        max_w = int(w * (1 + self.size_tolerance) / sx)
+        max_h = int(h * (1 + self.size_tolerance) / sy)
+        if x1 - x0 < min_w or y1 - y0 < min_h:
+            return None
+        
+        return self.detector.detect_window(
+            gray, (x0, y0, x1, y1), scale, min_size=(min_w, min_h), max_size=(max_w, max_h)
+        )
+    
+    def get_stats(self):
+        """스캔 통계 반환"""
+        total = self.window_scans + self.full_scans
+        return {
+            'window_scans': self.window_scans,
+            'full_scans': self.full_scans,
+            'window_ratio': self.window_scans / total if total else 0.0,
+            'misses': self.misses
+        }
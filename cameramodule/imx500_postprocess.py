@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+IMX500 온센서 추론 후처리
+요청 메타데이터의 출력 텐서 -> bbox 디코딩 -> 점수 임계값 -> NMS -> 프레임 좌표 변환
+SSD 계열 출력 (boxes [N,4], scores [N], classes [N]) 기준
+    python imx500_postprocess.py                       # 합성 픽스처 + fixtures/imx500/*.npz 검증
+    python imx500_postprocess.py --fixture rec.npz     # 녹화 픽스처 하나 검증 (저장된 기대 박스와 비교)
+    python imx500_postprocess.py --record rec.npz --model network.rpk --classes 0   # IMX500 카메라에서 녹화
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+# IMX500 장치 (picamera2.devices) - 없으면 녹화된 텐서 픽스처로만 동작
+try:
+    from picamera2.devices import IMX500
+    IMX500_AVAILABLE = True
+except ImportError:
+    IMX500_AVAILABLE = False
+
+
+def split_outputs(flat_tensor, output_shapes):
+    """평면 CnnOutputTensor를 출력별 배열로 분리 (IMX500 객체 없이 디코딩할 때)"""
+    flat_tensor = np.asarray(flat_tensor, dtype=np.float32)
+    outputs = []
+    offset = 0
+    for shape in output_shapes:
+        size = int(np.prod(shape))
+        outputs.append(flat_tensor[offset:offset + size].reshape(shape))
+        offset += size
+    return outputs
+
+
+def nms(boxes, scores, iou_threshold=0.45):
+    """Non-Maximum Suppression
+    
+    Args:
+        boxes: [N, 4] (y0, x0, y1, x1)
+        scores: [N]
+        iou_threshold: 이 값보다 많이 겹치면 낮은 점수 박스 제거
+    
+    Returns:
+        남길 인덱스 (점수 내림차순)
+    """
+    y0, x0, y1, x1 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(0, y1 - y0) * np.maximum(0, x1 - x0)
+    order = np.argsort(scores)[::-1]
+    
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        
+        # 나머지 박스와의 IoU
+        inter_h = np.maximum(0, np.minimum(y1[i], y1[order[1:]]) - np.maximum(y0[i], y0[order[1:]]))
+        inter_w = np.maximum(0, np.minimum(x1[i], x1[order[1:]]) - np.maximum(x0[i], x0[order[1:]]))
+        inter = inter_h * inter_w
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        
+        order = order[1:][iou <= iou_threshold]
+    
+    return np.array(keep, dtype=int)
+
+
+def decode_detections(outputs, input_size, score_threshold=0.5, iou_threshold=0.45,
+                      class_ids=None, bbox_normalization=False, bbox_order="yx"):
+    """
+    SSD 출력 디코딩
+    
+    Args:
+        outputs: [boxes [N,4], scores [N], classes [N]] (배치 차원 있으면 제거)
+        input_size: 네트워크 입력 크기 (w, h)
+        score_threshold: 최소 점수
+        iou_threshold: NMS IoU 임계값
+        class_ids: 남길 클래스 id 목록 (None이면 전체)
+        bbox_normalization: True면 박스가 입력 픽셀 좌표 -> 0~1로 정규화
+        bbox_order: "yx" (y0, x0, y1, x1) 또는 "xy" (x0, y0, x1, y1)
+    
+    Returns:
+        (boxes [K,4] 정규화 (y0, x0, y1, x1), scores [K]) - 점수 내림차순
+    """
+    boxes, scores, classes = (np.asarray(o, dtype=np.float32) for o in outputs[:3])
+    if boxes.ndim == 3:
+        boxes, scores, classes = boxes[0], scores[0], classes[0]
+    
+    if bbox_order == "xy":
+        boxes = boxes[:, [1, 0, 3, 2]]
+    if bbox_normalization:
+        input_w, input_h = input_size
+        boxes = boxes / np.array([input_h, input_w, input_h, input_w], dtype=np.float32)
+    
+    # 점수 / 클래스 필터
+    mask = scores >= score_threshold
+    if class_ids is not None:
+        mask &= np.isin(classes.astype(int), list(class_ids))
+    boxes = np.clip(boxes[mask], 0.0, 1.0)
+    scores = scores[mask]
+    
+    if len(scores) == 0:
+        return np.zeros((0, 4), dtype=np.float32), scores
+    
+    keep = nms(boxes, scores, iou_threshold)
+    return boxes[keep], scores[keep]
+
+
+def to_frame_coords(box, frame_size):
+    """정규화 박스 (y0, x0, y1, x1) -> 프레임 좌표 (x, y, w, h)
+    
+    네트워크 입력이 프레임 전체 시야(ScalerCrop = 전체 센서)를 본다고 가정.
+    실제 카메라에서는 IMX500.convert_inference_coords를 사용한다.
+    """
+    y0, x0, y1, x1 = box
+    frame_w, frame_h = frame_size
+    return (int(x0 * frame_w), int(y0 * frame_h),
+            int((x1 - x0) * frame_w), int((y1 - y0) * frame_h))
+
+
+class IMX500Detector:
+    """IMX500 온센서 얼굴 감지 결과 디코더
+    
+    IMX500 객체는 Picamera2보다 먼저 생성해야 하므로 (네트워크 펌웨어 로드)
+    카메라는 camera_num으로 열어야 한다. model_path 없이 input_size/output_shapes만
+    주면 녹화된 텐서 픽스처 디코딩용으로 동작한다.
+    """
+    
+    def __init__(self, model_path=None, score_threshold=0.5, iou_threshold=0.45,
+                 class_ids=None, input_size=None, output_shapes=None,
+                 bbox_normalization=None, bbox_order=None):
+        self.score_threshold = score_threshold
+        self.iou_threshold = iou_threshold
+        self.class_ids = class_ids
+        self.output_shapes = output_shapes
+        self.imx500 = None
+        
+        intrinsics = None
+        if model_path:
+            if not IMX500_AVAILABLE:
+                raise RuntimeError("picamera2.devices.IMX500 not available")
+            self.imx500 = IMX500(model_path)
+            intrinsics = getattr(self.imx500, 'network_intrinsics', None)
+            input_size = self.imx500.get_input_size()
+        
+        if input_size is None:
+            raise ValueError("input_size is required without an IMX500 model")
+        self.input_size = tuple(input_size)
+        
+        # 네트워크 intrinsics 값 우선, 없으면 SSD 기본값 (정규화된 yx 박스)
+        if bbox_normalization is None:
+            bbox_normalization = bool(getattr(intrinsics, 'bbox_normalization', False))
+        if bbox_order is None:
+            bbox_order = getattr(intrinsics, 'bbox_order', None) or "yx"
+        self.bbox_normalization = bbox_normalization
+        self.bbox_order = bbox_order
+    
+    @property
+    def camera_num(self):
+        """Picamera2(camera_num)에 넘길 카메라 번호"""
+        return self.imx500.camera_num if self.imx500 else 0
+    
+    def get_outputs(self, metadata):
+        """메타데이터에서 출력 텐서 추출 (없으면 None - 아직 추론 결과 없음)"""
+        if not metadata:
+            return None
+        if self.imx500 is not None:
+            return self.imx500.get_outputs(metadata, add_batch=True)
+        if 'CnnOutputTensor' in metadata and self.output_shapes:
+            return split_outputs(metadata['CnnOutputTensor'], self.output_shapes)
+        return None
+    
+    def detect(self, metadata, frame_size, picam2=None):
+        """
+        한 요청의 메타데이터에서 얼굴 감지
+        
+        Args:
+            metadata: 같은 요청의 메타데이터
+            frame_size: main 스트림 크기 (w, h)
+            picam2: Picamera2 (있으면 ScalerCrop 반영 좌표 변환 사용)
+        
+        Returns:
+            [(x, y, w, h, score), ...] 점수 내림차순, 텐서가 없으면 None
+        """
+        outputs = self.get_outputs(metadata)
+        if outputs is None:
+            return None
+        
+        boxes, scores = decode_detections(
+            outputs, self.input_size,
+            score_threshold=self.score_threshold,
+            iou_threshold=self.iou_threshold,
+            class_ids=self.class_ids,
+            bbox_normalization=self.bbox_normalization,
+            bbox_order=self.bbox_order
+        )
+        
+        faces = []
+        for box, score in zip(boxes, scores):
+            if self.imx500 is not None and picam2 is not None:
+                x, y, w, h = self.imx500.convert_inference_coords(tuple(box), metadata, picam2)
+            else:
+                x, y, w, h = to_frame_coords(box, frame_size)
+            faces.append((int(x), int(y), int(w), int(h), float(score)))
+        return faces
+    
+    def record(self, metadata, path, frame_size):
+        """
+        현재 요청의 출력 텐서를 픽스처(.npz)로 저장
+        
+        디코딩 설정과 그 시점의 디코딩 결과 (전체 시야 좌표 변환)를 기대 박스로 함께 저장하므로
+        녹화 후 이미지와 비교해 박스가 맞는지 확인한 뒤 커밋하면 회귀 검증에 사용된다.
+        """
+        outputs = self.get_outputs(metadata)
+        if outputs is None:
+            return False
+        arrays = {f"output{i}": np.asarray(o) for i, o in enumerate(outputs)}
+        flat = np.concatenate([np.asarray(o, dtype=np.float32).ravel() for o in outputs])
+        replay = IMX500Detector(input_size=self.input_size, output_shapes=[a.shape for a in arrays.values()],
+                                score_threshold=self.score_threshold, iou_threshold=self.iou_threshold,
+                                class_ids=self.class_ids, bbox_normalization=self.bbox_normalization,
+                                bbox_order=self.bbox_order)
+        expected = replay.detect({'CnnOutputTensor': flat}, frame_size)
+        np.savez(path, input_size=np.array(self.input_size), frame_size=np.array(frame_size),
+                 score_threshold=self.score_threshold, iou_threshold=self.iou_threshold,
+                 bbox_normalization=self.bbox_normalization, bbox_order=self.bbox_order,
+                 class_ids=np.array(self.class_ids if self.class_ids is not None else [], dtype=int),
+                 expected=np.array(expected, dtype=np.float64).reshape(-1, 5), **arrays)
+        return True
+
+
+def load_fixture(path):
+    """record()로 저장한 픽스처 로드 -> (outputs, input_size)"""
+    data = np.load(path)
+    outputs = []
+    while f"output{len(outputs)}" in data:
+        outputs.append(data[f"output{len(outputs)}"])
+    return outputs, tuple(int(v) for v in data['input_size'])
+
+
+def check_fixture(path):
+    """녹화 픽스처를 저장된 설정으로 디코딩해서 저장된 기대 박스와 비교 (다르면 AssertionError)"""
+    outputs, input_size = load_fixture(path)
+    data = np.load(path)
+    if 'expected' not in data:
+        raise ValueError(f"{path}: no expected boxes (re-record with IMX500Detector.record)")
+    class_ids = [int(c) for c in data['class_ids']] or None
+    detector = IMX500Detector(input_size=input_size, output_shapes=[o.shape for o in outputs],
+                              score_threshold=float(data['score_threshold']),
+                              iou_threshold=float(data['iou_threshold']), class_ids=class_ids,
+                              bbox_normalization=bool(data['bbox_normalization']),
+                              bbox_order=str(data['bbox_order']))
+    flat = np.concatenate([o.ravel() for o in outputs])
+    frame_size = tuple(int(v) for v in data['frame_size'])
+    faces = detector.detect({'CnnOutputTensor': flat}, frame_size)
+    expected = data['expected']
+    
+    print(f"📦 Fixture {path}: {len(faces)} detections (expected {len(expected)})")
+    for x, y, w, h, score in faces:
+        print(f"   ({x}, {y}, {w}, {h}) score={score:.2f}")
+    assert len(faces) == len(expected), (path, faces, expected)
+    for face, want in zip(faces, expected):
+        assert face[:4] == tuple(int(v) for v in want[:4]), (path, face, want)
+        assert abs(face[4] - want[4]) < 1e-5, (path, face, want)
+    return faces
+
+
+def record_fixtures(model_path, path, count=1, score_threshold=0.5, interval=1.0, class_ids=None):
+    """IMX500 카메라에서 감지 결과가 있는 요청 count개를 픽스처로 녹화 (path, path_1, ...)"""
+    from picamera2 import Picamera2
+    
+    detector = IMX500Detector(model_path, score_threshold=score_threshold, class_ids=class_ids)
+    picam2 = Picamera2(detector.camera_num)
+    picam2.configure(picam2.create_preview_configuration(main={"size": (640, 480)}))
+    picam2.start()
+    try:
+        base, ext = os.path.splitext(path)
+        saved = 0
+        while saved < count:
+            metadata = picam2.capture_metadata()
+            faces = detector.detect(metadata, (640, 480))
+            if not faces:
+                continue
+            target = path if saved == 0 else f"{base}_{saved}{ext or '.npz'}"
+            detector.record(metadata, target, (640, 480))
+            print(f"💾 {target}: {len(faces)} detections")
+            saved += 1
+            time.sleep(interval)
+    finally:
+        picam2.stop()
+        picam2.close()
+
+
+# 녹화 픽스처 위치 (self_check가 모두 검증)
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'imx500')
+
+
+def _synthetic_fixture():
+    """SSD 출력 형식의 합성 픽스처 (평면 CnnOutputTensor + 출력 shape)"""
+    boxes = np.zeros((10, 4), dtype=np.float32)
+    scores = np.zeros(10, dtype=np.float32)
+    classes = np.zeros(10, dtype=np.float32)
+    
+    boxes[0] = [0.25, 0.40, 0.75, 0.60]  # 얼굴
+    scores[0] = 0.92
+    boxes[1] = [0.26, 0.41, 0.76, 0.61]  # 같은 얼굴 중복 (NMS로 제거)
+    scores[1] = 0.80
+    boxes[2] = [0.10, 0.05, 0.30, 0.20]  # 두 번째 얼굴
+    scores[2] = 0.55
+    boxes[3] = [0.50, 0.80, 0.70, 0.95]  # 낮은 점수 (임계값으로 제거)
+    scores[3] = 0.20
+    
+    flat = np.concatenate([boxes.ravel(), scores, classes])
+    return flat, [(10, 4), (10,), (10,)]
+
+
+def self_check(fixture=None):
+    """녹화 픽스처 (fixtures/imx500/*.npz 또는 지정 파일) + 합성 픽스처로 디코딩 검증"""
+    if fixture:
+        check_fixture(fixture)
+        print("✓ IMX500 fixture matches its expected boxes")
+        return True
+    
+    recorded = sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.npz')))
+    for path in recorded:
+        check_fixture(path)
+    print(f"✓ {len(recorded)} recorded IMX500 fixtures match their expected boxes")
+    
+    flat, shapes = _synthetic_fixture()
+    detector = IMX500Detector(input_size=(320, 320), output_shapes=shapes)
+    
+    # 텐서 없음 -> None (Haar 폴백 신호)
+    assert detector.detect({}, (640, 480)) is None
+    
+    faces = detector.detect({'CnnOutputTensor': flat.tolist()}, (640, 480))
+    assert len(faces) == 2, faces
+    assert faces[0][:4] == (256, 120, 128, 240), faces[0]
+    assert abs(faces[0][4] - 0.92) < 1e-6
+    assert faces[1][:4] == (32, 48, 96, 96), faces[1]
+    
+    # 픽셀 좌표 + xy 순서 출력도 같은 결과
+    boxes, scores, classes = split_outputs(flat, shapes)
+    pixel_xy = boxes[:, [1, 0, 3, 2]] * 320
+    detector_px = IMX500Detector(input_size=(320, 320), output_shapes=shapes,
+                                 bbox_normalization=True, bbox_order="xy")
+    flat_px = np.concatenate([pixel_xy.ravel(), scores, classes])
+    assert detector_px.detect({'CnnOutputTensor': flat_px}, (640, 480)) == faces
+    
+    # 클래스 필터
+    detector_cls = IMX500Detector(input_size=(320, 320), output_shapes=shapes, class_ids=[1])
+    assert detector_cls.detect({'CnnOutputTensor': flat}, (640, 480)) == []
+    
+    print("✓ IMX500 post-processing self-check passed")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='IMX500 tensor post-processing self-check')
+    parser.add_argument('--fixture', default=None, help='Recorded tensor fixture (.npz from IMX500Detector.record)')
+    parser.add_argument('--record', metavar='PATH', default=None,
+                        help='Record tensor fixtures with detections from the IMX500 camera (needs --model)')
+    parser.add_argument('--model', default=None, help='IMX500 network (.rpk) for --record')
+    parser.add_argument('--count', type=int, default=1, help='Number of fixtures to record (default: 1)')
+    parser.add_argument('--threshold', type=float, default=0.5, help='Minimum detection score (default: 0.5)')
+    parser.add_argument('--classes', metavar='ID[,ID...]', default=None,
+                        help='Class ids treated as faces for --record (required, e.g. 0 for a face-only network)')
+    args = parser.parse_args()
+    if args.record:
+        if not args.model or not args.classes:
+            parser.error('--record needs --model and --classes')
+        record_fixtures(args.model, args.record, args.count, args.threshold,
+                        class_ids=[int(v) for v in args.classes.split(',')])
+    else:
+        self_check(args.fixture)
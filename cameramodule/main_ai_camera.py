@@ -42,13 +42,35 @@ from spo2_estimator import SpO2Estimator
 class AICamera:
     """Picamera2를 OpenCV VideoCapture 인터페이스로 래핑"""
     
-    def __init__(self, width=640, height=480, fps=30):
+    # 캡처 포맷별 Picamera2 main 스트림 포맷
+    # libcamera의 RGB888은 메모리상 [B, G, R] 순서라 OpenCV BGR로 바로 사용 가능
+    #   rgb    - 기존 방식 (RGB888 + 프레임마다 cvtColor)
+    #   bgr    - 변환 없이 버퍼 그대로 사용
+    #   yuv420 - I420 버퍼, 감지는 Y 평면(그레이), 컬러는 ROI만 변환
+    CAPTURE_FORMATS = {
+        "rgb": "RGB888",
+        "bgr": "RGB888",
+        "yuv420": "YUV420"
+    }
+    
+    # 생체신호 ROI를 모두 덮는 얼굴 내 영역 (x, y, w, h 비율)
+    # rPPG 이마(0.25~0.75, 0.15~0.35) + SpO2 이마(0.2~0.8, 0.05~0.30)
+    BIOMETRIC_REGION = (0.2, 0.05, 0.6, 0.30)
+    
+    def __init__(self, width=640, height=480, fps=30, capture_format="rgb"):
+        if capture_format not in self.CAPTURE_FORMATS:
+            raise ValueError(f"Unsupported capture format: {capture_format}")
+        
         self.width = width
         self.height = height
         self.fps = fps
+        self.capture_format = capture_format
         self.picam2 = None
         self.started = False
         
+        # yuv420 모드에서 ROI만 변환해 채우는 BGR 캔버스
+        self.roi_canvas = None
+        
     def start(self):
         """카메라 시작"""
         try:
@@ -58,7 +80,7 @@ class AICamera:
             config = self.picam2.create_preview_configuration(
                 main={
                     "size": (self.width, self.height),
-                    "format": "RGB888"
+                    "format": self.CAPTURE_FORMATS[self.capture_format]
                 },
                 controls={
                     "FrameRate": self.fps,
@@ -73,7 +95,7 @@ class AICamera:
             
             # 카메라 안정화 대기
             time.sleep(2)
-            print(f"AI Camera started: {self.width}x{self.height} @ {self.fps}fps")
+            print(f"AI Camera started: {self.width}x{self.height} @ {self.fps}fps ({self.capture_format})")
             return True
             
         except Exception as e:
@@ -87,12 +109,70 @@ class AICamera:
             
         try:
             frame = self.picam2.capture_array()
-            # RGB를 BGR로 변환 (OpenCV 호환성)
-            frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-            return True, frame_bgr
+            return True, self._convert(frame)
         except:
             return False, None
     
+    def _convert(self, frame):
+        """캡처 버퍼 정리 (rgb 모드만 전체 프레임 변환)"""
+        if self.capture_format == "rgb":
+            # RGB를 BGR로 변환 (기존 방식)
+            return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        return frame
+    
+    def gray(self, frame):
+        """감지용 그레이 이미지 (yuv420 모드는 Y 평면 뷰, 복사 없음)"""
+        if self.capture_format == "yuv420":
+            return frame[:self.height, :self.width]
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    
+    def to_bgr(self, frame):
+        """화면 표시용 전체 BGR 프레임"""
+        if self.capture_format == "yuv420":
+            return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+        return frame
+    
+    def roi_bgr(self, frame, face_bbox):
+        """생체신호용 BGR 프레임
+        
+        yuv420 모드에서는 BIOMETRIC_REGION만 변환해 전체 크기 캔버스에 채운다.
+        좌표계는 그대로라 rPPG/SpO2 ROI 계산을 바꿀 필요가 없다.
+        """
+        if self.capture_format != "yuv420":
+            return frame
+        
+        if self.roi_canvas is None:
+            self.roi_canvas = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        if face_bbox is None:
+            return self.roi_canvas
+        
+        x, y, w, h = face_bbox
+        fx, fy, fw, fh = self.BIOMETRIC_REGION
+        # I420 크로마가 2x2 단위라 짝수 좌표로 정렬 (반올림 여유 2px)
+        x0 = max(0, (int(x + w * fx) - 2) & ~1)
+        y0 = max(0, (int(y + h * fy) - 2) & ~1)
+        x1 = min(self.width, (int(x + w * (fx + fw)) + 3) & ~1)
+        y1 = min(self.height, (int(y + h * (fy + fh)) + 3) & ~1)
+        if x1 <= x0 or y1 <= y0:
+            return self.roi_canvas
+        
+        # I420 평면 뷰 (Y: HxW, U/V: H/2 x W/2)
+        H, W = self.height, self.width
+        y_plane = frame[:H]
+        u_plane = frame[H:H + H // 4].reshape(H // 2, W // 2)
+        v_plane = frame[H + H // 4:H + H // 2].reshape(H // 2, W // 2)
+        
+        # ROI 부분만 작은 I420 버퍼로 모아서 변환
+        rh, rw = y1 - y0, x1 - x0
+        sub = np.empty(rh * rw * 3 // 2, dtype=np.uint8)
+        sub[:rh * rw] = y_plane[y0:y1, x0:x1].ravel()
+        sub[rh * rw:rh * rw * 5 // 4] = u_plane[y0 // 2:y1 // 2, x0 // 2:x1 // 2].ravel()
+        sub[rh * rw * 5 // 4:] = v_plane[y0 // 2:y1 // 2, x0 // 2:x1 // 2].ravel()
+        self.roi_canvas[y0:y1, x0:x1] = cv2.cvtColor(
+            sub.reshape(rh * 3 // 2, rw), cv2.COLOR_YUV2BGR_I420
+        )
+        return self.roi_canvas
+    
     def release(self):
         """카메라 해제"""
         if self.picam2 and self.started:
@@ -117,9 +197,9 @@ class AICamera:
 class FaceTrackerWithAI(FaceTracker):
     """AI 카메라를 사용한 얼굴 트래킹 + 생체신호 측정"""
     
-    def __init__(self):
+    def __init__(self, capture_format="rgb"):
         # AI 카메라로 초기화
-        self.cap = AICamera(width=640, height=480, fps=30)
+        self.cap = AICamera(width=640, height=480, fps=30, capture_format=capture_format)
         if not self.cap.start():
             print("Failed to start AI Camera")
             sys.exit(1)
@@ -195,8 +275,8 @@ class FaceTrackerWithAI(FaceTracker):
         print("'a' - Toggle AI enhancement")
         print("=====================================\n")
     
-    def detect_face(self, frame):
-        """얼굴 감지 (AI 향상 옵션)"""
+    def detect_face(self, frame, gray=None):
+        """얼굴 감지 (AI 향상 옵션, gray가 주어지면 변환 생략)"""
         # AI 카메라 메타데이터 확인
         if self.ai_enhanced and hasattr(self.cap, 'get_metadata'):
             metadata = self.cap.get_metadata()
@@ -211,7 +291,8 @@ class FaceTrackerWithAI(FaceTracker):
                     return (int(x), int(y), int(w), int(h))
         
         # 기본 Haar Cascade 감지
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if gray is None:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         faces = self.face_cascade.detectMultiScale(
             gray, scaleFactor=1.1, minNeighbors=5, minSize=(80, 80)
         )
@@ -425,19 +506,23 @@ class FaceTrackerWithAI(FaceTracker):
                     fps = 1.0 / (fps_time_now - fps_time)
                 fps_time = fps_time_now
                 
-                # 얼굴 감지
-                face_bbox = self.detect_face(frame)
+                # 얼굴 감지 (yuv420 모드는 Y 평면 그대로)
+                gray = self.cap.gray(frame)
+                face_bbox = self.detect_face(frame, gray)
                 
                 if face_bbox is not None:
                     no_face_counter = 0
                     
+                    # 생체신호용 BGR (yuv420 모드는 ROI만 변환)
+                    bio_frame = self.cap.roi_bgr(frame, face_bbox)
+                    
                     # 1. 얼굴 트래킹
-                    error_x, error_y = self.calculate_error(face_bbox, frame.shape)
+                    error_x, error_y = self.calculate_error(face_bbox, gray.shape)
                     self.update_servo_position(error_x, error_y)
                     
                     # 2. rPPG 처리
                     if self.rppg_enabled:
-                        self.rppg.process_frame(frame, face_bbox)
+                        self.rppg.process_frame(bio_frame, face_bbox)
                         hr, _ = self.rppg.get_heart_rate()
                         if hr > 0 and 40 < hr < 180:
                             self.hr_buffer.append(hr)
@@ -446,7 +531,7 @@ class FaceTrackerWithAI(FaceTracker):
                     
                     # 3. SpO2 처리
                     if self.spo2_enabled:
-                        self.spo2_estimator.process_frame(frame, face_bbox)
+                        self.spo2_estimator.process_frame(bio_frame, face_bbox)
                         spo2_data = self.spo2_estimator.get_spo2_data()
                         if spo2_data['spo2'] > 0 and 85 <= spo2_data['spo2'] <= 100:
                             self.spo2_buffer.append(spo2_data['spo2'])
@@ -473,7 +558,8 @@ class FaceTrackerWithAI(FaceTracker):
                     if auto_search_enabled and no_face_counter > 30:
                         self.auto_search()
                 
-                # 화면 표시
+                # 화면 표시 (yuv420 모드는 여기서만 전체 변환)
+                frame = self.cap.to_bgr(frame)
                 frame = self.draw_overlay(frame, face_bbox)
                 
                 if not self.debug_mode:
@@ -593,12 +679,15 @@ if __name__ == "__main__":
     parser.add_argument('--width', type=int, default=640, help='Camera width')
     parser.add_argument('--height', type=int, default=480, help='Camera height')
     parser.add_argument('--fps', type=int, default=30, help='Camera FPS')
+    parser.add_argument('--capture-format', choices=['rgb', 'bgr', 'yuv420'], default='rgb',
+                       help='Camera buffer format: rgb (convert every frame), bgr (native), '
+                            'yuv420 (detect on Y plane, convert only the biometrics ROI)')
     
     args = parser.parse_args()
     
     try:
         # 메인 시스템 실행
-        tracker = FaceTrackerWithAI()
+        tracker = FaceTrackerWithAI(capture_format=args.capture_format)
         tracker.run()
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,98 @@
+import time
+
+import numpy as np
+
+class RingBuffer:
+    """고정 크기 numpy 링 버퍼 (deque(maxlen) 대체)
+    
+    각 샘플을 두 위치 (i, i + capacity)에 저장해서 최근 N개를 복사 없이
+    연속 배열(뷰)로 반환한다. 반환된 뷰는 다음 append 전까지만 유효.
+    timestamps=True면 같은 방식의 시각 열을 함께 저장한다.
+    """
+    
+    def __init__(self, capacity, channels=None, dtype=np.float64, timestamps=False):
+        """
+        Args:
+            capacity: 최대 샘플 수
+            channels: 샘플당 값 개수 (None이면 스칼라)
+            dtype: 저장 타입
+            timestamps: True면 샘플별 시각 열 저장 (append의 timestamp, 없으면 현재 시각)
+        """
+        self.capacity = capacity
+        shape = (2 * capacity,) if channels is None else (2 * capacity, channels)
+        self.data = np.zeros(shape, dtype=dtype)
+        self.time_data = np.zeros(2 * capacity) if timestamps else None
+        self.index = 0  # 다음 쓰기 위치
+        self.count = 0  # 누적 샘플 수 (clear 전까지 감소하지 않음)
+    
+    def append(self, value, timestamp=None):
+        """샘플 추가 (가득 차면 가장 오래된 샘플을 덮어씀)"""
+        i = self.index
+        self.data[i] = value
+        self.data[i + self.capacity] = value
+        if self.time_data is not None:
+            t = time.time() if timestamp is None else timestamp
+            self.time_data[i] = t
+            self.time_data[i + self.capacity] = t
+        self.index = i + 1 if i + 1 < self.capacity else 0
+        self.count += 1
+    
+    def extend(self, values, timestamps=None):
+        """여러 샘플 한 번에 추가 (파이썬 루프 없이 인덱스 배열로 기록)"""
+        values = np.asarray(values, dtype=self.data.dtype)
+        total = len(values)
+        if total == 0:
+            return
+        # 용량보다 많으면 마지막 capacity개만 남음
+        keep = min(total, self.capacity)
+        positions = (self.index + total - keep + np.arange(keep)) % self.capacity
+        self.data[positions] = values[-keep:]
+        self.data[positions + self.capacity] = values[-keep:]
+        if self.time_data is not None:
+            if timestamps is None:
+                timestamps = np.full(total, time.time())
+            timestamps = np.asarray(timestamps, dtype=np.float64)
+            self.time_data[positions] = timestamps[-keep:]
+            self.time_data[positions + self.capacity] = timestamps[-keep:]
+        self.index = (self.index + total) % self.capacity
+        self.count += total
+    
+    def values(self, n=None):
+        """최근 n개 (기본: 전체) - 오래된 순서의 연속 뷰"""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self.index + self.capacity
+        return self.data[end - n:end]
+    
+    def times(self, n=None):
+        """최근 n개 샘플의 시각 (timestamps=True일 때만)"""
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self.index + self.capacity
+        return self.time_data[end - n:end]
+    
+    def last(self):
+        """가장 최근 샘플"""
+        return self.data[self.index + self.capacity - 1]
+    
+    def mean(self, n=None):
+        """최근 n개 평균 (채널별, 비어 있으면 None)"""
+        values = self.values(n)
+        return values.mean(axis=0) if len(values) else None
+    
+    def std(self, n=None):
+        """최근 n개 표준편차 (채널별, 비어 있으면 None)"""
+        values = self.values(n)
+        return values.std(axis=0) if len(values) else None
+    
+    def sum(self, n=None):
+        """최근 n개 합 (채널별)"""
+        return self.values(n).sum(axis=0)
+    
+    def clear(self):
+        """버퍼 비우기"""
+        self.index = 0
+        self.count = 0
+    
+    def __len__(self):
+        return min(self.count, self.capacity)
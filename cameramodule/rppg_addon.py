@@ -1,26 +1,95 @@
 import cv2
 import numpy as np
 import time
-from collections import deque
 from scipy import signal
 import threading
+from ring_buffer import RingBuffer
+import rppg_algorithms
 
 class rPPGProcessor:
     """rPPG를 이용한 비접촉 심박수 측정"""
     
-    def __init__(self, fps=30, buffer_size=150):
+    # 샘플레이트 버킷(정수 fps)별 대역통과 필터 SOS 캐시 (인스턴스 간 공유)
+    _sos_cache = {}
+    
+    # process_sample에서 사용할 ROIStatsStage 하위 ROI 이름 (extract_roi와 같은 이마 영역)
+    roi_region = 'forehead'
+    
+    ESTIMATORS = ('fft', 'sdft')
+    
+    def __init__(self, fps=30, buffer_size=150, streaming=True, hop_seconds=0.5, estimator='fft',
+                 algorithm='green', window_seconds=1.6, min_samples=None, smoothing_seconds=2.0):
+        """
+        Args:
+            fps: 카메라 프레임레이트
+            buffer_size: 분석 윈도우 샘플 수
+            streaming: True면 스트리밍 엔진 (캐시된 SOS 필터를 새 샘플에만 적용하고
+                       hop_seconds마다 스펙트럼 갱신), False면 매 프레임 전체 재계산 (기존 방식)
+            hop_seconds: 스트리밍 모드 스펙트럼 갱신 간격 (초)
+            estimator: 스트리밍 모드 스펙트럼 추정 방식
+                       'fft' - 윈도우 전체 rfft 후 심박 대역 마스킹
+                       'sdft' - 심박 대역 bin만 슬라이딩 DFT로 갱신 (샘플당 bin별 O(1)) + 피크 보간
+            algorithm: 맥파 추출 알고리즘 ('green', 'chrom', 'pos' - rppg_algorithms 참고)
+            window_seconds: CHROM / POS 투영 윈도우 길이 (초)
+            min_samples: 첫 심박수 계산에 필요한 샘플 수 (None이면 green은 buffer_size,
+                         움직임에 강한 CHROM / POS는 buffer_size의 60%)
+            smoothing_seconds: 스트리밍 모드 심박수 이동평균 구간 (초, hop 추정값 몇 개를 평균)
+                               기존 방식은 최근 10 프레임 추정값 평균
+        """
+        if estimator not in self.ESTIMATORS:
+            raise ValueError(f"Unknown estimator: {estimator} (choose from {self.ESTIMATORS})")
+        if algorithm not in rppg_algorithms.ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {algorithm} (choose from {rppg_algorithms.ALGORITHMS})")
         self.fps = fps
         self.buffer_size = buffer_size
+        self.streaming = streaming
+        self.hop_seconds = hop_seconds
+        self.estimator = estimator
+        self.algorithm = algorithm
+        self.window_length = max(2, int(round(window_seconds * fps)))
+        if min_samples is None:
+            min_samples = buffer_size if algorithm == 'green' else int(buffer_size * 0.6)
+        self.min_samples = max(min(min_samples, buffer_size), self.window_length * 2)
+        
+        # 신호 버퍼 (미리 할당된 numpy 링 버퍼)
+        # color_means: 프레임별 ROI 평균색 (B, G, R) - 모든 알고리즘의 공통 입력
+        # raw_values: 알고리즘이 추출한 맥파 신호 (CHROM / POS는 윈도우 길이만큼 늦게 확정)
+        self.color_means = RingBuffer(buffer_size, channels=3)
+        self.raw_values = RingBuffer(buffer_size)
+        self.timestamps = RingBuffer(buffer_size)
+        
+        # CHROM / POS 중첩 합산 상태
+        self.pulse_tail = np.zeros(self.window_length - 1)  # 아직 확정되지 않은 최근 L-1 샘플의 부분합
+        self.projected_count = 0  # 투영을 마친 누적 색 샘플 수
+        
+        # 스트리밍 필터 상태
+        self.filtered_values = RingBuffer(buffer_size)
+        self.filter_state = None
+        self.filter_bucket = None
+        self.filtered_count = 0  # 필터를 통과한 누적 샘플 수
+        self.last_spectrum_time = None
         
-        # 신호 버퍼
-        self.raw_values = deque(maxlen=buffer_size)
-        self.timestamps = deque(maxlen=buffer_size)
+        # 슬라이딩 DFT 상태 (심박 대역 bin만)
+        self.sdft_bins = None      # bin 번호 k
+        self.sdft_twiddle = None   # e^{j2πk/N}
+        self.sdft_basis = None     # 재동기화용 DFT 행렬 [K, N]
+        self.sdft_gain = None      # bin별 필터 응답 |H| (버킷당 1회 계산)
+        self.sdft_values = None    # 현재 윈도우의 X_k
+        self.sdft_updates = 0      # 마지막 재동기화 이후 갱신 샘플 수
         
         # 심박수 결과
         self.heart_rate = 0
-        self.heart_rates = deque(maxlen=10)  # 이동평균용
+        # 이동평균용 (기존: 최근 10 프레임 추정값 - 스트리밍 모드는 smoothing_seconds 동안의 hop 추정값)
+        # hop 추정값은 FFT bin 단위로 양자화되므로 여러 hop을 평균해야 기존 방식처럼 bin 사이 값이 나옴
+        smoothing = 10 if not streaming else max(1, int(round(smoothing_seconds / hop_seconds)))
+        self.heart_rates = RingBuffer(smoothing)
         self.signal_quality = 0
         
+        # 맥박 검출 (필터된 파형의 피크 시각 = 박동 시각, StressAnalyzer.update_beats로 전달)
+        self.beat_times = RingBuffer(64)
+        self.new_beats = []  # pop_beats() 전까지 쌓이는 새 박동 시각
+        self.last_beat_time = None
+        
         # ROI 시각화용
         self.roi_bbox = None
         
@@ -58,8 +127,8 @@ class rPPGProcessor:
         
         return roi
     
-    def process_frame(self, frame, face_bbox):
-        """프레임 처리 및 심박수 업데이트"""
+    def process_frame(self, frame, face_bbox, timestamp=None):
+        """프레임 처리 및 심박수 업데이트 (timestamp: 프레임 시각, 없으면 현재 시각)"""
         # ROI 추출
         roi = self.extract_roi(frame, face_bbox)
         if roi is None or roi.size == 0:
@@ -67,25 +136,142 @@ class rPPGProcessor:
         
         # 평균 색상값 계산
         mean_rgb = np.mean(roi, axis=(0, 1))
+        self._add_color(mean_rgb, time.time() if timestamp is None else timestamp)
         
-        # 녹색 채널 사용 (가장 강한 PPG 신호)
-        green_value = mean_rgb[1]
-        
+    def process_sample(self, sample):
+        """ROIStatsStage 샘플로 심박수 업데이트 (ROI 평균을 다시 계산하지 않음)"""
+        if sample is None:
+            return
+        region = sample['regions'].get(self.roi_region)
+        if region is None:
+            return
+        self.roi_bbox = region['bbox']
+        self._add_color(region['mean'], sample['timestamp'])
+    
+    def _add_color(self, mean_rgb, timestamp):
+        """ROI 평균색 (B, G, R) 한 샘플 추가 후 필요하면 심박수 계산"""
         # 스레드 안전하게 버퍼에 추가
         with self.lock:
-            self.raw_values.append(green_value)
-            self.timestamps.append(time.time())
+            self.color_means.append(mean_rgb[:3])
+            if self.algorithm == 'green':
+                # 녹색 채널 사용 (가장 강한 PPG 신호)
+                self.raw_values.append(mean_rgb[1])
+            self.timestamps.append(timestamp)
             
             # 충분한 데이터가 모이면 심박수 계산
-            if len(self.raw_values) >= self.buffer_size:
+            if len(self.timestamps) >= self.min_samples:
+                if self.streaming:
+                    self._update_heart_rate_streaming()
+                else:
+                    self._project_pending()
+                    if len(self.raw_values) >= self.window_length:
+                        self._calculate_heart_rate()
+    
+    def _project_pending(self):
+        """CHROM / POS: 새 색 샘플로 끝나는 윈도우들을 한 번에 투영 -> 중첩 합산 -> 확정된 맥파 샘플 추가"""
+        if self.algorithm not in rppg_algorithms.WINDOWED:
+            return
+        
+        length = self.window_length
+        available = len(self.color_means)
+        new = self.color_means.count - self.projected_count
+        if new <= 0 or available < length:
+            return
+        
+        # 처음이거나 밀렸으면 버퍼 전체에서 다시 시작
+        if self.projected_count == 0 or new > available - length + 1:
+            self.pulse_tail[:] = 0
+            new = available - length + 1
+        
+        colors = self.color_means.values(new + length - 1)
+        segments = rppg_algorithms.window_segments(
+            self.algorithm, rppg_algorithms.sliding_windows(colors, length)
+        )
+        summed = rppg_algorithms.overlap_add(segments)
+        summed[:length - 1] += self.pulse_tail
+        
+        # 이후 윈도우가 더 이상 덮지 않는 앞쪽 new개 샘플 확정
+        self.raw_values.extend(summed[:new])
+        self.pulse_tail = summed[new:].copy()
+        self.projected_count = self.color_means.count
+    
+    @classmethod
+    def _get_sos(cls, bucket):
+        """샘플레이트 버킷의 대역통과 필터 (0.75Hz ~ 3Hz) - 버킷당 한 번만 설계"""
+        if bucket not in cls._sos_cache:
+            nyquist = bucket / 2
+            low = 0.75 / nyquist
+            high = min(3.0 / nyquist, 0.99)
+            cls._sos_cache[bucket] = (signal.butter(4, [low, high], btype='band', output='sos')
+                                      if low < high else None)
+        return cls._sos_cache[bucket]
+    
+    def _update_heart_rate_streaming(self):
+        """스트리밍 심박수 갱신 (hop 간격마다 새 샘플만 필터링 후 스펙트럼 계산)"""
+        try:
+            now = self.timestamps.last()
+            if self.last_spectrum_time is not None and now - self.last_spectrum_time < self.hop_seconds:
+                return
+            self.last_spectrum_time = now
+            
+            self._project_pending()
+            if len(self.raw_values) < self.window_length:
+                return
+            
+            time_array = self.timestamps.values()
+            time_diff = time_array[-1] - time_array[0]
+            if time_diff <= 0:
+                return
+            actual_fps = len(time_array) / time_diff
+            
+            bucket = max(1, int(round(actual_fps)))
+            sos = self._get_sos(bucket)
+            if sos is None:
+                # 필터 불가 (샘플레이트 너무 낮음) - 기존 방식으로 계산
                 self._calculate_heart_rate()
+                return
+            
+            # 버킷이 바뀌었거나 필터가 밀렸으면 윈도우 전체로 필터 재시작
+            pending = self.raw_values.count - self.filtered_count
+            if bucket != self.filter_bucket or self.filter_state is None or pending > self.buffer_size:
+                raw = self.raw_values.values()
+                self.filter_state = signal.sosfilt_zi(sos) * raw[0]
+                self.filter_bucket = bucket
+                self.filtered_values.clear()
+                self.sdft_values = None
+                pending = len(raw)
+            
+            # 새 샘플만 필터 상태를 이어서 통과
+            filtered, self.filter_state = signal.sosfilt(
+                sos, self.raw_values.values(pending), zi=self.filter_state
+            )
+            
+            # 슬라이딩 DFT: 윈도우에서 밀려날 샘플 (extend가 덮어쓰기 전에 복사)
+            evicted = None
+            if self.estimator == 'sdft' and self.sdft_values is not None:
+                evicted = self.filtered_values.values()[:pending].copy()
+            self.filtered_values.extend(filtered)
+            self.filtered_count = self.raw_values.count
+                
+            self._detect_beats(self.filtered_values.values(), actual_fps)
+                
+            # 슬라이딩 DFT는 윈도우가 찬 뒤부터 (워밍업 중에는 FFT로 추정)
+            if self.estimator == 'sdft' and len(self.filtered_values) >= self.buffer_size:
+                self._update_sdft(filtered, evicted, bucket)
+                self._estimate_heart_rate_sdft(actual_fps)
+                return
+            
+            self._estimate_heart_rate(self.filtered_values.values(), actual_fps, sos, bucket)
+        
+        except Exception as e:
+            print(f"심박수 계산 오류: {e}")
     
     def _calculate_heart_rate(self):
         """심박수 계산 (내부 메서드)"""
         try:
-            # 신호 배열 생성
-            signal_array = np.array(self.raw_values)
-            time_array = np.array(self.timestamps)
+            # 신호 배열 (링 버퍼 뷰 - 아래 전처리가 새 배열을 만들므로 복사 불필요)
+            signal_array = self.raw_values.values()
+            time_array = self.timestamps.values()
             
             # 실제 샘플링 레이트 계산
             time_diff = time_array[-1] - time_array[0]
@@ -112,39 +298,179 @@ class rPPGProcessor:
             else:
                 filtered = signal_detrended
             
-            # FFT로 주파수 분석
-            fft_result = np.fft.rfft(filtered)
-            frequencies = np.fft.rfftfreq(len(filtered), d=1/actual_fps)
+            self._detect_beats(filtered, actual_fps)
+            self._estimate_heart_rate(filtered, actual_fps)
+        
+        except Exception as e:
+            print(f"심박수 계산 오류: {e}")
+    
+    def _reset_sdft(self, bucket):
+        """심박 대역 bin 선택 + 현재 윈도우로 X_k 직접 계산"""
+        n = self.buffer_size
+        # 버킷 안에서 실제 fps가 흔들려도 대역을 덮도록 양쪽에 보간용 이웃 bin 1개씩 여유
+        k_min = max(1, int(np.floor(0.75 * n / (bucket + 0.5))) - 1)
+        k_max = min(n // 2, int(np.ceil(3.0 * n / max(bucket - 0.5, 0.5))) + 1)
+        self.sdft_bins = np.arange(k_min, k_max + 1)
+        self.sdft_twiddle = np.exp(2j * np.pi * self.sdft_bins / n)
+        self.sdft_basis = np.exp(-2j * np.pi * np.outer(self.sdft_bins, np.arange(n)) / n)
+        _, response = signal.sosfreqz(self._get_sos(bucket), worN=self.sdft_bins * bucket / n, fs=bucket)
+        self.sdft_gain = np.abs(response)
+        self._resync_sdft()
+    
+    def _resync_sdft(self):
+        """누적 반올림 오차 제거 - 윈도우 전체로 X_k 재계산 (N 샘플마다 1회)"""
+        self.sdft_values = self.sdft_basis @ self.filtered_values.values()
+        self.sdft_updates = 0
+    
+    def _update_sdft(self, new_samples, evicted, bucket):
+        """슬라이딩 DFT 갱신: X_k <- (X_k - x_old + x_new) * e^{j2πk/N}
+        
+        hop 동안 모인 P개 샘플을 한 번에 적용 (샘플당 bin별 O(1)):
+        X_k <- X_k * w^P + Σ_i (x_new_i - x_old_i) * w^(P-i)
+        """
+        if self.sdft_values is None or evicted is None:
+            self._reset_sdft(bucket)
+            return
+        
+        count = len(new_samples)
+        if count == 0:
+            return
+        
+        self.sdft_updates += count
+        if self.sdft_updates >= self.buffer_size:
+            self._resync_sdft()
+            return
+        
+        delta = np.asarray(new_samples) - evicted
+        powers = self.sdft_twiddle[np.newaxis, :] ** np.arange(count, 0, -1)[:, np.newaxis]
+        self.sdft_values = self.sdft_values * self.sdft_twiddle ** count + delta @ powers
+    
+    def _estimate_heart_rate_sdft(self, actual_fps):
+        """슬라이딩 DFT bin의 피크 + Jacobsen 보간으로 심박수 / 신호 품질 갱신"""
+        frequencies = self.sdft_bins * actual_fps / self.buffer_size
+        
+        # 필터 응답 보정 (FFT 경로와 동일하게 filtfilt 크기 응답에 맞춤)
+        spectrum = self.sdft_values * self.sdft_gain
+        power_spectrum = np.abs(spectrum) ** 2
+        
+        valid_range = (frequencies >= 0.75) & (frequencies <= 3.0)
+        if not np.any(valid_range):
+            return
+        
+        valid_index = np.flatnonzero(valid_range)
+        valid_power = power_spectrum[valid_range]
+        peak_idx = np.argmax(valid_power)
+        i = valid_index[peak_idx]
+        
+        # 이웃 bin의 복소값으로 bin 사이 피크 위치 보간 (Jacobsen)
+        offset = 0.0
+        if 0 < i < len(spectrum) - 1:
+            denominator = 2 * spectrum[i] - spectrum[i - 1] - spectrum[i + 1]
+            if abs(denominator) > 0:
+                offset = float(np.real((spectrum[i - 1] - spectrum[i + 1]) / denominator))
+                offset = max(-0.5, min(0.5, offset))
+        
+        peak_freq = (self.sdft_bins[i] + offset) * actual_fps / self.buffer_size
+        self._update_result(peak_freq * 60, valid_power[peak_idx], np.mean(valid_power))
+    
+    def _estimate_heart_rate(self, filtered, actual_fps, sos=None, bucket=None):
+        """필터링된 신호의 스펙트럼 피크로 심박수 / 신호 품질 갱신
+        
+        sos가 주어지면 (단방향 sosfilt 결과) 필터 응답 |H|^2를 한 번 더 곱해
+        기존 filtfilt(양방향, |H|^4)와 같은 크기 응답으로 맞춘다.
+        """
+        # FFT로 주파수 분석
+        fft_result = np.fft.rfft(filtered)
+        frequencies = np.fft.rfftfreq(len(filtered), d=1/actual_fps)
             
-            # 파워 스펙트럼
-            power_spectrum = np.abs(fft_result) ** 2
+        # 파워 스펙트럼
+        power_spectrum = np.abs(fft_result) ** 2
+        if sos is not None:
+            _, response = signal.sosfreqz(sos, worN=frequencies, fs=bucket)
+            power_spectrum *= np.abs(response) ** 2
             
-            # 심박수 범위 내에서 최대 피크 찾기
-            valid_range = (frequencies >= 0.75) & (frequencies <= 3.0)
-            if not np.any(valid_range):
-                return
+        # 심박수 범위 내에서 최대 피크 찾기
+        valid_range = (frequencies >= 0.75) & (frequencies <= 3.0)
+        if not np.any(valid_range):
+            return
                 
-            valid_power = power_spectrum[valid_range]
-            valid_freq = frequencies[valid_range]
+        valid_power = power_spectrum[valid_range]
+        valid_freq = frequencies[valid_range]
             
-            # 최대 피크 찾기
-            peak_idx = np.argmax(valid_power)
-            peak_freq = valid_freq[peak_idx]
-            heart_rate_bpm = peak_freq * 60
+        # 최대 피크 찾기
+        peak_idx = np.argmax(valid_power)
+        peak_freq = valid_freq[peak_idx]
+        heart_rate_bpm = peak_freq * 60
             
-            # 신호 품질 평가 (0-100)
-            # 피크의 prominence를 기준으로
-            peak_power = valid_power[peak_idx]
-            mean_power = np.mean(valid_power)
-            if mean_power > 0:
-                self.signal_quality = min(100, int((peak_power / mean_power) * 10))
+        self._update_result(heart_rate_bpm, valid_power[peak_idx], np.mean(valid_power))
+    
+    def _update_result(self, heart_rate_bpm, peak_power, mean_power):
+        """신호 품질 + 이동평균 심박수 갱신"""
+        # 신호 품질 평가 (0-100)
+        # 피크의 prominence를 기준으로
+        if mean_power > 0:
+            self.signal_quality = min(100, int((peak_power / mean_power) * 10))
             
-            # 이동 평균으로 안정화
-            self.heart_rates.append(heart_rate_bpm)
-            self.heart_rate = np.mean(self.heart_rates)
+        # 이동 평균으로 안정화
+        self.heart_rates.append(heart_rate_bpm)
+        self.heart_rate = self.heart_rates.mean()
+    
+    def _signal_times(self, count):
+        """맥파 신호 최근 count개 샘플의 시각 (CHROM / POS는 확정 지연만큼 앞선 색 샘플 시각)"""
+        times = self.timestamps.values()
+        lag = self.timestamps.count - self.raw_values.count
+        end = len(times) - lag
+        count = min(count, end)
+        return times[end - count:end] if count > 0 else times[:0]
+    
+    def _detect_beats(self, filtered, actual_fps):
+        """필터된 파형의 피크로 새 박동 시각 검출 (피크 주변 3점 포물선 보간으로 프레임 간격보다 정밀하게)"""
+        times = self._signal_times(len(filtered))
+        filtered = filtered[len(filtered) - len(times):]
+        if len(filtered) < 3:
+            return
+        
+        # 현재 심박수 주기의 70% (측정 전에는 180 BPM)보다 가까운 피크는 같은 박동
+        min_interval = 0.7 * 60.0 / self.heart_rate if self.heart_rate > 0 else 60.0 / 180
+        distance = max(1, int(actual_fps * min_interval))
+        
+        # 심박수를 알면 그 주변 좁은 대역만 양방향 필터 (잡음에 의한 피크 위치 흔들림 감소, 위상 지연 없음)
+        margin = distance
+        if self.heart_rate > 0:
+            nyquist = actual_fps / 2
+            low = 0.6 * self.heart_rate / 60 / nyquist
+            high = min(1.6 * self.heart_rate / 60 / nyquist, 0.99)
+            if low < high and len(filtered) > 4 * distance:
+                sos = signal.butter(2, [low, high], btype='band', output='sos')
+                filtered = signal.sosfiltfilt(sos, filtered)
+                # 양 끝 과도 응답 구간의 피크는 제외
+                margin = int(actual_fps * 60.0 / self.heart_rate)
+        
+        peaks, _ = signal.find_peaks(filtered, distance=distance, prominence=0.5 * np.std(filtered))
+        
+        # 끝 근처 피크는 다음 갱신에서 바뀔 수 있으므로 충분히 안쪽으로 들어온 뒤 확정
+        peaks = peaks[(peaks >= margin) & (peaks < len(filtered) - margin)]
+        
+        for peak in peaks:
+            y0, y1, y2 = filtered[peak - 1:peak + 2]
+            denominator = y0 - 2 * y1 + y2
+            offset = 0.5 * (y0 - y2) / denominator if denominator != 0 else 0.0
+            beat_time = times[peak] + offset * (times[peak + 1] - times[peak - 1]) / 2
             
-        except Exception as e:
-            print(f"심박수 계산 오류: {e}")
+            if self.last_beat_time is None or beat_time > self.last_beat_time + min_interval / 2:
+                self.beat_times.append(beat_time)
+                self.new_beats.append(beat_time)
+                self.last_beat_time = beat_time
+        
+        # 아무도 가져가지 않아도 무한히 쌓이지 않게
+        del self.new_beats[:-self.beat_times.capacity]
+    
+    def pop_beats(self):
+        """마지막 호출 이후 검출된 박동 시각 목록 (오래된 순서)"""
+        with self.lock:
+            beats = self.new_beats
+            self.new_beats = []
+            return beats
     
     def get_heart_rate(self):
         """현재 심박수 반환"""
@@ -190,7 +516,7 @@ class rPPGProcessor:
         
         # 신호 그리기
         with self.lock:
-            values = list(self.raw_values)[-width:]
+            values = self.raw_values.values(width)
             if len(values) > 1:
                 # 정규화
                 values = np.array(values)
@@ -216,8 +542,19 @@ class rPPGProcessor:
     def reset(self):
         """버퍼 초기화"""
         with self.lock:
+            self.color_means.clear()
             self.raw_values.clear()
             self.timestamps.clear()
+            self.pulse_tail[:] = 0
+            self.projected_count = 0
+            self.filtered_values.clear()
+            self.filter_state = None
+            self.filter_bucket = None
+            self.filtered_count = 0
+            self.last_spectrum_time = None
             self.heart_rates.clear()
+            self.beat_times.clear()
+            self.new_beats = []
+            self.last_beat_time = None
             self.heart_rate = 0
             self.signal_quality = 0
\ No newline at end of file
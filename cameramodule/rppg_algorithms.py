@@ -0,0 +1,92 @@
+"""
+rPPG 맥파 추출 알고리즘
+프레임별 ROI 평균색 (B, G, R) 시계열에서 맥파 신호 추출
+  GREEN - 녹색 채널 그대로 (기존 방식)
+  CHROM - 색차 신호 2개를 표준편차 비로 결합 (de Haan & Jeanne 2013)
+  POS   - 피부색 직교 평면 투영 (Wang et al. 2017)
+CHROM / POS는 겹치는 짧은 윈도우마다 시간 정규화 -> 투영 -> 중첩 합산 (조명 세기 / 움직임에 강함)
+모든 윈도우를 한 번에 numpy로 계산 (샘플별 파이썬 루프 없음)
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+ALGORITHMS = ('green', 'chrom', 'pos')
+
+# 윈도우 기반 알고리즘 (중첩 합산 필요)
+WINDOWED = ('chrom', 'pos')
+
+
+def window_segments(algorithm, windows):
+    """
+    윈도우별 맥파 조각 계산
+    
+    Args:
+        algorithm: 'chrom' 또는 'pos'
+        windows: [W, 3, L] 윈도우별 (B, G, R) 평균색
+    
+    Returns:
+        [W, L] 평균이 제거된 맥파 조각 (중첩 합산용)
+    """
+    # 시간 정규화 (윈도우 평균으로 나눠 피부색 / 조명 세기 제거)
+    means = windows.mean(axis=2, keepdims=True)
+    normalized = windows / np.where(means > 0, means, 1.0)
+    blue, green, red = normalized[:, 0], normalized[:, 1], normalized[:, 2]
+    
+    if algorithm == 'pos':
+        s1 = green - blue
+        s2 = green + blue - 2 * red
+    elif algorithm == 'chrom':
+        s1 = 3 * red - 2 * green
+        s2 = 1.5 * red + green - 1.5 * blue
+    else:
+        raise ValueError(f"Unknown windowed algorithm: {algorithm}")
+    
+    # 두 신호의 표준편차 비로 결합 (공통 왜곡 성분 상쇄)
+    std1 = s1.std(axis=1, keepdims=True)
+    std2 = s2.std(axis=1, keepdims=True)
+    alpha = std1 / np.where(std2 > 0, std2, 1.0)
+    if algorithm == 'pos':
+        segments = s1 + alpha * s2
+    else:
+        segments = s1 - alpha * s2
+    segments = segments - segments.mean(axis=1, keepdims=True)
+    
+    # CHROM은 Hann 윈도우로 가중 후 합산
+    if algorithm == 'chrom':
+        segments = segments * np.hanning(segments.shape[1])
+    return segments
+
+
+def overlap_add(segments):
+    """1샘플 간격 윈도우 조각 [W, L] 중첩 합산 -> 길이 W + L - 1 신호"""
+    count, length = segments.shape
+    index = np.arange(count)[:, np.newaxis] + np.arange(length)[np.newaxis, :]
+    return np.bincount(index.ravel(), weights=segments.ravel(), minlength=count + length - 1)
+
+
+def sliding_windows(colors, window):
+    """(B, G, R) 시계열 [N, 3] -> 1샘플 간격 윈도우 [N - L + 1, 3, L] (복사 없는 뷰)"""
+    return sliding_window_view(colors, window, axis=0)
+
+
+def pulse_signal(algorithm, colors, window):
+    """
+    (B, G, R) 시계열 전체에서 맥파 신호 계산
+    
+    Args:
+        algorithm: 'green', 'chrom', 'pos'
+        colors: [N, 3] 프레임별 ROI 평균색 (B, G, R)
+        window: 윈도우 길이 (샘플, CHROM / POS)
+    
+    Returns:
+        [N] 맥파 신호 (윈도우보다 짧으면 None)
+    """
+    colors = np.asarray(colors, dtype=np.float64)
+    if algorithm == 'green':
+        return colors[:, 1].copy()
+    if algorithm not in WINDOWED:
+        raise ValueError(f"Unknown algorithm: {algorithm} (choose from {ALGORITHMS})")
+    if len(colors) < window:
+        return None
+    return overlap_add(window_segments(algorithm, sliding_windows(colors, window)))
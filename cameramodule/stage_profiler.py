@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+단계별 지연 측정기
+메인 루프의 각 단계 (캡처, 변환, 감지, 서보, rPPG, SpO2, 스트레스, MQTT, 오버레이, 화면)를
+프레임마다 측정해 최근 N 프레임 롤링 윈도우에서 p50/p95/p99 제공
+mark() 한 번은 perf_counter + dict 갱신 수준이라 프레임 시간의 1%보다 훨씬 작음
+"""
+
+import time
+
+import numpy as np
+
+
+class StageProfiler:
+    """단계별 롤링 지연 통계
+    
+    사용법:
+        profiler.begin_frame()
+        ... 캡처 ...
+        profiler.mark('capture')   # 직전 mark 이후 경과 시간을 'capture'에 누적
+        ... 감지 ...
+        profiler.mark('detect')
+        profiler.end_frame()       # 프레임 내 누적값을 롤링 윈도우에 기록
+    """
+    
+    def __init__(self, window=300, report_interval=10.0, enabled=True):
+        """
+        Args:
+            window: 통계에 사용할 최근 프레임 수
+            report_interval: 주기 요약 간격 (초, 0이면 요약 없음)
+            enabled: False면 모든 측정 생략
+        """
+        self.window = window
+        self.report_interval = report_interval
+        self.enabled = enabled
+        
+        # 단계별 링 버퍼 [값 리스트(ms), 누적 샘플 수] - 처음 나온 순서 유지
+        # (프레임마다 기록은 리스트 대입만, numpy 변환은 조회 시에만)
+        self.rings = {}
+        
+        # 현재 프레임 누적값
+        self.frame_times = {}
+        self.frame_start = None
+        self.last_mark = None
+        self.marks_in_frame = 0
+        self.marks_per_frame = 0
+        self.commit_cost = 0.0  # end_frame 기록 비용 (초)
+        
+        self.frames = 0
+        self.last_report_time = time.time()
+        
+        # 측정 자체 비용 (mark 1회, 초)
+        self.mark_cost = self._calibrate()
+    
+    def _calibrate(self, iterations=2000):
+        """mark() 1회 비용 측정"""
+        frame_times = {}
+        last = time.perf_counter()
+        start = last
+        for _ in range(iterations):
+            now = time.perf_counter()
+            frame_times['stage'] = frame_times.get('stage', 0.0) + (now - last)
+            last = now
+        return (time.perf_counter() - start) / iterations
+    
+    def begin_frame(self):
+        """프레임 시작"""
+        if not self.enabled:
+            return
+        self.frame_times.clear()
+        self.marks_in_frame = 0
+        self.frame_start = self.last_mark = time.perf_counter()
+    
+    def mark(self, stage):
+        """직전 mark 이후 경과 시간을 stage에 누적"""
+        if self.last_mark is None:
+            return
+        now = time.perf_counter()
+        self.frame_times[stage] = self.frame_times.get(stage, 0.0) + (now - self.last_mark)
+        self.last_mark = now
+        self.marks_in_frame += 1
+    
+    def end_frame(self):
+        """프레임 누적값을 롤링 윈도우에 기록"""
+        if self.last_mark is None:
+            return
+        commit_start = time.perf_counter()
+        self.frame_times['frame'] = commit_start - self.frame_start
+        
+        for stage, value in self.frame_times.items():
+            ring = self.rings.get(stage)
+            if ring is None:
+                ring = self.rings[stage] = [[0.0] * self.window, 0]
+            ring[0][ring[1] % self.window] = value * 1000
+            ring[1] += 1
+        
+        self.marks_per_frame = self.marks_in_frame
+        self.frames += 1
+        self.last_mark = None
+        self.commit_cost = time.perf_counter() - commit_start
+    
+    def get_stage(self, stage):
+        """한 단계 통계 (ms) - 측정 기록이 없으면 None"""
+        ring = self.rings.get(stage)
+        if ring is None or ring[1] == 0:
+            return None
+        values = np.array(ring[0][:min(ring[1], self.window)])
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        return {
+            'p50': round(float(p50), 3),
+            'p95': round(float(p95), 3),
+            'p99': round(float(p99), 3),
+            'mean': round(float(values.mean()), 3),
+            'max': round(float(values.max()), 3),
+            'samples': int(len(values))
+        }
+    
+    def get_stats(self):
+        """전체 단계 통계 + 측정 오버헤드"""
+        stages = {stage: self.get_stage(stage) for stage in self.rings}
+        frame = stages.get('frame')
+        overhead = 0.0
+        if frame and frame['p50'] > 0:
+            cost = self.marks_per_frame * self.mark_cost + self.commit_cost
+            overhead = cost * 1000 / frame['p50'] * 100
+        return {
+            'frames': self.frames,
+            'window': self.window,
+            'overhead_pct': round(overhead, 4),
+            'stages': stages
+        }
+    
+    def report_due(self):
+        """주기 요약 시점인지 확인 (True면 타이머 재설정)"""
+        if not self.enabled or self.report_interval <= 0:
+            return False
+        now = time.time()
+        if now - self.last_report_time < self.report_interval:
+            return False
+        self.last_report_time = now
+        return True
+    
+    def format_summary(self, stats=None):
+        """요약 텍스트"""
+        stats = stats or self.get_stats()
+        lines = [
+            f"⏱️ Stage latency (last {min(stats['frames'], self.window)} frames, "
+            f"profiler overhead {stats['overhead_pct']:.3f}%)",
+            f"   {'stage':<10}{'p50':>9}{'p95':>9}{'p99':>9}  ms"
+        ]
+        for stage, s in stats['stages'].items():
+            if s:
+                lines.append(f"   {stage:<10}{s['p50']:>9.2f}{s['p95']:>9.2f}{s['p99']:>9.2f}")
+        return "\n".join(lines)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+MQTT 페이로드 코덱 왕복 벤치마크
+센서 / 생체신호 / 배치 메시지 예시를 코덱별로 인코딩 -> 디코딩해서
+메시지당 바이트, 인코딩 / 디코딩 µs, 왕복 일치 여부를 출력
+기준선: 기존 json.dumps (공백 포함) / SensorController의 json.dumps(indent=2)
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from biometrics_batch import build_batch_message
+from mqtt_codecs import CODECS, get_codec
+
+
+def sample_messages():
+    """저장소의 전송기들이 보내는 형식 그대로의 예시 메시지 [(이름, dict)]"""
+    now = datetime.now().isoformat()
+    rng = np.random.default_rng(0)
+    return [
+        ("infrared", {"type": "infrared", "timestamp": now, "data": 65.0, "unit": "%", "raw_count": 32,
+                      "total_samples": 50, "device_mode": "real", "gpio_lib": "gpiod"}),
+        ("sound", {"type": "sound", "timestamp": now, "data": 42.5, "unit": "level", "events_per_second": 3.2,
+                   "total_events": 16, "device_mode": "real", "gpio_lib": "gpiod"}),
+        ("temperature", {"type": "temperature", "timestamp": now, "data": 25.5, "unit": "°C", "samples": 3,
+                         "device_mode": "real_new", "dht_lib": "adafruit_dht"}),
+        ("humidity", {"type": "humidity", "timestamp": now, "data": 45.2, "unit": "%", "samples": 3,
+                      "device_mode": "real_new", "dht_lib": "adafruit_dht"}),
+        ("heart_rate", {"type": "heart_rate", "timestamp": now, "data": 72.4, "unit": "BPM",
+                        "device_id": "ai_camera_1700000000", "gpio_lib": "gpiod"}),
+        ("spo2", {"type": "spo2", "timestamp": now, "data": 97.1, "unit": "%",
+                  "device_id": "ai_camera_1700000000", "gpio_lib": "gpiod"}),
+        ("pir", {"sensor_type": "PIR", "motion_detected": True, "timestamp": now, "pin": 18}),
+        ("temp_humidity", {"sensor_type": "TempHumidity", "temperature": 24.5, "humidity": 40.25,
+                           "timestamp": now, "pin": 4, "sensor_model": "DHT22"}),
+        ("batch", build_batch_message({"heart_rate": rng.normal(72, 3, 150),
+                                       "stress_index": rng.normal(35, 5, 150),
+                                       "spo2": rng.normal(97, 0.5, 150)},
+                                      "ai_camera_1700000000", "gpiod")),
+    ]
+
+
+class _LegacyJSON:
+    """기준선: 기존 전송기의 json.dumps (indent 지정 가능)"""
+    
+    content_type = 'application/json'
+    
+    def __init__(self, name, indent=None):
+        self.name = name
+        self.indent = indent
+    
+    def encode(self, data):
+        return json.dumps(data, indent=self.indent).encode('utf-8')
+    
+    def decode(self, payload):
+        return json.loads(payload)
+
+
+def measure(codec, message, iterations):
+    """(바이트, 인코딩 µs, 디코딩 µs, 왕복 일치)"""
+    payload = codec.encode(message)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        codec.encode(message)
+    encode_us = (time.perf_counter() - start) / iterations * 1e6
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decoded = codec.decode(payload)
+    decode_us = (time.perf_counter() - start) / iterations * 1e6
+    return len(payload), encode_us, decode_us, decoded == message
+
+
+def cross_timezone_check(codecs, messages, sender_tz='Asia/Seoul', receiver_tz='UTC'):
+    """보내는 쪽 / 받는 쪽 시간대가 다를 때 왕복 일치 여부 {코덱 이름: 일치} (time.tzset 없으면 None)"""
+    if not hasattr(time, 'tzset'):
+        return None
+    original = os.environ.get('TZ')
+    results = {}
+    try:
+        for codec in codecs:
+            os.environ['TZ'] = sender_tz
+            time.tzset()
+            payloads = [codec.encode(message) for _, message in messages]
+            os.environ['TZ'] = receiver_tz
+            time.tzset()
+            results[codec.name] = all(codec.decode(payload) == message
+                                      for payload, (_, message) in zip(payloads, messages))
+    finally:
+        if original is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = original
+        time.tzset()
+    return results
+
+
+def main(args):
+    messages = sample_messages()
+    codecs = [_LegacyJSON('json-indent2', indent=2), _LegacyJSON('json-legacy')]
+    for name in args.codecs:
+        try:
+            codecs.append(get_codec(name))
+        except RuntimeError as e:
+            print(f"⚠️ {name}: skipped ({e})")
+    
+    print("\n" + "="*83)
+    print(f"{'codec':<14}{'message':<15}{'bytes':>7}{'encode µs':>11}{'decode µs':>11}{'round-trip':>12}"
+          f"{'vs legacy':>11}")
+    print("-"*83)
+    totals = {}
+    for codec in codecs:
+        total_bytes = 0
+        total_encode = 0.0
+        total_decode = 0.0
+        all_ok = True
+        for name, message in messages:
+            size, encode_us, decode_us, ok = measure(codec, message, args.iterations)
+            total_bytes += size
+            total_encode += encode_us
+            total_decode += decode_us
+            all_ok = all_ok and ok
+            if args.verbose:
+                print(f"{codec.name:<14}{name:<15}{size:>7}{encode_us:>11.2f}{decode_us:>11.2f}"
+                      f"{'ok' if ok else 'MISMATCH':>12}")
+        totals[codec.name] = (total_bytes / len(messages), total_encode / len(messages),
+                              total_decode / len(messages), all_ok)
+    
+    if args.verbose:
+        print("-"*83)
+    baseline = totals['json-legacy'][0]
+    for name, (size, encode_us, decode_us, ok) in totals.items():
+        print(f"{name:<14}{'(mean)':<15}{size:>7.0f}{encode_us:>11.2f}{decode_us:>11.2f}"
+              f"{'ok' if ok else 'MISMATCH':>12}{baseline / size:>10.1f}x")
+    print("="*83)
+
+    # 시간대가 다른 호스트 간 왕복 (Asia/Seoul에서 인코딩 -> UTC에서 디코딩)
+    cross = cross_timezone_check(codecs, messages)
+    if cross is None:
+        print("⚠️ cross-timezone round-trip: skipped (time.tzset not available)")
+    else:
+        for name, ok in cross.items():
+            print(f"🌐 cross-timezone round-trip (Asia/Seoul -> UTC) {name:<14}{'ok' if ok else 'MISMATCH'}")
+        if not all(cross.values()):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='MQTT payload codec round-trip benchmark')
+    parser.add_argument('--codecs', nargs='+', choices=CODECS, default=list(CODECS),
+                        help='Codecs to compare (default: all available)')
+    parser.add_argument('--iterations', type=int, default=2000, help='Encode/decode repetitions per message')
+    parser.add_argument('--verbose', action='store_true', help='Print every message, not only the means')
+    main(parser.parse_args())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+멀티프로세스 얼굴 감지 풀
+얼굴 감지 (face_detectors 백엔드, 기본 Haar)를 워커 프로세스 여러 개에서 실행 (메인 프로세스의 GIL과 분리)
+프레임은 multiprocessing.shared_memory 링 슬롯에 복사해서 넘기고 (피클링 없음),
+큐로는 (순번, 슬롯, 크기) 같은 작은 튜플만 주고받는다.
+결과에는 프레임 순번이 붙어 있어 메인 루프는 완료된 감지 중 가장 최근 것을 사용
+워커는 forkserver로 시작하므로 (멀티스레드 프로세스에서 fork 금지) 실행 스크립트는
+if __name__ == "__main__": 가드 안에서 풀을 만들어야 한다 (워커가 메인 모듈을 다시 import)
+"""
+
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from face_detectors import create_detector
+
+
+def _detect_worker(shm_name, slot_bytes, tasks, results, detector_config):
+    """워커 프로세스: 슬롯의 그레이 프레임에서 가장 큰 얼굴 감지 (main 좌표로 반환)"""
+    # 워커 여러 개가 코어를 나눠 쓰므로 OpenCV 내부 스레드는 1개
+    cv2.setNumThreads(1)
+    detector = create_detector(**detector_config)
+    detector.warmup()
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot, height, width, scale_x, scale_y = task
+            start = time.perf_counter()
+            gray = np.ndarray((height, width), dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+            bbox = detector.detect(gray, (scale_x, scale_y))
+            del gray  # 공유 메모리 뷰 해제 (close 전에 필요)
+            results.put((seq, slot, bbox, time.perf_counter() - start))
+    finally:
+        shm.close()
+
+
+class DetectionPool:
+    """공유 메모리 링 슬롯 + 감지 워커 프로세스 풀
+    
+    detect()는 블록하지 않는다: 완료된 결과를 모두 회수하고, 빈 슬롯이 있으면 현재 프레임을 넣은 뒤
+    지금까지 완료된 감지 중 가장 최근 프레임의 결과를 반환한다 (워커가 모두 바쁘면 현재 프레임은 건너뜀).
+    """
+    
+    def __init__(self, workers=3, slots=None, detector_config=None, max_age=15):
+        """
+        Args:
+            workers: 감지 프로세스 수 (Pi 5: 메인 루프용 코어 1개를 남기고 3개)
+            slots: 공유 메모리 프레임 슬롯 수 (기본: workers + 1)
+            detector_config: 워커마다 create_detector(**config)로 만들 감지기 설정 (기본: Haar)
+            max_age: 이 프레임 수보다 오래된 결과는 얼굴 없음으로 처리
+        """
+        self.workers = max(1, workers)
+        self.slot_count = slots or self.workers + 1
+        self.detector_config = dict(detector_config or {'backend': 'haar'})
+        self.max_age = max_age
+        
+        # 첫 detect() 시점에는 캡처 / 생체신호 / MQTT / 스케줄러 스레드가 이미 돌고 있으므로
+        # fork (Linux 기본)로 만들면 다른 스레드가 잡고 있던 OpenCV / libcamera 락이 자식에서 풀리지 않아
+        # 멈출 수 있다 -> 깨끗한 서버 프로세스에서 fork하는 forkserver 사용 (없는 플랫폼은 spawn)
+        start_method = 'forkserver' if 'forkserver' in mp.get_all_start_methods() else 'spawn'
+        self.context = mp.get_context(start_method)
+        self.shm = None
+        self.slot_bytes = 0
+        self.processes = []
+        self.tasks = None
+        self.results = None
+        self.free_slots = []
+        self.submit_times = {}  # 순번 -> 넣은 시각 (지연 측정용)
+        
+        # 프레임 순번 / 가장 최근 완료 결과
+        self.seq = 0
+        self.latest_seq = -1
+        self.latest_bbox = None
+        
+        # 통계
+        self.submitted = 0
+        self.completed = 0
+        self.skipped = 0  # 빈 슬롯이 없어 건너뛴 프레임
+        self.stale = 0  # 늦게 도착해서 버린 결과 (더 최근 결과가 이미 있음)
+        self.latency = 0.0  # 마지막 결과의 넣기 -> 회수 (초)
+        self.detect_time = 0.0  # 마지막 결과의 워커 감지 시간 (초)
+    
+    def _start(self, frame_bytes):
+        """첫 프레임 크기에 맞춰 공유 메모리와 워커 시작 (더 큰 프레임이 오면 다시 시작)"""
+        self.close()
+        self.slot_bytes = frame_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.slot_count)
+        self.tasks = self.context.Queue()
+        self.results = self.context.Queue()
+        self.free_slots = list(range(self.slot_count))
+        self.submit_times = {}
+        self.processes = [
+            self.context.Process(
+                target=_detect_worker,
+                args=(self.shm.name, self.slot_bytes, self.tasks, self.results, self.detector_config),
+                daemon=True
+            )
+            for _ in range(self.workers)
+        ]
+        for process in self.processes:
+            process.start()
+    
+    def _collect(self, block=False, timeout=None):
+        """완료된 결과 회수 (슬롯 반환, 더 최근 프레임 결과면 채택)"""
+        while True:
+            try:
+                seq, slot, bbox, detect_time = self.results.get(block, timeout)
+            except queue.Empty:
+                return
+            block = False
+            self.free_slots.append(slot)
+            self.completed += 1
+            self.detect_time = detect_time
+            submitted = self.submit_times.pop(seq, None)
+            if submitted is not None:
+                self.latency = time.perf_counter() - submitted
+            if seq > self.latest_seq:
+                self.latest_seq = seq
+                self.latest_bbox = bbox
+            else:
+                self.stale += 1
+    
+    def submit(self, gray, scale=(1.0, 1.0)):
+        """그레이 프레임 하나를 빈 슬롯에 복사해서 감지 요청 (슬롯이 없으면 건너뛰고 -1 반환)"""
+        gray = np.ascontiguousarray(gray, dtype=np.uint8)
+        if self.shm is None or gray.nbytes > self.slot_bytes:
+            self._start(gray.nbytes)
+        
+        seq = self.seq
+        self.seq += 1
+        if not self.free_slots:
+            self.skipped += 1
+            return -1
+        
+        slot = self.free_slots.pop()
+        height, width = gray.shape[:2]
+        view = np.ndarray((height, width), dtype=np.uint8, buffer=self.shm.buf,
+                          offset=slot * self.slot_bytes)
+        np.copyto(view, gray)
+        del view
+        self.submit_times[seq] = time.perf_counter()
+        self.tasks.put((seq, slot, height, width, float(scale[0]), float(scale[1])))
+        self.submitted += 1
+        return seq
+    
+    def detect(self, gray, scale=(1.0, 1.0)):
+        """
+        현재 프레임 감지 요청 + 가장 최근 완료 결과 반환 (블록하지 않음)
+        
+        Args:
+            gray: 감지용 그레이 이미지 (main 또는 lores)
+            scale: 그레이 -> main 좌표 비율 (x, y)
+        
+        Returns:
+            main 좌표 (x, y, w, h) 또는 None (아직 결과가 없거나 max_age보다 오래됨)
+        """
+        if self.shm is not None:
+            self._collect()
+        self.submit(gray, scale)
+        if self.latest_seq < 0 or self.seq - 1 - self.latest_seq > self.max_age:
+            return None
+        return self.latest_bbox
+    
+    def detect_sync(self, gray, scale=(1.0, 1.0), timeout=5.0):
+        """현재 프레임 결과를 기다려서 반환 (벤치마크 / 정확도 비교용)"""
+        if self.shm is not None:
+            self._collect()
+        seq = self.submit(gray, scale)
+        while seq < 0:
+            self._collect(block=True, timeout=timeout)
+            seq = self.submit(gray, scale)
+        deadline = time.perf_counter() + timeout
+        while self.latest_seq < seq and time.perf_counter() < deadline:
+            self._collect(block=True, timeout=timeout)
+        return self.latest_bbox if self.latest_seq == seq else None
+    
+    def get_stats(self):
+        """풀 통계"""
+        return {
+            'workers': self.workers,
+            'slots': self.slot_count,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'skipped': self.skipped,
+            'stale': self.stale,
+            'age': self.seq - 1 - self.latest_seq if self.latest_seq >= 0 else None,
+            'latency_ms': round(self.latency * 1000, 3),
+            'detect_ms': round(self.detect_time * 1000, 3)
+        }
+    
+    def format_summary(self, stats=None):
+        """요약 텍스트"""
+        stats = stats or self.get_stats()
+        age = '-' if stats['age'] is None else stats['age']
+        return (f"🧩 Detection pool: {stats['workers']} {self.detector_config['backend']} workers | "
+                f"result age {age} frames | "
+                f"skipped {stats['skipped']}/{stats['submitted'] + stats['skipped']} | "
+                f"latency {stats['latency_ms']:.1f} ms (detect {stats['detect_ms']:.1f} ms)")
+    
+    def close(self):
+        """워커 종료 + 공유 메모리 해제"""
+        if self.shm is None:
+            return
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
+        self.tasks.close()
+        self.results.close()
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+얼굴 감지기 백엔드 벤치마크
+face.mp4 / output.mp4 등 녹화 영상에서 haar / dnn / tflite 백엔드의 워밍업 시간, 프레임당 지연,
+감지율, 기준 백엔드 대비 일치도 (IoU)를 비교
+저장소에 정답 라벨이 없으므로 정확도는 --reference 백엔드 결과와의 IoU 일치로 측정
+--batch: 여러 영상을 동시 스트림처럼 같은 순서로 묶어 배치 추론 비용 비교
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from face_detectors import BACKENDS, create_detector
+
+
+def load_frames(path, max_frames, lores_size):
+    """영상 -> 감지용 그레이 프레임 목록 + main 좌표 비율"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    scale = (1.0, 1.0)
+    while max_frames <= 0 or len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if lores_size:
+            scale = (gray.shape[1] / lores_size[0], gray.shape[0] / lores_size[1])
+            gray = cv2.resize(gray, lores_size, interpolation=cv2.INTER_AREA)
+        frames.append(gray)
+    cap.release()
+    return frames, scale
+
+
+def iou(a, b):
+    """두 (x, y, w, h) bbox의 IoU"""
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(0, x1 - x0) * max(0, y1 - y0)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union > 0 else 0.0
+
+
+def run_backend(detector, frames, scale):
+    """프레임별 감지 -> (bbox 목록, 프레임당 ms 목록)"""
+    boxes = []
+    times = []
+    for gray in frames:
+        start = time.perf_counter()
+        boxes.append(detector.detect(gray, scale))
+        times.append((time.perf_counter() - start) * 1000)
+    return boxes, times
+
+
+def agreement(boxes, reference, threshold=0.5):
+    """기준 결과 대비 (일치율 %, 평균 IoU, 오검출 프레임 수)"""
+    matched = 0
+    ious = []
+    false_alarms = 0
+    ref_frames = 0
+    for box, ref in zip(boxes, reference):
+        if ref is None:
+            false_alarms += box is not None
+            continue
+        ref_frames += 1
+        if box is not None:
+            value = iou(box, ref)
+            ious.append(value)
+            matched += value >= threshold
+    rate = matched / ref_frames * 100 if ref_frames else 0.0
+    return rate, float(np.mean(ious)) if ious else 0.0, false_alarms
+
+
+def make_detectors(args):
+    """요청한 백엔드 생성 + 워밍업 (모델 / 런타임이 없으면 건너뜀)"""
+    configs = {
+        'haar': {'backend': 'haar'},
+        'dnn': {'backend': 'dnn', 'model': args.dnn_model, 'config': args.dnn_config},
+        'tflite': {'backend': 'tflite', 'model': args.tflite_model},
+    }
+    detectors = {}
+    for backend in args.backends:
+        try:
+            detector = create_detector(input_size=args.input_size, threads=args.threads, **configs[backend])
+        except RuntimeError as e:
+            print(f"⚠️ {backend}: skipped ({e})")
+            continue
+        detector.warmup()
+        detectors[backend] = detector
+    return detectors
+
+
+def compare_backends(args, detectors):
+    """영상별 / 백엔드별 지연 + 감지율 + 기준 대비 일치도"""
+    reference = args.reference if args.reference in detectors else next(iter(detectors))
+    
+    for video in args.videos:
+        frames, scale = load_frames(video, args.max_frames, args.lores)
+        if not frames:
+            print(f"✗ {video}: no frames")
+            continue
+        
+        results = {backend: run_backend(detector, frames, scale) for backend, detector in detectors.items()}
+        ref_boxes = results[reference][0]
+        
+        print("\n" + "="*78)
+        print(f"🎬 {video}: {len(frames)} frames ({frames[0].shape[1]}x{frames[0].shape[0]}) | "
+              f"reference: {reference}")
+        print("-"*78)
+        print(f"{'backend':<9}{'warm-up ms':>11}{'p50 ms':>9}{'p95 ms':>9}{'face %':>9}"
+              f"{'agree %':>10}{'mean IoU':>10}{'extra':>7}")
+        for backend, (boxes, times) in results.items():
+            p50, p95 = np.percentile(times, [50, 95])
+            face_rate = sum(box is not None for box in boxes) / len(boxes) * 100
+            rate, mean_iou, false_alarms = agreement(boxes, ref_boxes)
+            print(f"{backend:<9}{detectors[backend].warmup_ms:>11.1f}{p50:>9.2f}{p95:>9.2f}{face_rate:>9.1f}"
+                  f"{rate:>10.1f}{mean_iou:>10.3f}{false_alarms:>7}")
+        print("="*78)
+
+
+def compare_batch(args, detectors):
+    """여러 영상을 동시 스트림으로 묶어 detect_batch vs 한 장씩 detect 비교"""
+    streams = [load_frames(video, args.max_frames, args.lores) for video in args.videos]
+    streams = [(frames, scale) for frames, scale in streams if frames]
+    if not streams:
+        print("✗ no frames")
+        return
+    steps = min(len(frames) for frames, _ in streams)
+    scales = [scale for _, scale in streams]
+    
+    print("\n" + "="*60)
+    print(f"📦 Batch: {len(streams)} streams x {steps} steps")
+    print(f"{'backend':<9}{'native':>8}{'single ms':>12}{'batch ms':>11}{'speedup':>10}")
+    for backend, detector in detectors.items():
+        single = 0.0
+        batch = 0.0
+        for i in range(steps):
+            images = [frames[i] for frames, _ in streams]
+            start = time.perf_counter()
+            for image, scale in zip(images, scales):
+                detector.detect(image, scale)
+            single += time.perf_counter() - start
+            
+            start = time.perf_counter()
+            detector.detect_batch(images, scales)
+            batch += time.perf_counter() - start
+        single_ms = single / steps * 1000
+        batch_ms = batch / steps * 1000
+        print(f"{backend:<9}{str(detector.batch_native):>8}{single_ms:>12.2f}{batch_ms:>11.2f}"
+              f"{single_ms / batch_ms:>9.2f}x")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Face detector backend benchmark on recorded video')
+    parser.add_argument('videos', nargs='*', default=['face.mp4', 'output.mp4'],
+                        help='Video files (default: face.mp4 output.mp4)')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS),
+                        help='Backends to compare (default: all available)')
+    parser.add_argument('--dnn-model', default=None, help='YuNet .onnx or SSD .caffemodel')
+    parser.add_argument('--dnn-config', default=None, help='SSD deploy.prototxt (default: next to the model)')
+    parser.add_argument('--tflite-model', default=None, help='SSD face .tflite model')
+    parser.add_argument('--input-size', metavar='WxH', default=None,
+                        help='Detector input size (default: frame / lores size)')
+    parser.add_argument('--threads', type=int, default=None, help='Inference threads')
+    parser.add_argument('--lores', metavar='WxH', default=None,
+                        help='Detect on a downscaled gray image of this size (as the trackers do)')
+    parser.add_argument('--reference', choices=BACKENDS, default='dnn',
+                        help='Backend used as the accuracy reference (default: dnn, else the first available)')
+    parser.add_argument('--max-frames', type=int, default=0, help='Frames per video (0 = all)')
+    parser.add_argument('--batch', action='store_true', help='Also compare batched inference across the videos')
+    args = parser.parse_args()
+    args.input_size = tuple(int(v) for v in args.input_size.split('x')) if args.input_size else None
+    args.lores = tuple(int(v) for v in args.lores.split('x')) if args.lores else None
+    
+    detectors = make_detectors(args)
+    if not detectors:
+        print("✗ No detector backend available")
+        raise SystemExit(1)
+    
+    compare_backends(args, detectors)
+    if args.batch:
+        compare_batch(args, detectors)
@@ -57,6 +57,7 @@ if IS_RASPBERRY_PI:
 
 from mqtt_sensor_sender import MQTTSensorSender
 import mqtt_config
+from scheduler import get_scheduler
 
 # GPIO 설정
 DHT_PIN = 22  # 온습도 센서 GPIO 핀
@@ -98,18 +99,24 @@ class DHTSensor:
         # 데이터 버퍼 (5초 = 약 2-3개 샘플)
         self.temp_buffer = deque(maxlen=int(AVERAGE_INTERVAL / SAMPLE_INTERVAL) + 1)
         self.humidity_buffer = deque(maxlen=int(AVERAGE_INTERVAL / SAMPLE_INTERVAL) + 1)
+        # sample()은 별도 스레드, 평균 전송은 스케줄러 스레드에서 실행되므로 버퍼 교체 / 추가는 락 안에서
+        self.buffer_lock = threading.Lock()
         
         # MQTT 전송기 초기화
         self.mqtt_sender = MQTTSensorSender(
             broker_host=mqtt_config.MQTT_CONFIG["broker_host"],
             broker_port=mqtt_config.MQTT_CONFIG["broker_port"],
             client_id=f"dht_sensor_{int(time.time())}",
-            topic_prefix=mqtt_config.MQTT_CONFIG["topic_prefix"]
+            topic_prefix=mqtt_config.MQTT_CONFIG["topic_prefix"],
+            codec=mqtt_config.MQTT_CONFIG.get("codec", "json"),
+            topic_codecs=mqtt_config.MQTT_CONFIG.get("topic_codecs"),
+            outbox=mqtt_config.MQTT_CONFIG.get("outbox")
         )
         
-        # 실행 제어
+        # 실행 제어 (샘플링 / 평균 전송은 공용 스케줄러의 주기 작업)
         self.running = False
-        self.thread = None
+        self.scheduler = get_scheduler()
+        self.jobs = []
     
     def read_sensor(self):
         """온습도 센서 값 읽기"""
@@ -135,41 +142,29 @@ class DHTSensor:
             # 센서 읽기 실패는 일반적이므로 조용히 처리
             return None, None
     
-    def collect_data(self):
-        """데이터 수집 및 전송 루프"""
-        last_average_time = time.time()
-        
-        while self.running:
-            try:
-                # 센서 값 읽기
-                humidity, temperature = self.read_sensor()
-                
-                if humidity is not None and temperature is not None:
-                    # 유효한 값만 버퍼에 추가
-                    if 0 <= humidity <= 100 and -40 <= temperature <= 80:
-                        self.humidity_buffer.append(humidity)
-                        self.temp_buffer.append(temperature)
-                
-                # 5초마다 평균 계산 및 전송
-                current_time = time.time()
-                if current_time - last_average_time >= AVERAGE_INTERVAL:
-                    self.calculate_and_send_average()
-                    last_average_time = current_time
-                
-                # 샘플링 간격 대기
-                time.sleep(SAMPLE_INTERVAL)
+    def sample(self):
+        """센서 값 1회 읽기 (SAMPLE_INTERVAL마다 스케줄러가 호출, 읽기가 느릴 수 있어 별도 스레드에서 실행)"""
+        humidity, temperature = self.read_sensor()
                 
-            except Exception as e:
-                print(f"✗ 데이터 수집 오류: {e}")
-                time.sleep(1)
+        if humidity is not None and temperature is not None:
+            # 유효한 값만 버퍼에 추가
+            if 0 <= humidity <= 100 and -40 <= temperature <= 80:
+                with self.buffer_lock:
+                    self.humidity_buffer.append(humidity)
+                    self.temp_buffer.append(temperature)
     
     def calculate_and_send_average(self):
         """5초 평균 계산 및 MQTT 전송"""
         mode_text = f" ({self.dht_lib})" if self.sensor_mode.startswith("real") else " (Mock)"
         
+        # 버퍼를 새 버퍼로 교체 (평균 계산 중에 들어온 샘플은 다음 평균에 포함, 온도 / 습도 샘플 수 일치)
+        with self.buffer_lock:
+            temp_samples, self.temp_buffer = self.temp_buffer, deque(maxlen=self.temp_buffer.maxlen)
+            humidity_samples, self.humidity_buffer = self.humidity_buffer, deque(maxlen=self.humidity_buffer.maxlen)
+        
         # 온도 평균 계산 및 전송
-        if self.temp_buffer:
-            avg_temp = np.mean(list(self.temp_buffer))
+        if temp_samples:
+            avg_temp = np.mean(temp_samples)
             
             # 온도 데이터 생성
             temp_data = {
@@ -177,20 +172,19 @@ class DHTSensor:
                 "timestamp": datetime.now().isoformat(),
                 "data": round(avg_temp, 1),
                 "unit": "°C",
-                "samples": len(self.temp_buffer),
+                "samples": len(temp_samples),
                 "device_mode": self.sensor_mode,
                 "dht_lib": self.dht_lib if self.dht_available else "none"
             }
             
-            # MQTT로 전송
-            if self.mqtt_sender.connected:
-                topic = f"{mqtt_config.MQTT_CONFIG['topic_prefix']}/temperature"
-                self.mqtt_sender.publish_message(topic, temp_data)
-                print(f"🌡️ 평균 온도{mode_text}: {round(avg_temp, 1)}°C (샘플: {len(self.temp_buffer)}개)")
+            # MQTT로 전송 (브로커가 끊긴 동안은 outbox에 저장)
+            topic = f"{mqtt_config.MQTT_CONFIG['topic_prefix']}/temperature"
+            if self.mqtt_sender.publish_message(topic, temp_data):
+                print(f"🌡️ 평균 온도{mode_text}: {round(avg_temp, 1)}°C (샘플: {len(temp_samples)}개)")
         
         # 습도 평균 계산 및 전송
-        if self.humidity_buffer:
-            avg_humidity = np.mean(list(self.humidity_buffer))
+        if humidity_samples:
+            avg_humidity = np.mean(humidity_samples)
             
             # 습도 데이터 생성
             humidity_data = {
@@ -198,20 +192,15 @@ class DHTSensor:
                 "timestamp": datetime.now().isoformat(),
                 "data": round(avg_humidity, 1),
                 "unit": "%",
-                "samples": len(self.humidity_buffer),
+                "samples": len(humidity_samples),
                 "device_mode": self.sensor_mode,
                 "dht_lib": self.dht_lib if self.dht_available else "none"
             }
             
-            # MQTT로 전송
-            if self.mqtt_sender.connected:
-                topic = f"{mqtt_config.MQTT_CONFIG['topic_prefix']}/humidity"
-                self.mqtt_sender.publish_message(topic, humidity_data)
-                print(f"💧 평균 습도{mode_text}: {round(avg_humidity, 1)}% (샘플: {len(self.humidity_buffer)}개)")
-        
-        # 버퍼 초기화
-        self.temp_buffer.clear()
-        self.humidity_buffer.clear()
+            # MQTT로 전송 (브로커가 끊긴 동안은 outbox에 저장)
+            topic = f"{mqtt_config.MQTT_CONFIG['topic_prefix']}/humidity"
+            if self.mqtt_sender.publish_message(topic, humidity_data):
+                print(f"💧 평균 습도{mode_text}: {round(avg_humidity, 1)}% (샘플: {len(humidity_samples)}개)")
     
     def start(self):
         """센서 모니터링 시작"""
@@ -224,10 +213,12 @@ class DHTSensor:
             print("✗ MQTT 연결 실패")
             return False
         
+        # 샘플링 / 5초 평균 전송 작업 등록 (같은 간격의 다른 센서 작업과 같은 틱에 실행)
         self.running = True
-        self.thread = threading.Thread(target=self.collect_data)
-        self.thread.daemon = True
-        self.thread.start()
+        self.jobs = [
+            self.scheduler.every(SAMPLE_INTERVAL, self.sample, name="dht_sample", offload=True),
+            self.scheduler.every(AVERAGE_INTERVAL, self.calculate_and_send_average, name="dht_average")
+        ]
         
         print(f"🚀 온습도 센서 모니터링 시작 ({self.sensor_mode}, GPIO {DHT_PIN})")
         return True
@@ -235,8 +226,9 @@ class DHTSensor:
     def stop(self):
         """센서 모니터링 중지"""
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=2.0)
+        for job in self.jobs:
+            job.cancel()
+        self.jobs = []
         
         # MQTT 연결 해제
         self.mqtt_sender.disconnect()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+얼굴 감지기 백엔드
+공통 인터페이스 (detect / detect_batch / warmup) 뒤에 세 가지 구현
+  haar   - OpenCV Haar cascade (기존 방식, 모델 파일 불필요)
+  dnn    - OpenCV DNN: YuNet (.onnx, cv2.FaceDetectorYN) 또는 ResNet-10 SSD (.caffemodel + deploy.prototxt)
+  tflite - tflite_runtime SSD 계열 얼굴 모델 (TFLite_Detection_PostProcess 출력: boxes / classes / scores / count)
+입력은 감지용 그레이 (lores 가능, DNN / TFLite는 3채널로 복제) 또는 BGR 이미지
+input_size를 주면 그 크기로 줄여서 감지하고, bbox는 항상 scale을 곱한 main 좌표로 반환
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+from imx500_postprocess import nms
+
+# TFLite 런타임 (Pi: tflite-runtime, 개발 PC: tensorflow) - 없으면 tflite 백엔드만 사용 불가
+try:
+    from tflite_runtime.interpreter import Interpreter
+    TFLITE_AVAILABLE = True
+except ImportError:
+    try:
+        from tensorflow.lite import Interpreter
+        TFLITE_AVAILABLE = True
+    except ImportError:
+        Interpreter = None
+        TFLITE_AVAILABLE = False
+
+BACKENDS = ('haar', 'dnn', 'tflite')
+
+DEFAULT_CASCADE = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+
+def largest_face(faces, scale):
+    """[(x, y, w, h, score)] 중 가장 큰 얼굴 -> main 좌표 (x, y, w, h) (없으면 None)"""
+    if len(faces) == 0:
+        return None
+    x, y, w, h, _ = max(faces, key=lambda f: f[2] * f[3])
+    scale_x, scale_y = scale
+    return (int(x * scale_x), int(y * scale_y), int(w * scale_x), int(h * scale_y))
+
+
+class FaceDetector:
+    """감지기 공통 인터페이스
+    
+    백엔드는 _detect_images(images, scales, size_range)만 구현한다.
+    images는 input_size로 줄인 이미지 목록, 반환은 이미지별 [(x, y, w, h, score)] (이미지 좌표).
+    size_range ((min_w, min_h), (max_w, max_h), 이미지 좌표)는 Haar처럼 탐색 크기를 줄일 수 있는 백엔드만 사용하고
+    결과 크기 필터는 공통으로 적용한다.
+    """
+    
+    name = 'base'
+    
+    def __init__(self, input_size=None, min_size=80, score_threshold=0.6):
+        """
+        Args:
+            input_size: 감지 입력 크기 (w, h) - None이면 받은 이미지 크기 그대로
+            min_size: 최소 얼굴 크기 (main 좌표 px)
+            score_threshold: 최소 신뢰도 (DNN / TFLite)
+        """
+        self.input_size = tuple(input_size) if input_size else None
+        self.min_size = min_size
+        self.score_threshold = score_threshold
+        self.batch_native = False  # 여러 이미지를 추론 한 번으로 처리하는지
+        self.warmup_ms = None
+    
+    def _prepare(self, image, scale):
+        """input_size로 축소 (scale도 같은 비율로 보정)"""
+        if self.input_size is None:
+            return image, scale
+        width, height = self.input_size
+        if image.shape[1] == width and image.shape[0] == height:
+            return image, scale
+        resized = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        return resized, (scale[0] * image.shape[1] / width, scale[1] * image.shape[0] / height)
+    
+    def _detect_images(self, images, scales, size_range=None):
+        raise NotImplementedError
+    
+    def detect_batch(self, images, scales=None):
+        """
+        여러 스트림 이미지 감지 (백엔드가 지원하면 추론 한 번)
+        
+        Args:
+            images: 그레이 또는 BGR 이미지 목록
+            scales: 이미지별 main 좌표 비율 (x, y) (None이면 모두 1)
+        
+        Returns:
+            이미지별 가장 큰 얼굴 main 좌표 (x, y, w, h) 또는 None
+        """
+        scales = scales or [(1.0, 1.0)] * len(images)
+        prepared = [self._prepare(image, scale) for image, scale in zip(images, scales)]
+        images = [image for image, _ in prepared]
+        scales = [scale for _, scale in prepared]
+        
+        results = []
+        for faces, scale in zip(self._detect_images(images, scales), scales):
+            # 최소 크기 (main 좌표) 필터
+            faces = [f for f in faces
+                     if f[2] * scale[0] >= self.min_size and f[3] * scale[1] >= self.min_size]
+            results.append(largest_face(faces, scale))
+        return results
+    
+    def detect(self, image, scale=(1.0, 1.0)):
+        """이미지 하나 감지 -> 가장 큰 얼굴 main 좌표 (x, y, w, h) 또는 None"""
+        return self.detect_batch([image], [scale])[0]
+    
+    def detect_window(self, image, window, scale=(1.0, 1.0), min_size=None, max_size=None):
+        """
+        이미지의 일부 영역만 감지 (SearchWindowDetector 탐색 창)
+        
+        crop은 이미 작으므로 input_size로 줄이지 않는다 (DNN / TFLite는 모델 입력 크기로 맞춤).
+        
+        Args:
+            image: 감지용 그레이 또는 BGR 이미지 (main 또는 lores)
+            window: 탐색 영역 (x0, y0, x1, y1) 이미지 좌표
+            scale: (main 폭 / image 폭, main 높이 / image 높이)
+            min_size, max_size: 얼굴 크기 제한 (w, h) 이미지 좌표 (None이면 min_size 설정만)
+        
+        Returns:
+            가장 큰 얼굴 main 좌표 (x, y, w, h) 또는 None
+        """
+        x0, y0, x1, y1 = window
+        scale_x, scale_y = scale
+        min_size = min_size or (int(self.min_size / scale_x), int(self.min_size / scale_y))
+        faces = self._detect_images([image[y0:y1, x0:x1]], [scale], (min_size, max_size))[0]
+        faces = [(x + x0, y + y0, w, h, score) for x, y, w, h, score in faces
+                 if w >= min_size[0] and h >= min_size[1]
+                 and (max_size is None or (w <= max_size[0] and h <= max_size[1]))]
+        return largest_face(faces, scale)
+    
+    def warmup(self, iterations=3, shape=(480, 640)):
+        """시작 시 빈 프레임으로 몇 번 추론 (첫 추론의 메모리 할당 / 커널 준비 비용을 미리 지불)
+        
+        Returns:
+            첫 추론 시간 (ms)
+        """
+        height, width = shape
+        if self.input_size:
+            width, height = self.input_size
+        image = np.zeros((height, width), dtype=np.uint8)
+        for i in range(max(1, iterations)):
+            start = time.perf_counter()
+            self.detect(image)
+            if i == 0:
+                self.warmup_ms = (time.perf_counter() - start) * 1000
+        return self.warmup_ms
+
+
+class HaarDetector(FaceDetector):
+    """OpenCV Haar cascade (기존 detect_face와 같은 설정)"""
+    
+    name = 'haar'
+    
+    def __init__(self, cascade_path=DEFAULT_CASCADE, scale_factor=1.1, min_neighbors=5, **kwargs):
+        super().__init__(**kwargs)
+        self.cascade = cv2.CascadeClassifier(cascade_path)
+        if self.cascade.empty():
+            raise RuntimeError(f"Failed to load Haar cascade: {cascade_path}")
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+    
+    def _detect_images(self, images, scales, size_range=None):
+        results = []
+        for image, (scale_x, scale_y) in zip(images, scales):
+            gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            # 탐색 창: 직전 얼굴 크기 근처만 검색 (스케일 단계 수 감소)
+            min_size, max_size = size_range or (None, None)
+            faces = self.cascade.detectMultiScale(
+                gray, scaleFactor=self.scale_factor, minNeighbors=self.min_neighbors,
+                minSize=min_size or (int(self.min_size / scale_x), int(self.min_size / scale_y)),
+                maxSize=max_size or (0, 0)
+            )
+            results.append([(x, y, w, h, 1.0) for x, y, w, h in faces])
+        return results
+
+
+class DNNDetector(FaceDetector):
+    """OpenCV DNN 얼굴 감지
+    
+    .onnx: YuNet (cv2.FaceDetectorYN, 입력 크기 자유)
+    그 외: ResNet-10 SSD (Caffe, 300x300 기본) - blobFromImages로 여러 이미지를 한 번에 추론
+    """
+    
+    name = 'dnn'
+    
+    # ResNet-10 SSD 입력 평균 (BGR)
+    SSD_MEAN = (104.0, 177.0, 123.0)
+    
+    def __init__(self, model, config=None, threads=None, nms_threshold=0.3, **kwargs):
+        """
+        Args:
+            model: YuNet .onnx 또는 SSD .caffemodel
+            config: SSD deploy.prototxt (None이면 모델과 같은 폴더)
+            threads: OpenCV 스레드 수 (전역 설정)
+            nms_threshold: YuNet NMS 임계값
+        """
+        super().__init__(**kwargs)
+        if not os.path.exists(model):
+            raise RuntimeError(f"DNN model not found: {model}")
+        if threads:
+            cv2.setNumThreads(threads)
+        
+        if model.endswith('.onnx'):
+            self.kind = 'yunet'
+            self.net = cv2.FaceDetectorYN.create(model, "", (320, 320), self.score_threshold, nms_threshold)
+            self.net_size = None
+        else:
+            self.kind = 'ssd'
+            config = config or os.path.join(os.path.dirname(model), 'deploy.prototxt')
+            self.net = cv2.dnn.readNet(model, config)
+            self.blob_size = self.input_size or (300, 300)
+            self.batch_native = True
+    
+    def _detect_images(self, images, scales, size_range=None):
+        images = [cv2.cvtColor(image, cv2.COLOR_GRAY2BGR) if image.ndim == 2 else image for image in images]
+        if self.kind == 'yunet':
+            return [self._detect_yunet(image) for image in images]
+        return self._detect_ssd(images)
+    
+    def _detect_yunet(self, image):
+        """YuNet 한 장 (출력 행: x, y, w, h, 랜드마크 10개, 점수)"""
+        size = (image.shape[1], image.shape[0])
+        if size != self.net_size:
+            self.net.setInputSize(size)
+            self.net_size = size
+        _, faces = self.net.detect(image)
+        if faces is None:
+            return []
+        return [(int(f[0]), int(f[1]), int(f[2]), int(f[3]), float(f[-1])) for f in faces]
+    
+    def _detect_ssd(self, images):
+        """SSD 배치 추론 (출력 행: 이미지 번호, 클래스, 점수, x0, y0, x1, y1 정규화 좌표)"""
+        blob = cv2.dnn.blobFromImages(images, 1.0, self.blob_size, self.SSD_MEAN)
+        self.net.setInput(blob)
+        detections = self.net.forward().reshape(-1, 7)
+        
+        results = [[] for _ in images]
+        for image_id, _, score, x0, y0, x1, y1 in detections:
+            if score < self.score_threshold or not 0 <= image_id < len(images):
+                continue
+            height, width = images[int(image_id)].shape[:2]
+            x0, x1 = max(0.0, x0) * width, min(1.0, x1) * width
+            y0, y1 = max(0.0, y0) * height, min(1.0, y1) * height
+            if x1 > x0 and y1 > y0:
+                results[int(image_id)].append((int(x0), int(y0), int(x1 - x0), int(y1 - y0), float(score)))
+        return results
+
+
+class TFLiteDetector(FaceDetector):
+    """TFLite SSD 계열 얼굴 모델 (TFLite_Detection_PostProcess 출력)
+    
+    입력 크기는 모델 값 (input_size를 주면 resize_tensor_input 시도),
+    여러 이미지는 배치 차원을 늘려 한 번에 추론하고 모델이 지원하지 않으면 한 장씩 처리
+    """
+    
+    name = 'tflite'
+    
+    def __init__(self, model, threads=2, **kwargs):
+        """
+        Args:
+            model: .tflite 모델
+            threads: 인터프리터 스레드 수
+        """
+        if not TFLITE_AVAILABLE:
+            raise RuntimeError("tflite_runtime is not installed")
+        if not os.path.exists(model):
+            raise RuntimeError(f"TFLite model not found: {model}")
+        super().__init__(**kwargs)
+        self.interpreter = Interpreter(model_path=model, num_threads=threads)
+        detail = self.interpreter.get_input_details()[0]
+        self.input_index = detail['index']
+        self.input_dtype = detail['dtype']
+        _, height, width, _ = detail['shape']
+        self.net_size = (int(width), int(height))
+        self.batch = 1
+        self.batch_native = True
+        if self.input_size and self.input_size != self.net_size:
+            self.interpreter.resize_tensor_input(self.input_index, [1, self.input_size[1], self.input_size[0], 3])
+            self.net_size = self.input_size
+        self.interpreter.allocate_tensors()
+    
+    def _set_batch(self, batch):
+        """입력 배치 크기 변경 (실패하면 이후 한 장씩 처리)"""
+        if batch == self.batch:
+            return True
+        width, height = self.net_size
+        try:
+            self.interpreter.resize_tensor_input(self.input_index, [batch, height, width, 3])
+            self.interpreter.allocate_tensors()
+            self.batch = batch
+            return True
+        except (RuntimeError, ValueError):
+            self.batch_native = False
+            self.interpreter.resize_tensor_input(self.input_index, [1, height, width, 3])
+            self.interpreter.allocate_tensors()
+            self.batch = 1
+            return False
+    
+    def _input_tensor(self, images):
+        """이미지 -> 모델 입력 (RGB, 모델 크기, uint8 또는 [-1, 1] float)"""
+        batch = []
+        for image in images:
+            rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB) if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            batch.append(cv2.resize(rgb, self.net_size, interpolation=cv2.INTER_AREA))
+        tensor = np.stack(batch)
+        if self.input_dtype == np.uint8:
+            return tensor
+        return ((tensor.astype(np.float32) - 127.5) / 127.5).astype(self.input_dtype)
+    
+    def _outputs(self):
+        """출력 텐서 -> (boxes [B,N,4], scores [B,N]) - 출력 순서는 모델마다 달라 모양으로 구분"""
+        boxes = None
+        candidates = []
+        for detail in self.interpreter.get_output_details():
+            tensor = self.interpreter.get_tensor(detail['index'])
+            if tensor.ndim == 3 and tensor.shape[-1] == 4:
+                boxes = tensor
+            elif tensor.ndim == 2:
+                candidates.append(tensor)
+        # classes는 정수값, scores는 [0, 1] 실수값
+        scores = next((c for c in candidates if not np.all(np.equal(np.mod(c, 1), 0))), None)
+        if scores is None and candidates:
+            scores = candidates[-1]
+        return boxes, scores
+    
+    def _run(self, images):
+        """한 번 추론"""
+        self.interpreter.set_tensor(self.input_index, self._input_tensor(images))
+        self.interpreter.invoke()
+        boxes, scores = self._outputs()
+        
+        results = []
+        for i, image in enumerate(images):
+            height, width = image.shape[:2]
+            keep = scores[i] >= self.score_threshold
+            image_boxes = np.clip(boxes[i][keep], 0.0, 1.0)  # (y0, x0, y1, x1) 정규화
+            image_scores = scores[i][keep]
+            faces = []
+            for j in nms(image_boxes, image_scores):
+                y0, x0, y1, x1 = image_boxes[j]
+                faces.append((int(x0 * width), int(y0 * height),
+                              int((x1 - x0) * width), int((y1 - y0) * height), float(image_scores[j])))
+            results.append(faces)
+        return results
+    
+    def _detect_images(self, images, scales, size_range=None):
+        if len(images) > 1 and self.batch_native and self._set_batch(len(images)):
+            return self._run(images)
+        self._set_batch(1)
+        return [self._run([image])[0] for image in images]
+
+
+def create_detector(backend='haar', model=None, config=None, input_size=None, threads=None, **kwargs):
+    """
+    백엔드 이름으로 감지기 생성
+    
+    Args:
+        backend: 'haar', 'dnn', 'tflite'
+        model: DNN / TFLite 모델 파일 (haar는 cascade 파일, None이면 OpenCV 기본)
+        config: SSD deploy.prototxt (dnn)
+        input_size: 감지 입력 크기 (w, h)
+        threads: 추론 스레드 수 (dnn: OpenCV 전역, tflite: 인터프리터)
+        **kwargs: min_size, score_threshold 등 FaceDetector 설정
+    """
+    if backend == 'haar':
+        return HaarDetector(cascade_path=model or DEFAULT_CASCADE, input_size=input_size, **kwargs)
+    if backend == 'dnn':
+        if not model:
+            raise RuntimeError("dnn backend needs a model (YuNet .onnx or SSD .caffemodel)")
+        return DNNDetector(model, config=config, threads=threads, input_size=input_size, **kwargs)
+    if backend == 'tflite':
+        if not model:
+            raise RuntimeError("tflite backend needs a .tflite model")
+        return TFLiteDetector(model, threads=threads or 2, input_size=input_size, **kwargs)
+    raise ValueError(f"Unknown detector backend: {backend} (choose from {BACKENDS})")
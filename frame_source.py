@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+프레임 소스
+AICamera와 같은 인터페이스 (start / read_latest / gray / roi_bgr / to_bgr / release)로
+녹화 영상 파일이나 OpenCV 카메라를 읽어 Picamera2 없이 파이프라인을 구동
+"""
+
+import time
+
+import cv2
+
+
+class OpenCVFrameSource:
+    """cv2.VideoCapture 기반 프레임 소스 (영상 파일 재생 / USB 카메라)"""
+    
+    def __init__(self, source, fps=None, lores_size=None, realtime=False, loop=False):
+        """
+        Args:
+            source: 영상 파일 경로 또는 카메라 번호 (int 또는 숫자 문자열)
+            fps: 프레임레이트 (None이면 파일 값, 없으면 30)
+            lores_size: (w, h) - 지정하면 감지용 그레이를 이 크기로 줄여 info['lores']에 제공
+            realtime: True면 파일을 원래 속도로 재생, False면 최대 속도
+            loop: True면 파일 끝에서 처음으로 되감기
+        """
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        self.source = source
+        self.is_file = not isinstance(source, int)
+        self.requested_fps = fps
+        self.lores_size = tuple(lores_size) if lores_size else None
+        self.realtime = realtime
+        self.loop = loop
+        
+        self.cap = None
+        self.started = False
+        self.width = 0
+        self.height = 0
+        self.fps = fps or 30
+        self.capture_format = "bgr"
+        
+        # 프레임 정보 (AICamera와 동일한 키)
+        self.frame_seq = 0
+        self.dropped_frames = 0
+        self.loop_count = 0
+        self.start_time = None
+    
+    def start(self):
+        """소스 열기"""
+        self.cap = cv2.VideoCapture(self.source)
+        if not self.cap.isOpened():
+            print(f"✗ Failed to open frame source: {self.source}")
+            return False
+        
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        file_fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = self.requested_fps or (file_fps if file_fps > 0 else 30)
+        self.started = True
+        self.start_time = time.perf_counter()
+        
+        mode_text = "realtime" if self.realtime or not self.is_file else "max speed"
+        print(f"✓ Frame source started: {self.source} {self.width}x{self.height} @ "
+              f"{self.fps:.0f}fps ({mode_text})")
+        return True
+    
+    def read_latest(self, timeout=1.0):
+        """
+        다음 프레임 읽기 (AICamera.read_latest 호환)
+        
+        Returns:
+            (ret, frame, info) - info: seq, timestamp, dropped, metadata, lores
+            파일 소스의 timestamp는 영상 시각 (재생 속도와 무관)
+        """
+        if not self.started:
+            return False, None, None
+        
+        ret, frame = self.cap.read()
+        if not ret and self.is_file and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            self.loop_count += 1
+            ret, frame = self.cap.read()
+        if not ret:
+            return False, None, None
+        
+        self.frame_seq += 1
+        if self.is_file:
+            # 되감기해도 시간이 거꾸로 가지 않도록 프레임 번호로 계산
+            timestamp = self.frame_seq / self.fps
+            if self.realtime:
+                delay = self.start_time + timestamp - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        else:
+            timestamp = time.time()
+        
+        lores = None
+        if self.lores_size:
+            lores = cv2.resize(self.gray(frame), self.lores_size, interpolation=cv2.INTER_AREA)
+        
+        return True, frame, {
+            'seq': self.frame_seq,
+            'timestamp': timestamp,
+            'dropped': 0,
+            'metadata': {},
+            'lores': lores
+        }
+    
+    def read(self):
+        """OpenCV VideoCapture 호환 read 메서드"""
+        ret, frame, _ = self.read_latest()
+        return ret, frame
+    
+    def read_with_metadata(self):
+        """AICamera.read_with_metadata 호환 (메타데이터 없음)"""
+        ret, frame, info = self.read_latest()
+        return ret, frame, info['metadata'] if ret else {}
+    
+    def gray(self, frame):
+        """감지용 그레이 이미지"""
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    
+    def to_bgr(self, frame):
+        """표시용 BGR (이미 BGR)"""
+        return frame
+    
+    def roi_bgr(self, frame, face_bbox):
+        """생체신호용 BGR 프레임 (이미 BGR)"""
+        return frame
+    
+    def detect_ai_faces(self, metadata):
+        """온센서 감지 없음 (Haar 폴백)"""
+        return None
+    
+    def release(self):
+        """소스 해제"""
+        if self.cap is not None:
+            self.cap.release()
+        self.started = False
+    
+    def isOpened(self):
+        """소스 상태 확인"""
+        return self.started
+    
+    def set(self, prop, value):
+        """OpenCV set 메서드 호환 (무시)"""
+        pass
+    
+    def get_metadata(self):
+        """메타데이터 없음"""
+        return {}
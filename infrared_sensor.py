@@ -9,7 +9,6 @@ import json
 from datetime import datetime
 from collections import deque
 import numpy as np
-import threading
 
 # GPIO 라이브러리 선택 (라즈베리파이 5 호환)
 GPIO_LIB = None
@@ -34,6 +33,7 @@ except ImportError:
 
 from mqtt_sensor_sender import MQTTSensorSender
 import mqtt_config
+from scheduler import get_scheduler
 
 # GPIO 설정
 INFRARED_PIN = 17  # 적외선 센서 GPIO 핀
@@ -86,12 +86,16 @@ class InfraredSensor:
             broker_host=mqtt_config.MQTT_CONFIG["broker_host"],
             broker_port=mqtt_config.MQTT_CONFIG["broker_port"],
             client_id=f"infrared_sensor_{int(time.time())}",
-            topic_prefix=mqtt_config.MQTT_CONFIG["topic_prefix"]
+            topic_prefix=mqtt_config.MQTT_CONFIG["topic_prefix"],
+            codec=mqtt_config.MQTT_CONFIG.get("codec", "json"),
+            topic_codecs=mqtt_config.MQTT_CONFIG.get("topic_codecs"),
+            outbox=mqtt_config.MQTT_CONFIG.get("outbox")
         )
         
-        # 실행 제어
+        # 실행 제어 (샘플링 / 평균 전송은 공용 스케줄러의 주기 작업)
         self.running = False
-        self.thread = None
+        self.scheduler = get_scheduler()
+        self.jobs = []
     
     def read_sensor(self):
         """적외선 센서 값 읽기"""
@@ -110,29 +114,11 @@ class InfraredSensor:
             print(f"✗ 적외선 센서 읽기 오류: {e}")
             return None
     
-    def collect_data(self):
-        """데이터 수집 및 전송 루프"""
-        last_average_time = time.time()
-        
-        while self.running:
-            try:
-                # 센서 값 읽기
-                value = self.read_sensor()
-                if value is not None:
-                    self.buffer.append(value)
-                
-                # 5초마다 평균 계산 및 전송
-                current_time = time.time()
-                if current_time - last_average_time >= AVERAGE_INTERVAL:
-                    self.calculate_and_send_average()
-                    last_average_time = current_time
-                
-                # 샘플링 간격 대기
-                time.sleep(SAMPLE_INTERVAL)
-                
-            except Exception as e:
-                print(f"✗ 데이터 수집 오류: {e}")
-                time.sleep(1)
+    def sample(self):
+        """센서 값 1회 읽기 (SAMPLE_INTERVAL마다 스케줄러가 호출)"""
+        value = self.read_sensor()
+        if value is not None:
+            self.buffer.append(value)
     
     def calculate_and_send_average(self):
         """5초 평균 계산 및 MQTT 전송"""
@@ -159,10 +145,9 @@ class InfraredSensor:
             "gpio_lib": self.gpio_lib if self.is_pi else "none"
         }
         
-        # MQTT로 전송
-        if self.mqtt_sender.connected:
-            topic = f"{mqtt_config.MQTT_CONFIG['topic_prefix']}/infrared"
-            self.mqtt_sender.publish_message(topic, sensor_data)
+        # MQTT로 전송 (브로커가 끊긴 동안은 outbox에 저장)
+        topic = f"{mqtt_config.MQTT_CONFIG['topic_prefix']}/infrared"
+        if self.mqtt_sender.publish_message(topic, sensor_data):
             mode_text = f" ({self.gpio_lib})" if self.is_pi else " (Mock)"
             print(f"📡 적외선 감지율{mode_text}: {detection_percent}% ({detection_count}/{total_samples})")
         
@@ -180,10 +165,12 @@ class InfraredSensor:
             print("✗ MQTT 연결 실패")
             return False
         
+        # 샘플링 / 5초 평균 전송 작업 등록 (같은 간격의 다른 센서 작업과 같은 틱에 실행)
         self.running = True
-        self.thread = threading.Thread(target=self.collect_data)
-        self.thread.daemon = True
-        self.thread.start()
+        self.jobs = [
+            self.scheduler.every(SAMPLE_INTERVAL, self.sample, name="infrared_sample"),
+            self.scheduler.every(AVERAGE_INTERVAL, self.calculate_and_send_average, name="infrared_average")
+        ]
         
         lib_text = self.gpio_lib if self.is_pi else "Mock"
         print(f"🚀 적외선 센서 모니터링 시작 ({lib_text}, GPIO {INFRARED_PIN})")
@@ -192,8 +179,9 @@ class InfraredSensor:
     def stop(self):
         """센서 모니터링 중지"""
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=2.0)
+        for job in self.jobs:
+            job.cancel()
+        self.jobs = []
         
         # MQTT 연결 해제
         self.mqtt_sender.disconnect()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+MQTT 페이로드 코덱
+json (기본, 공백 없는 JSON) / msgpack / cbor / struct (메시지 type별 고정 스키마 바이너리)
+코덱은 토픽별로 선택하고 (CodecRegistry), JSON이 아닌 코덱은 토픽 끝에 코덱 이름을 붙여 알림
+    sensors/infrared          -> JSON
+    sensors/infrared/struct   -> struct
+(센서 / 카메라 클라이언트는 MQTT 3.1.1이라 content-type 속성 대신 토픽 접미사 사용)
+받는 쪽은 decode(topic, payload)로 접미사를 보고 원래 토픽과 dict를 복원
+"""
+
+import json
+import struct
+from datetime import datetime, timedelta
+
+# MessagePack / CBOR 라이브러리 (선택)
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import cbor2
+    CBOR_AVAILABLE = True
+except ImportError:
+    CBOR_AVAILABLE = False
+
+CODECS = ('json', 'msgpack', 'cbor', 'struct')
+
+# struct 열거형 문자열 값 (바이트 1개로 전송, 기존 값의 순서를 바꾸지 말고 뒤에만 추가)
+LABELS = ('none', 'real', 'mock', 'real_new', 'real_old', 'gpiod', 'RPi.GPIO',
+          'adafruit_dht', 'Adafruit_DHT', 'DHT11', 'DHT22')
+
+# struct 스키마: id -> (type 필드, type 값, [(필드, 종류)], 고정 필드)
+# 종류: t 타임스탬프 (ISO 벽시계 시각 <-> 1970-01-01 기준 µs, 시간대 변환 없음), f float32 ("-" <-> NaN), H uint16, I uint32,
+#       B uint8, ? bool, e LABELS 열거형, s 짧은 문자열 (길이 1바이트 + UTF-8)
+# id 0은 스키마가 없거나 맞지 않는 메시지 (JSON을 그대로 담음)
+STRUCT_SCHEMAS = {
+    1: ('type', 'infrared', [('timestamp', 't'), ('data', 'f'), ('raw_count', 'H'), ('total_samples', 'H'),
+                             ('device_mode', 'e'), ('gpio_lib', 'e')], {'unit': '%'}),
+    2: ('type', 'sound', [('timestamp', 't'), ('data', 'f'), ('events_per_second', 'f'), ('total_events', 'I'),
+                          ('device_mode', 'e'), ('gpio_lib', 'e')], {'unit': 'level'}),
+    3: ('type', 'temperature', [('timestamp', 't'), ('data', 'f'), ('samples', 'H'),
+                                ('device_mode', 'e'), ('dht_lib', 'e')], {'unit': '°C'}),
+    4: ('type', 'humidity', [('timestamp', 't'), ('data', 'f'), ('samples', 'H'),
+                             ('device_mode', 'e'), ('dht_lib', 'e')], {'unit': '%'}),
+    5: ('type', 'heart_rate', [('timestamp', 't'), ('data', 'f'), ('device_id', 's'), ('gpio_lib', 'e')],
+        {'unit': 'BPM'}),
+    6: ('type', 'stress_index', [('timestamp', 't'), ('data', 'f'), ('device_id', 's'), ('gpio_lib', 'e')],
+        {'unit': '%'}),
+    7: ('type', 'spo2', [('timestamp', 't'), ('data', 'f'), ('device_id', 's'), ('gpio_lib', 'e')],
+        {'unit': '%'}),
+    8: ('sensor_type', 'PIR', [('motion_detected', '?'), ('timestamp', 't'), ('pin', 'B')], {}),
+    9: ('sensor_type', 'Sound', [('sound_detected', '?'), ('timestamp', 't'), ('pin', 'B')], {}),
+    10: ('sensor_type', 'TempHumidity', [('temperature', 'f'), ('humidity', 'f'), ('timestamp', 't'),
+                                         ('pin', 'B'), ('sensor_model', 'e')], {}),
+}
+
+# 타임스탬프 기준 시각 (시간대 없는 벽시계 값)
+_EPOCH = datetime(1970, 1, 1)
+
+# 고정 크기 종류 -> struct 형식
+_FORMATS = {'t': 'q', 'f': 'f', 'H': 'H', 'I': 'I', 'B': 'B', '?': '?', 'e': 'B'}
+
+
+class _Mismatch(Exception):
+    """메시지가 스키마와 맞지 않음 (JSON으로 대체)"""
+
+
+class JSONCodec:
+    """공백 없는 JSON (UTF-8)"""
+    
+    name = 'json'
+    content_type = 'application/json'
+    
+    def encode(self, data):
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    
+    def decode(self, payload):
+        return json.loads(payload)
+
+
+class MsgPackCodec:
+    """MessagePack (msgpack 필요)"""
+    
+    name = 'msgpack'
+    content_type = 'application/msgpack'
+    
+    def __init__(self):
+        if not MSGPACK_AVAILABLE:
+            raise RuntimeError("msgpack is not installed (pip install msgpack)")
+    
+    def encode(self, data):
+        return msgpack.packb(data, use_bin_type=True)
+    
+    def decode(self, payload):
+        return msgpack.unpackb(payload, raw=False)
+
+
+class CBORCodec:
+    """CBOR (cbor2 필요)"""
+    
+    name = 'cbor'
+    content_type = 'application/cbor'
+    
+    def __init__(self):
+        if not CBOR_AVAILABLE:
+            raise RuntimeError("cbor2 is not installed (pip install cbor2)")
+    
+    def encode(self, data):
+        return cbor2.dumps(data)
+    
+    def decode(self, payload):
+        return cbor2.loads(payload)
+
+
+class StructCodec:
+    """메시지 type별 고정 스키마 바이너리 (STRUCT_SCHEMAS)
+    
+    첫 바이트가 스키마 id. 키 이름 / 단위 / type 문자열은 보내지 않고 스키마에서 복원한다.
+    스키마가 없거나 값이 스키마와 맞지 않는 메시지 (배치 / 진단 등)는 id 0 + JSON으로 보내므로 손실이 없다.
+    """
+    
+    name = 'struct'
+    content_type = 'application/x-sensor-struct'
+    
+    def __init__(self, schemas=None):
+        self.schemas = schemas or STRUCT_SCHEMAS
+        self.by_type = {(type_field, type_value): schema_id
+                        for schema_id, (type_field, type_value, _, _) in self.schemas.items()}
+        self.json = JSONCodec()
+    
+    def _schema_id(self, data):
+        if not isinstance(data, dict):
+            return 0
+        for type_field in ('type', 'sensor_type'):
+            schema_id = self.by_type.get((type_field, data.get(type_field)))
+            if schema_id is not None:
+                return schema_id
+        return 0
+    
+    def _pack(self, schema_id, data):
+        type_field, type_value, fields, constants = self.schemas[schema_id]
+        expected = {type_field, *constants, *(name for name, _ in fields)}
+        if set(data) != expected or any(data[key] != value for key, value in constants.items()):
+            raise _Mismatch()
+        
+        parts = [struct.pack('<B', schema_id)]
+        for name, kind in fields:
+            value = data[name]
+            if kind == 's':
+                raw = str(value).encode('utf-8')
+                if len(raw) > 255:
+                    raise _Mismatch()
+                parts.append(struct.pack('<B', len(raw)) + raw)
+                continue
+            if kind == 't':
+                value = self._pack_time(value)
+            elif kind == 'f':
+                value = float('nan') if value == "-" else float(value)
+                if self._unpack_float(struct.pack('<f', value)) != value and value == value:
+                    raise _Mismatch()  # float32로 정확히 복원되지 않는 값
+            elif kind == 'e':
+                if value not in LABELS:
+                    raise _Mismatch()
+                value = LABELS.index(value)
+            elif kind == '?':
+                if not isinstance(value, bool):
+                    raise _Mismatch()
+            elif isinstance(value, bool) or not isinstance(value, int):
+                raise _Mismatch()
+            try:
+                parts.append(struct.pack('<' + _FORMATS[kind], value))
+            except struct.error:
+                raise _Mismatch()
+        return b''.join(parts)
+    
+    @staticmethod
+    def _pack_time(value):
+        """ISO 시각 -> 1970-01-01 기준 µs (정확히 같은 문자열로 복원되는 경우만)
+        
+        보내는 쪽 / 받는 쪽 시간대가 달라도 같은 문자열이 되도록 벽시계 값을 그대로 계산
+        (timestamp() / fromtimestamp()는 각 호스트의 시간대를 적용하므로 사용하지 않음)
+        """
+        try:
+            moment = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise _Mismatch()
+        if moment.tzinfo is not None:
+            raise _Mismatch()
+        micros = (moment - _EPOCH) // timedelta(microseconds=1)
+        if StructCodec._unpack_time(micros) != value:
+            raise _Mismatch()
+        return micros
+    
+    @staticmethod
+    def _unpack_time(micros):
+        return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+    
+    @staticmethod
+    def _unpack_float(raw):
+        """float32 -> 유효숫자 7자리 float (round(x, 1) 값이 그대로 복원됨)"""
+        return float(f"{struct.unpack('<f', raw)[0]:.7g}")
+    
+    def encode(self, data):
+        schema_id = self._schema_id(data)
+        if schema_id:
+            try:
+                return self._pack(schema_id, data)
+            except _Mismatch:
+                pass
+        return b'\x00' + self.json.encode(data)
+    
+    def decode(self, payload):
+        schema_id = payload[0]
+        if schema_id == 0:
+            return self.json.decode(payload[1:])
+        
+        type_field, type_value, fields, constants = self.schemas[schema_id]
+        data = {type_field: type_value}
+        offset = 1
+        for name, kind in fields:
+            if kind == 's':
+                length = payload[offset]
+                data[name] = bytes(payload[offset + 1:offset + 1 + length]).decode('utf-8')
+                offset += 1 + length
+                continue
+            fmt = '<' + _FORMATS[kind]
+            size = struct.calcsize(fmt)
+            raw = payload[offset:offset + size]
+            offset += size
+            if kind == 'f':
+                value = self._unpack_float(raw)
+                data[name] = "-" if value != value else value
+            elif kind == 't':
+                data[name] = self._unpack_time(struct.unpack(fmt, raw)[0])
+            elif kind == 'e':
+                data[name] = LABELS[struct.unpack(fmt, raw)[0]]
+            else:
+                data[name] = struct.unpack(fmt, raw)[0]
+        data.update(constants)
+        return data
+
+
+def get_codec(name):
+    """이름 -> 코덱 인스턴스 (라이브러리가 없으면 RuntimeError)"""
+    if name == 'json':
+        return JSONCodec()
+    if name == 'msgpack':
+        return MsgPackCodec()
+    if name == 'cbor':
+        return CBORCodec()
+    if name == 'struct':
+        return StructCodec()
+    raise ValueError(f"Unknown codec: {name} (choose from {', '.join(CODECS)})")
+
+
+def topic_matches(pattern, topic):
+    """MQTT 구독 패턴 (+ / #) 일치 여부"""
+    pattern_levels = pattern.split('/')
+    topic_levels = topic.split('/')
+    for i, level in enumerate(pattern_levels):
+        if level == '#':
+            return True
+        if i >= len(topic_levels) or (level != '+' and level != topic_levels[i]):
+            return False
+    return len(pattern_levels) == len(topic_levels)
+
+
+class CodecRegistry:
+    """토픽별 코덱 선택 + 토픽 접미사로 코덱 알림 / 판별"""
+    
+    def __init__(self, default='json', topics=None):
+        """
+        Args:
+            default: 규칙에 없는 토픽의 코덱
+            topics: MQTT 패턴 -> 코덱 이름 (예: {"sensors/#": "struct"}, 먼저 일치하는 규칙 사용)
+        """
+        self.codecs = {}
+        self.default = self.get(default)
+        self.rules = [(pattern, self.get(name)) for pattern, name in (topics or {}).items()]
+    
+    def get(self, name):
+        """이름 -> 코덱 (한 번 만든 코덱은 재사용)"""
+        if name not in self.codecs:
+            self.codecs[name] = get_codec(name)
+        return self.codecs[name]
+    
+    def codec_for(self, topic):
+        """토픽에 쓸 코덱"""
+        for pattern, codec in self.rules:
+            if topic_matches(pattern, topic):
+                return codec
+        return self.default
+    
+    def encode(self, topic, data):
+        """(발행 토픽, 페이로드 bytes) - JSON이 아니면 토픽 끝에 /<코덱 이름>"""
+        codec = self.codec_for(topic)
+        if codec.name != 'json':
+            topic = f"{topic}/{codec.name}"
+        return topic, codec.encode(data)
+    
+    def decode(self, topic, payload):
+        """(원래 토픽, dict) - 토픽 접미사로 코덱 판별 (접미사가 없으면 JSON)"""
+        base, _, suffix = topic.rpartition('/')
+        if base and suffix in CODECS and suffix != 'json':
+            return base, self.get(suffix).decode(payload)
+        return topic, self.get('json').decode(payload)
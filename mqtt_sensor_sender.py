@@ -1,13 +1,21 @@
 #!/usr/bin/env python3
 """
 센서 데이터 MQTT 전송 클래스
+같은 프로세스의 센서들은 브로커별 공유 연결 (MQTTConnectionManager) 하나를 함께 사용
+(클라이언트 1개 / 네트워크 루프 스레드 1개 / TCP 연결 1개, 연결 대기도 한 번)
+페이로드는 토픽별 코덱 (mqtt_codecs, 기본 JSON)으로 인코딩
+outbox 설정 시 브로커가 끊긴 동안의 메시지는 디스크 큐 (mqtt_outbox)에 쌓였다가 재연결되면 순서대로 전송
 """
 
-import json
+import os
+import socket
 import time
 from datetime import datetime
 import threading
 
+from mqtt_codecs import CodecRegistry
+from mqtt_outbox import MQTTOutbox, paho_publish_batch
+
 # MQTT 라이브러리
 try:
     import paho.mqtt.client as mqtt
@@ -16,96 +24,267 @@ except ImportError:
     MQTT_AVAILABLE = False
     print("경고: paho-mqtt 라이브러리를 찾을 수 없습니다. MQTT 기능이 비활성화됩니다.")
 
-class MQTTSensorSender:
-    def __init__(self, broker_host="localhost", broker_port=1883, 
-                 client_id="sensor", topic_prefix="sensors",
-                 username=None, password=None):
+# 프로세스 공용 연결 관리자 (브로커 주소 / 인증 정보별 1개)
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+class MQTTConnectionManager:
+    """여러 전송기가 함께 쓰는 MQTT 연결 (클라이언트 + 네트워크 루프 1개)
+    
+    전송기마다 acquire()로 연결을 얻고 release()로 반납한다.
+    첫 acquire에서만 브로커에 연결하고 (최대 5초 대기), 마지막 release에서 연결을 해제한다.
+    연결 이후 끊김은 paho 네트워크 루프가 자동으로 재연결한다.
+    outbox를 설정하면 첫 연결도 백그라운드에서 재시도하고, 연결이 없는 동안의 발행은 디스크 큐에 저장한다.
+    """
+    
+    def __init__(self, broker_host="localhost", broker_port=1883, client_id=None,
+                 username=None, password=None, connect_timeout=5.0, outbox=None):
         """
-        MQTT 센서 데이터 전송기 초기화
-        
         Args:
             broker_host: MQTT 브로커 호스트
             broker_port: MQTT 브로커 포트
-            client_id: MQTT 클라이언트 ID
-            topic_prefix: 토픽 접두사
+            client_id: MQTT 클라이언트 ID (기본: sensors_<호스트명>_<pid>)
             username: MQTT 인증 사용자명 (선택)
             password: MQTT 인증 비밀번호 (선택)
+            connect_timeout: 첫 연결 대기 시간 (초)
+            outbox: MQTTOutbox 설정 dict (예: {"path": "mqtt_outbox.db", "max_mb": 64}, None이면 사용 안 함)
         """
         self.broker_host = broker_host
         self.broker_port = broker_port
-        self.client_id = client_id
-        self.topic_prefix = topic_prefix
-        self.username = username
-        self.password = password
+        self.client_id = client_id or f"sensors_{socket.gethostname()}_{os.getpid()}"
+        self.connect_timeout = connect_timeout
         
-        # MQTT 사용 가능 여부 확인
+        self.lock = threading.Lock()
+        self.connected_event = threading.Event()
+        self.users = 0  # 연결을 사용 중인 전송기 수
+        self.started = False  # connect + loop_start 완료 여부
+        
+        # 저장 후 전달 큐 (첫 acquire에서 열고 마지막 release에서 닫음)
+        self.outbox_config = outbox
+        self.outbox = None
+        
+        # 통계
+        self.published = 0
+        self.failed = 0
+        self.topics = {}  # 토픽 -> 발행 수
+        self.connect_time = 0.0  # 첫 연결 대기 시간 (초)
+        
+        self.client = None
         if not MQTT_AVAILABLE:
-            self.enabled = False
-            self.connected = False
             return
         
-        self.enabled = True
-        self.connected = False
-        
-        # MQTT 클라이언트 설정
         self.client = mqtt.Client(client_id=self.client_id)
         self.client.on_connect = self.on_connect
         self.client.on_disconnect = self.on_disconnect
-        self.client.on_publish = self.on_publish
         
         # 인증 정보 설정
-        if self.username and self.password:
-            self.client.username_pw_set(self.username, self.password)
+        if username and password:
+            self.client.username_pw_set(username, password)
+    
+    @property
+    def connected(self):
+        return self.connected_event.is_set()
     
     def on_connect(self, client, userdata, flags, rc):
         """MQTT 연결 콜백"""
         if rc == 0:
-            self.connected = True
-            print(f"✓ MQTT 연결 성공: {self.broker_host}:{self.broker_port}")
+            self.connected_event.set()
+            print(f"✓ MQTT 연결 성공: {self.broker_host}:{self.broker_port} (공유 클라이언트 {self.client_id})")
+            if self.outbox is not None:
+                self.outbox.wake()
         else:
-            self.connected = False
+            self.connected_event.clear()
             print(f"✗ MQTT 연결 실패 (코드: {rc})")
     
     def on_disconnect(self, client, userdata, rc):
         """MQTT 연결 해제 콜백"""
-        self.connected = False
+        self.connected_event.clear()
         if rc != 0:
             print(f"✗ MQTT 연결이 예기치 않게 종료됨 (코드: {rc})")
         else:
             print("✓ MQTT 연결 해제됨")
     
-    def on_publish(self, client, userdata, mid):
-        """MQTT 발행 콜백"""
-        pass
+    def acquire(self):
+        """연결 사용 시작 - 아직 연결 전이면 브로커에 연결 (이미 연결돼 있으면 바로 반환)"""
+        if self.client is None:
+            return False
+        
+        with self.lock:
+            self.users += 1
+            if self.started:
+                return self.connected or self.outbox is not None
+            
+            try:
+                print(f"🔄 MQTT 브로커 연결 중: {self.broker_host}:{self.broker_port}...")
+                start = time.time()
+                if self.outbox_config:
+                    # 브로커가 없어도 네트워크 루프가 계속 재연결 시도 (그동안은 디스크 큐에 저장)
+                    self.outbox = MQTTOutbox(**self.outbox_config)
+                    self.outbox.start(lambda rows: paho_publish_batch(self.client, rows), lambda: self.connected)
+                    self.client.connect_async(self.broker_host, self.broker_port, 60)
+                else:
+                    self.client.connect(self.broker_host, self.broker_port, 60)
+                self.client.loop_start()
+                self.started = True
+                
+                # 연결 대기 (최대 connect_timeout초)
+                self.connected_event.wait(self.connect_timeout)
+                self.connect_time = time.time() - start
+            except Exception as e:
+                print(f"✗ MQTT 연결 오류: {e}")
+            if self.outbox is not None and not self.connected:
+                print(f"💾 브로커 연결 전까지 {self.outbox.path}에 저장 (대기 {len(self.outbox)}개)")
+            return self.connected or self.outbox is not None
+    
+    def release(self):
+        """연결 사용 종료 - 마지막 사용자가 반납하면 네트워크 루프 중지 + 연결 해제"""
+        with self.lock:
+            if self.users == 0:
+                return
+            self.users -= 1
+            if self.users > 0 or not self.started:
+                return
+            self.client.loop_stop()
+            self.client.disconnect()
+            self.started = False
+            self.connected_event.clear()
+            if self.outbox is not None:
+                self.outbox.close()  # 남은 메시지는 다음 실행에서 전송
+                self.outbox = None
+    
+    def publish(self, topic, payload, qos=0, retain=False):
+        """토픽별 발행 (paho publish는 스레드 안전 - 여러 센서 스레드에서 호출 가능)"""
+        outbox = self.outbox
+        if outbox is not None and (not self.connected or len(outbox)):
+            # 연결이 없거나 아직 보내지 못한 메시지가 있으면 순서 유지를 위해 큐 뒤에 저장
+            return outbox.put(topic, payload, qos, retain)
+        if not self.connected:
+            return False
+        result = self.client.publish(topic, payload, qos=qos, retain=retain)
+        ok = result.rc == 0
+        if not ok and outbox is not None:
+            return outbox.put(topic, payload, qos, retain)
+        with self.lock:
+            if ok:
+                self.published += 1
+                self.topics[topic] = self.topics.get(topic, 0) + 1
+            else:
+                self.failed += 1
+        return ok
+    
+    def get_stats(self):
+        """연결 통계"""
+        with self.lock:
+            return {
+                'client_id': self.client_id,
+                'connected': self.connected,
+                'users': self.users,
+                'published': self.published,
+                'failed': self.failed,
+                'topics': dict(self.topics),
+                'connect_ms': round(self.connect_time * 1000, 1),
+                'outbox': self.outbox.get_stats() if self.outbox is not None else None
+            }
+    
+    def format_summary(self, stats=None):
+        """요약 텍스트"""
+        stats = stats or self.get_stats()
+        state = "connected" if stats['connected'] else "disconnected"
+        summary = (f"📡 MQTT shared connection: {stats['client_id']} ({state}) | "
+                   f"{stats['users']} senders | {len(stats['topics'])} topics | "
+                   f"published {stats['published']} (failed {stats['failed']}) | "
+                   f"connect {stats['connect_ms']:.0f} ms")
+        if stats['outbox']:
+            summary += "\n   " + self.outbox.format_summary(stats['outbox'])
+        return summary
+
+
+def get_connection_manager(broker_host="localhost", broker_port=1883, username=None, password=None,
+                           outbox=None):
+    """브로커 주소 / 인증 정보별 프로세스 공용 연결 관리자 반환 (없으면 생성, outbox는 처음 설정한 값 사용)"""
+    key = (broker_host, broker_port, username, password)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = MQTTConnectionManager(broker_host, broker_port,
+                                            username=username, password=password, outbox=outbox)
+            _managers[key] = manager
+        elif outbox and not manager.outbox_config:
+            manager.outbox_config = outbox
+        return manager
+
+
+class MQTTSensorSender:
+    def __init__(self, broker_host="localhost", broker_port=1883, 
+                 client_id="sensor", topic_prefix="sensors",
+                 username=None, password=None, shared=True, codec="json", topic_codecs=None,
+                 outbox=None):
+        """
+        MQTT 센서 데이터 전송기 초기화
+        
+        Args:
+            broker_host: MQTT 브로커 호스트
+            broker_port: MQTT 브로커 포트
+            client_id: MQTT 클라이언트 ID (shared=False일 때만 사용)
+            topic_prefix: 토픽 접두사
+            username: MQTT 인증 사용자명 (선택)
+            password: MQTT 인증 비밀번호 (선택)
+            shared: True면 같은 브로커의 다른 전송기와 연결 공유, False면 전용 연결
+            codec: 기본 페이로드 코덱 (json / msgpack / cbor / struct)
+            topic_codecs: MQTT 패턴 -> 코덱 이름 (예: {"sensors/#": "struct"})
+            outbox: 브로커가 끊긴 동안 메시지를 저장할 MQTTOutbox 설정 dict (None이면 끊긴 동안 버림)
+        """
+        self.broker_host = broker_host
+        self.broker_port = broker_port
+        self.client_id = client_id
+        self.topic_prefix = topic_prefix
+        self.username = username
+        self.password = password
+        self.shared = shared
+        self.acquired = False
+        
+        # 페이로드 코덱 (msgpack / cbor2가 없으면 JSON - 센서 데몬이 생성 단계에서 죽지 않도록)
+        try:
+            self.codecs = CodecRegistry(codec, topic_codecs)
+        except RuntimeError as e:
+            print(f"⚠️ MQTT 코덱 사용 불가 ({e}) - JSON 사용")
+            self.codecs = CodecRegistry()
+        
+        # MQTT 사용 가능 여부 확인
+        self.enabled = MQTT_AVAILABLE
+        if not self.enabled:
+            self.manager = None
+            return
+        
+        # 연결 관리자 (공유 또는 전용)
+        if shared:
+            self.manager = get_connection_manager(broker_host, broker_port, username, password, outbox)
+        else:
+            self.manager = MQTTConnectionManager(broker_host, broker_port, client_id,
+                                                 username, password, outbox=outbox)
+        self.client = self.manager.client
+    
+    @property
+    def connected(self):
+        return self.enabled and self.acquired and self.manager.connected
     
     def connect(self):
-        """MQTT 브로커에 연결"""
+        """MQTT 브로커에 연결 (공유 연결이 이미 있으면 대기 없이 바로 사용, outbox가 있으면 브로커가 없어도 True)"""
         if not self.enabled:
             print("MQTT 기능이 비활성화되어 있습니다.")
             return False
-            
-        try:
-            print(f"🔄 MQTT 브로커 연결 중: {self.broker_host}:{self.broker_port}...")
-            self.client.connect(self.broker_host, self.broker_port, 60)
-            self.client.loop_start()
-            
-            # 연결 대기 (최대 5초)
-            wait_time = 0
-            while not self.connected and wait_time < 5:
-                time.sleep(0.1)
-                wait_time += 0.1
-            
-            return self.connected
-        except Exception as e:
-            print(f"✗ MQTT 연결 오류: {e}")
-            return False
+        
+        if not self.acquired:
+            self.acquired = True
+            return self.manager.acquire()
+        return self.manager.connected or self.manager.outbox is not None
     
     def disconnect(self):
-        """MQTT 브로커 연결 해제"""
-        if self.enabled and self.connected:
-            self.client.loop_stop()
-            self.client.disconnect()
-            self.connected = False
+        """MQTT 브로커 연결 해제 (공유 연결은 마지막 전송기가 해제할 때 닫힘)"""
+        if self.enabled and self.acquired:
+            self.acquired = False
+            self.manager.release()
     
     def publish_message(self, topic, data, qos=0, retain=False):
         """
@@ -116,8 +295,11 @@ class MQTTSensorSender:
             data: 전송할 데이터 (dict)
             qos: QoS 레벨 (0, 1, 2)
             retain: 메시지 보존 여부
+        
+        Returns:
+            발행했거나 outbox에 저장했으면 True
         """
-        if not self.enabled or not self.connected:
+        if not self.enabled or not self.acquired:
             return False
         
         try:
@@ -125,12 +307,11 @@ class MQTTSensorSender:
             if isinstance(data, dict) and "timestamp" not in data:
                 data["timestamp"] = datetime.now().isoformat()
             
-            # JSON 변환
-            payload = json.dumps(data)
+            # 토픽별 코덱으로 인코딩 (JSON이 아니면 토픽 끝에 /<코덱 이름>)
+            topic, payload = self.codecs.encode(topic, data)
             
             # 발행
-            result = self.client.publish(topic, payload, qos=qos, retain=retain)
-            return result.rc == 0
+            return self.manager.publish(topic, payload, qos=qos, retain=retain)
         except Exception as e:
             print(f"✗ 메시지 발행 오류: {e}")
             return False
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+녹화 영상 재생 벤치마크 (헤드리스)
+face.mp4 / output.mp4 등을 최대 속도로 감지 -> rPPG -> SpO2 -> 스트레스 파이프라인에 통과시키고
+처리 FPS, 단계별 지연 백분위수, 최종 심박수 / SpO2 / 스트레스 값을 출력
+Picamera2 / GPIO / MQTT 없이 어떤 리눅스 환경에서도 실행 가능 (회귀 + 성능 기준)
+    python replay_benchmark.py face.mp4 output.mp4 output1.mp4 --rppg-compare
+    (스트리밍 rPPG 심박수가 기존 매 프레임 재계산 결과와 hop별 허용 오차 안인지 확인, 벗어나면 종료 코드 1)
+    현재 output1.mp4는 통과하지 못함 - 신호 품질이 25 아래로 떨어지는 구간에서 기존 엔진은 48~126 BPM 사이를
+    오가고 스트리밍 엔진 (단방향 필터)은 다른 피크를 고르므로 두 엔진이 일치하지 않음
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from face_detectors import BACKENDS, create_detector
+from frame_source import OpenCVFrameSource
+from face_tracking import DetectThenTrack, SearchWindowDetector
+from rppg_addon import rPPGProcessor
+from rppg_algorithms import ALGORITHMS
+from roi_stats import ROIStatsStage
+from biometrics_pipeline import BiometricsPipeline
+from detection_pool import DetectionPool
+from spo2_estimator import SpO2Estimator
+from stress_analyzer import StressAnalyzer
+
+STAGES = ['read', 'detect', 'roi', 'rppg', 'spo2', 'stress', 'queue', 'total']
+
+
+class HeartRateComparison:
+    """스트리밍 rPPG vs 기존 (매 프레임 재계산) rPPG 심박수를 스트리밍 hop마다 비교
+    
+    hop마다 두 엔진이 그 시점에 보여주는 심박수의 |ΔHR|을 기록하고, 영상 끝의 최종값도 비교
+    통과 조건 (bin = FFT bin 1개 = 60 * fps / buffer_size BPM):
+        - hop별 |ΔHR| p95 <= tolerance (기본 1 bin)
+        - hop별 |ΔHR| 최대 / 최종 |ΔHR| <= max_tolerance (기본 2 bin)
+    두 엔진의 hop 추정값은 같은 bin으로 양자화되지만 이동평균 구간이 달라 (기존 10프레임, 스트리밍 2초)
+    bin이 바뀌는 hop 근처에서는 1 bin 정도 차이가 나고, 기존 엔진이 이웃 bin 사이를 오가면 잠깐 2 bin까지 벌어짐
+    """
+    
+    def __init__(self, streaming, legacy, tolerance=None, max_tolerance=None):
+        self.streaming = streaming
+        self.legacy = legacy
+        self.bin_bpm = 60 * streaming.fps / streaming.buffer_size
+        self.tolerance = tolerance if tolerance is not None else self.bin_bpm
+        self.max_tolerance = max_tolerance if max_tolerance is not None else 2 * self.bin_bpm
+        self.last_hop = None
+        self.deltas = []  # hop 시점 |스트리밍 - 기존|
+    
+    def update(self):
+        """두 엔진에 같은 샘플을 넣은 뒤 매 프레임 호출"""
+        if self.streaming.last_spectrum_time == self.last_hop:
+            return
+        if self.streaming.heart_rate <= 0 or self.legacy.heart_rate <= 0:
+            return
+        self.last_hop = self.streaming.last_spectrum_time
+        self.deltas.append(abs(self.streaming.heart_rate - self.legacy.heart_rate))
+    
+    def result(self):
+        """비교 결과 (hop이 없으면 None)"""
+        if not self.deltas:
+            return None
+        deltas = np.array(self.deltas)
+        p95 = float(np.percentile(deltas, 95))
+        final = abs(self.streaming.heart_rate - self.legacy.heart_rate)
+        return {
+            'hops': len(deltas),
+            'tolerance': self.tolerance,
+            'max_tolerance': self.max_tolerance,
+            'delta': (float(np.median(deltas)), p95, float(deltas.max())),
+            'final_delta': final,
+            'failed_hops': int(np.sum(deltas > self.max_tolerance)),
+            'streaming_hr': self.streaming.heart_rate,
+            'legacy_hr': self.legacy.heart_rate,
+            'passed': bool(p95 <= self.tolerance and deltas.max() <= self.max_tolerance
+                           and final <= self.max_tolerance)
+        }
+
+
+def run_replay(path, args, detector, detector_config):
+    """영상 하나를 끝까지 처리하고 결과 반환"""
+    source = OpenCVFrameSource(path, fps=args.fps, lores_size=args.lores, realtime=args.realtime)
+    if not source.start():
+        return None
+    
+    rppg = rPPGProcessor(fps=source.fps, streaming=not args.rppg_legacy,
+                         estimator=args.rppg_estimator, algorithm=args.rppg_algorithm)
+    spo2 = SpO2Estimator(fps=source.fps)
+    stress = StressAnalyzer()
+    roi_stats = ROIStatsStage()
+    
+    # --rppg-compare: 같은 ROI 샘플을 기존 엔진에도 넣어서 hop마다 비교 (단계 지연에는 포함하지 않음)
+    comparison = None
+    if args.rppg_compare:
+        legacy = rPPGProcessor(fps=source.fps, streaming=False, algorithm=args.rppg_algorithm)
+        comparison = HeartRateComparison(rppg, legacy, args.hr_tolerance, args.hr_max_tolerance)
+    
+    # --bio-worker: 추정기는 워커 스레드에서 실행 (트래커와 동일), 프레임 루프는 큐에 넣기만
+    pipeline = BiometricsPipeline(rppg, stress, spo2) if args.bio_worker else None
+    if pipeline:
+        pipeline.start()
+    
+    # 감지 전략 (트래커 --face-strategy와 동일)
+    tracker = None
+    window = None
+    if args.face_strategy == "track":
+        tracker = DetectThenTrack(redetect_interval=args.redetect_interval)
+    elif args.face_strategy == "window":
+        window = SearchWindowDetector(detector)
+    
+    # --detect-workers: 전체 감지를 감지 프로세스 풀에서 (가장 최근 완료 결과 사용)
+    pool = None
+    if args.detect_workers > 0:
+        pool = DetectionPool(workers=args.detect_workers, detector_config=detector_config)
+    
+    def full_detect(gray, scale):
+        if pool:
+            return pool.detect(gray, scale)
+        return detector.detect(gray, scale)
+    
+    times = {stage: [] for stage in STAGES}
+    frames = 0
+    face_frames = 0
+    
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    
+    try:
+        while args.max_frames <= 0 or frames < args.max_frames:
+            t0 = time.perf_counter()
+            ret, frame, info = source.read_latest()
+            if not ret:
+                break
+            t1 = time.perf_counter()
+            
+            gray = info['lores']
+            if gray is None:
+                gray = source.gray(frame)
+            scale = (source.width / gray.shape[1], source.height / gray.shape[0])
+            if tracker:
+                face_bbox = tracker.update(gray, lambda: full_detect(gray, scale), scale)
+            elif window:
+                face_bbox = window.detect(gray, scale=scale, detect_fn=lambda: full_detect(gray, scale))
+            else:
+                face_bbox = full_detect(gray, scale)
+            t2 = time.perf_counter()
+            
+            t_roi = t3 = t4 = t5 = t6 = t2
+            if face_bbox is not None:
+                face_frames += 1
+                bio_frame = source.roi_bgr(frame, face_bbox)
+                
+                # ROI 통계 한 번 (영상 시각을 타임스탬프로 사용 - 최대 속도 재생에서도 실제 샘플링 레이트 유지)
+                sample = roi_stats.compute(bio_frame, face_bbox, timestamp=info['timestamp'])
+                t_roi = t3 = t4 = t5 = t6 = time.perf_counter()
+                
+            if face_bbox is not None and pipeline:
+                pipeline.submit(sample)
+                t6 = time.perf_counter()
+            elif face_bbox is not None:
+                rppg.process_sample(sample)
+                t3 = time.perf_counter()
+                
+                spo2.process_sample(sample)
+                t4 = time.perf_counter()
+                
+                beats = rppg.pop_beats()
+                if beats:
+                    stress.update_beats(beats)
+                hr, _ = rppg.get_heart_rate()
+                if 40 < hr < 180:
+                    stress.update_heart_rate(hr, timestamp=info['timestamp'])
+                t5 = t6 = time.perf_counter()
+            
+            for stage, start, end in (('read', t0, t1), ('detect', t1, t2), ('roi', t2, t_roi),
+                                      ('rppg', t_roi, t3), ('spo2', t3, t4), ('stress', t4, t5),
+                                      ('queue', t5, t6), ('total', t0, t6)):
+                times[stage].append((end - start) * 1000)
+            frames += 1
+            
+            if comparison and face_bbox is not None:
+                comparison.legacy.process_sample(sample)
+                comparison.update()
+    finally:
+        source.release()
+    
+    # 워커 큐에 남은 샘플까지 처리 (벽시계 / CPU 측정에 포함)
+    worker = None
+    if pipeline:
+        pipeline.stop(timeout=None)
+        worker = pipeline.format_summary()
+    detection = None
+    if pool:
+        detection = pool.format_summary()
+        pool.close()
+    
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    
+    # 재생 속도가 실시간보다 빠르므로 LF/HF는 마지막에 한 번 더 계산
+    stress.compute_frequency_domain()
+    stress.stop()
+    if frames == 0:
+        print(f"✗ {path}: no frames")
+        return None
+    
+    hr, quality = rppg.get_heart_rate()
+    return {
+        'name': path,
+        'frames': frames,
+        'fps': frames / wall,
+        'cpu': cpu / wall * 100,  # 프로세스 CPU (100% = 코어 1개)
+        'face_rate': face_frames / frames * 100,
+        'latency': {stage: np.percentile(values, [50, 95, 99]) for stage, values in times.items()},
+        'heart_rate': hr,
+        'signal_quality': quality,
+        'spo2': spo2.get_spo2_data()['spo2'],
+        'stress': stress.get_stress_data(),
+        'worker': worker,
+        'detection': detection,
+        'comparison': comparison.result() if comparison else None
+    }
+
+
+def print_result(r):
+    """한 영상 결과 출력"""
+    print("\n" + "="*60)
+    print(f"🎬 {r['name']}: {r['frames']} frames | {r['fps']:.1f} fps | "
+          f"CPU {r['cpu']:.0f}% | face {r['face_rate']:.0f}%")
+    print("-"*60)
+    print(f"{'stage':<10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for stage in STAGES:
+        p50, p95, p99 = r['latency'][stage]
+        print(f"{stage:<10}{p50:>12.2f}{p95:>12.2f}{p99:>12.2f}")
+    print("-"*60)
+    stress = r['stress']
+    print(f"💓 Heart Rate: {r['heart_rate']:.1f} BPM (quality {r['signal_quality']})")
+    print(f"🫁 SpO2: {r['spo2']:.1f}%")
+    print(f"😰 Stress: {stress['stress_index']:.1f} ({stress['stress_level']}) | "
+          f"RMSSD {stress['rmssd']:.1f} | SDNN {stress['sdnn']:.1f}")
+    print(f"   RR source: {stress['rr_source']} | LF {stress['lf_power']:.1f} | "
+          f"HF {stress['hf_power']:.1f} | LF/HF {stress['lf_hf_ratio']:.2f}")
+    if r['worker'] or r['detection']:
+        print("-"*60)
+    if r['worker']:
+        print(r['worker'])
+    if r['detection']:
+        print(r['detection'])
+    c = r['comparison']
+    if c:
+        print("-"*60)
+        print(f"⚖️ rPPG streaming vs legacy: {c['streaming_hr']:.1f} vs {c['legacy_hr']:.1f} BPM | {c['hops']} hops")
+        print(f"   per-hop |ΔHR| p50 {c['delta'][0]:.1f} p95 {c['delta'][1]:.1f} max {c['delta'][2]:.1f} | "
+              f"final {c['final_delta']:.1f} (tolerance p95 {c['tolerance']:.1f} / max {c['max_tolerance']:.1f} BPM)")
+        if c['passed']:
+            print("   ✓ within tolerance")
+        else:
+            print(f"   ✗ out of tolerance ({c['failed_hops']} hops over max)")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Headless replay benchmark over recorded video')
+    parser.add_argument('videos', nargs='*', default=['face.mp4'], help='Video files (default: face.mp4)')
+    parser.add_argument('--fps', type=float, default=None, help='Override the file frame rate')
+    parser.add_argument('--lores', metavar='WxH', default=None,
+                        help='Detect on a downscaled gray image of this size (lores emulation)')
+    parser.add_argument('--face-strategy', choices=['detect', 'track', 'window'], default='detect',
+                        help='Face detection strategy (same as the trackers)')
+    parser.add_argument('--detector', choices=BACKENDS, default='haar',
+                        help='Face detector backend (same as the trackers, default: haar)')
+    parser.add_argument('--detector-model', default=None,
+                        help='Model file for the dnn / tflite backends')
+    parser.add_argument('--redetect-interval', type=int, default=10,
+                        help='Frames between full detections in track mode (default: 10)')
+    parser.add_argument('--max-frames', type=int, default=0, help='Stop after N frames per video (0 = all)')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Pace playback at the file frame rate (needed to judge --detect-workers result age)')
+    parser.add_argument('--rppg-legacy', action='store_true',
+                        help='Use the full per-frame rPPG recompute instead of the streaming engine')
+    parser.add_argument('--rppg-estimator', choices=rPPGProcessor.ESTIMATORS, default='fft',
+                        help='Streaming rPPG spectral estimator (default: fft)')
+    parser.add_argument('--rppg-algorithm', choices=ALGORITHMS, default='green',
+                        help='rPPG pulse extraction algorithm (default: green)')
+    parser.add_argument('--bio-worker', action='store_true',
+                        help='Run the estimators on the biometrics worker thread (as the trackers do)')
+    parser.add_argument('--rppg-compare', action='store_true',
+                        help='Also run the legacy rPPG engine and fail if the streaming HR leaves the tolerance')
+    parser.add_argument('--hr-tolerance', type=float, default=None,
+                        help='p95 per-hop |ΔHR| tolerance in BPM for --rppg-compare (default: one FFT bin)')
+    parser.add_argument('--hr-max-tolerance', type=float, default=None,
+                        help='Max per-hop and final |ΔHR| tolerance in BPM for --rppg-compare (default: two FFT bins)')
+    parser.add_argument('--detect-workers', type=int, default=0,
+                        help='Run full Haar detection in N worker processes (shared-memory frames)')
+    args = parser.parse_args()
+    args.lores = tuple(int(v) for v in args.lores.split('x')) if args.lores else None
+    if args.rppg_compare and (args.bio_worker or args.rppg_legacy):
+        parser.error('--rppg-compare runs both engines in the frame loop (drop --bio-worker / --rppg-legacy)')
+    
+    detector_config = {'backend': args.detector, 'model': args.detector_model}
+    try:
+        detector = create_detector(**detector_config)
+    except RuntimeError as e:
+        parser.error(f'{args.detector} detector unavailable: {e}')
+    
+    failed = []
+    for video in args.videos:
+        print(f"🔄 Replaying {video} ...")
+        result = run_replay(video, args, detector, detector_config)
+        if result:
+            print_result(result)
+            if result['comparison'] and not result['comparison']['passed']:
+                failed.append(video)
+    if args.rppg_compare and failed:
+        print(f"✗ rPPG streaming HR out of tolerance: {', '.join(failed)}")
+        raise SystemExit(1)
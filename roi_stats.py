@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+얼굴 ROI 통계 단계
+프레임마다 한 번, 얼굴 안의 여러 하위 ROI (rPPG 이마, SpO2 이마, 볼)의
+채널별 합 / 평균 / 분산을 적분 영상 한 장으로 계산해서 타임스탬프가 붙은 샘플 하나로 제공
+rPPGProcessor.process_sample / SpO2Estimator.process_sample이 같은 샘플을 사용
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+# 하위 ROI 정의: 얼굴 bbox 대비 (x, y, w, h) 비율
+DEFAULT_REGIONS = {
+    'forehead': (0.25, 0.15, 0.50, 0.20),       # rPPG 이마 (rPPGProcessor.extract_roi와 동일)
+    'forehead_wide': (0.20, 0.05, 0.60, 0.25),  # SpO2 이마 (SpO2Estimator._extract_spo2_roi와 동일)
+}
+
+CHEEK_REGIONS = {
+    'left_cheek': (0.15, 0.55, 0.25, 0.20),
+    'right_cheek': (0.60, 0.55, 0.25, 0.20),
+}
+
+
+def region_bbox(face_bbox, fractions, frame_shape):
+    """얼굴 bbox + 비율 -> 프레임 안으로 자른 (x, y, w, h) (없으면 None)
+    
+    각 추정기의 기존 ROI 계산과 같은 정수 변환 / 경계 처리
+    """
+    x, y, w, h = face_bbox
+    fx, fy, fw, fh = fractions
+    roi_x = max(0, x + int(w * fx))
+    roi_y = max(0, y + int(h * fy))
+    frame_h, frame_w = frame_shape[:2]
+    roi_w = min(int(w * fw), frame_w - roi_x)
+    roi_h = min(int(h * fh), frame_h - roi_y)
+    if roi_w <= 0 or roi_h <= 0:
+        return None
+    return (roi_x, roi_y, roi_w, roi_h)
+
+
+class ROIStatsStage:
+    """하위 ROI 채널 통계를 프레임당 한 번 계산
+    
+    모든 하위 ROI를 감싸는 영역에서 합 / 제곱합 적분 영상을 한 번 만들고
+    각 ROI는 모서리 4점 조회로 합과 제곱합을 얻는다 (ROI 개수와 무관하게 픽셀 1회 통과).
+    """
+    
+    def __init__(self, regions=None):
+        """
+        Args:
+            regions: {이름: (x, y, w, h) 얼굴 대비 비율} (None이면 DEFAULT_REGIONS)
+        """
+        self.regions = dict(regions or DEFAULT_REGIONS)
+        self.last_sample = None
+    
+    def compute(self, frame, face_bbox, timestamp=None):
+        """
+        한 프레임의 ROI 통계 샘플
+        
+        Args:
+            frame: BGR 프레임
+            face_bbox: (x, y, w, h)
+            timestamp: 프레임 시각 (없으면 현재 시각)
+        
+        Returns:
+            {'timestamp', 'face_bbox', 'regions': {이름: {'bbox', 'pixels', 'sum', 'mean', 'var'}}}
+            (sum / mean / var는 (B, G, R) 배열, 유효한 ROI가 없으면 None)
+        """
+        if face_bbox is None or frame is None or frame.ndim != 3 or frame.shape[2] != 3:
+            return None
+        
+        boxes = {}
+        for name, fractions in self.regions.items():
+            bbox = region_bbox(face_bbox, fractions, frame.shape)
+            if bbox is not None:
+                boxes[name] = bbox
+        if not boxes:
+            return None
+        
+        # 모든 ROI를 감싸는 영역의 적분 영상 (합, 제곱합)
+        left = min(bx for bx, _, _, _ in boxes.values())
+        top = min(by for _, by, _, _ in boxes.values())
+        right = max(bx + bw for bx, _, bw, _ in boxes.values())
+        bottom = max(by + bh for _, by, _, bh in boxes.values())
+        crop = frame[top:bottom, left:right]
+        if crop.dtype not in (np.uint8, np.float32, np.float64):
+            crop = crop.astype(np.float64)
+        sums, sq_sums = cv2.integral2(crop, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+        
+        regions = {}
+        for name, (bx, by, bw, bh) in boxes.items():
+            x0, y0 = bx - left, by - top
+            x1, y1 = x0 + bw, y0 + bh
+            pixels = bw * bh
+            total = sums[y1, x1] - sums[y0, x1] - sums[y1, x0] + sums[y0, x0]
+            sq_total = sq_sums[y1, x1] - sq_sums[y0, x1] - sq_sums[y1, x0] + sq_sums[y0, x0]
+            mean = total / pixels
+            regions[name] = {
+                'bbox': (bx, by, bw, bh),
+                'pixels': pixels,
+                'sum': total,
+                'mean': mean,
+                'var': np.maximum(sq_total / pixels - mean ** 2, 0.0)
+            }
+        
+        self.last_sample = {
+            'timestamp': time.time() if timestamp is None else timestamp,
+            'face_bbox': tuple(face_bbox),
+            'regions': regions
+        }
+        return self.last_sample
+
+
+def self_check(iterations=200):
+    """무작위 프레임 / 얼굴 위치에서 np.mean / np.var 기준과 비교 + 비용 측정"""
+    rng = np.random.default_rng(0)
+    stage = ROIStatsStage({**DEFAULT_REGIONS, **CHEEK_REGIONS})
+    frame = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    
+    stage_time = 0.0
+    numpy_time = 0.0
+    for _ in range(iterations):
+        w = int(rng.integers(60, 300))
+        h = int(w * rng.uniform(1.0, 1.3))
+        face_bbox = (int(rng.integers(-40, 640 - w // 2)), int(rng.integers(-40, 480 - h // 2)), w, h)
+        
+        start = time.perf_counter()
+        sample = stage.compute(frame, face_bbox, timestamp=0.0)
+        stage_time += time.perf_counter() - start
+        
+        start = time.perf_counter()
+        expected = {}
+        for name, fractions in stage.regions.items():
+            bbox = region_bbox(face_bbox, fractions, frame.shape)
+            if bbox is None:
+                continue
+            bx, by, bw, bh = bbox
+            roi = frame[by:by + bh, bx:bx + bw]
+            expected[name] = (np.mean(roi, axis=(0, 1)), np.var(roi, axis=(0, 1)), bbox)
+        numpy_time += time.perf_counter() - start
+        
+        got = sample['regions'] if sample else {}
+        assert set(got) == set(expected), (face_bbox, set(got), set(expected))
+        for name, (mean, var, bbox) in expected.items():
+            assert got[name]['bbox'] == bbox
+            assert np.allclose(got[name]['mean'], mean, atol=1e-9), (name, got[name]['mean'], mean)
+            assert np.allclose(got[name]['var'], var, atol=1e-6), (name, got[name]['var'], var)
+    
+    print(f"✓ ROI stats self-check passed ({len(stage.regions)} regions, {iterations} frames)")
+    print(f"   integral stage {stage_time / iterations * 1000:.3f} ms/frame | "
+          f"per-ROI numpy {numpy_time / iterations * 1000:.3f} ms/frame")
+    return True
+
+
+if __name__ == "__main__":
+    self_check()
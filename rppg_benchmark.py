@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+rPPG 스펙트럼 추정기 벤치마크
+합성 맥파 신호 (알려진 심박수 + 잡음 + 조명 드리프트)로 추정 방식별 정확도와 갱신 비용 비교
+  legacy - 매 프레임 detrend + filtfilt + rfft (기존 방식)
+  fft    - 스트리밍 필터 + hop마다 rfft
+  sdft   - 스트리밍 필터 + 심박 대역 슬라이딩 DFT + 피크 보간
+--algorithms: 움직임(조명 세기 변화)이 섞인 합성 (B, G, R) 신호로 GREEN / CHROM / POS 비교
+카메라 / 영상 없이 실행 가능 (실제 영상 비교는 replay_benchmark.py --rppg-estimator)
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from rppg_addon import rPPGProcessor
+from rppg_algorithms import ALGORITHMS
+
+MODES = ['legacy', 'fft', 'sdft']
+
+# 피부 맥파의 채널별 상대 세기 (B, G, R) - 녹색이 가장 강함
+PULSE_WEIGHTS = np.array([0.33, 0.77, 0.53])
+SKIN_COLOR = np.array([110.0, 130.0, 170.0])
+
+
+def synthetic_signal(bpm, seconds, fps, noise, seed):
+    """녹색 채널 평균값 흉내 (맥파 + 2차 고조파 + 드리프트 + 잡음 + 프레임 간격 흔들림)"""
+    rng = np.random.default_rng(seed)
+    count = int(seconds * fps)
+    timestamps = np.cumsum(1 / fps + rng.normal(0, 0.1 / fps, count))
+    phase = 2 * np.pi * bpm / 60 * timestamps
+    values = (120 + 0.5 * np.sin(phase) + 0.15 * np.sin(2 * phase + 0.6)
+              + 2.0 * np.sin(2 * np.pi * 0.05 * timestamps)
+              + rng.normal(0, noise, count))
+    return values, timestamps
+
+
+def synthetic_colors(bpm, seconds, fps, noise, motion, seed):
+    """ROI 평균색 (B, G, R) 흉내: 피부색 * 조명 세기(움직임) * (1 + 맥파) + 잡음"""
+    rng = np.random.default_rng(seed)
+    count = int(seconds * fps)
+    timestamps = np.cumsum(1 / fps + rng.normal(0, 0.1 / fps, count))
+    pulse = 0.004 * np.sin(2 * np.pi * bpm / 60 * timestamps)
+    # 머리 움직임 / 그림자: 느린 흔들림 + 심박 대역에 걸치는 불규칙 변화 (모든 채널 공통)
+    sway = np.sin(2 * np.pi * 0.3 * timestamps) + np.convolve(
+        rng.normal(0, 1, count), np.ones(8) / 8, mode='same'
+    )
+    intensity = 1 + motion * sway
+    colors = (SKIN_COLOR * intensity[:, np.newaxis] * (1 + pulse[:, np.newaxis] * PULSE_WEIGHTS / 0.77)
+              + rng.normal(0, noise, (count, 3)))
+    return colors, timestamps
+
+
+def run_algorithm(algorithm, colors, timestamps, fps):
+    """한 색 신호를 process_frame으로 처리하고 (최종 심박수, 첫 측정까지 초, 프레임당 ms) 반환"""
+    processor = rPPGProcessor(fps=fps, algorithm=algorithm)
+    frame = np.zeros((40, 40, 3))
+    bbox = (0, 0, 40, 200)  # 이마 ROI가 프레임 안에 오도록
+    first = None
+    elapsed = 0.0
+    for color, timestamp in zip(colors, timestamps):
+        frame[:] = color
+        start = time.perf_counter()
+        processor.process_frame(frame, bbox, timestamp=timestamp)
+        elapsed += time.perf_counter() - start
+        if first is None and processor.heart_rate > 0:
+            first = timestamp - timestamps[0]
+    return processor.heart_rate, first, elapsed / len(colors) * 1000
+
+
+def compare_algorithms(args):
+    """GREEN / CHROM / POS 정확도 + 첫 측정 시간 비교"""
+    results = {algorithm: {'error': [], 'first': [], 'ms': []} for algorithm in ALGORITHMS}
+    
+    print(f"{'BPM':>7}" + "".join(f"{algorithm:>10}" for algorithm in ALGORITHMS))
+    for seed, bpm in enumerate(args.bpm):
+        colors, timestamps = synthetic_colors(bpm, args.seconds, args.fps, args.noise, args.motion, seed)
+        row = f"{bpm:>7.1f}"
+        for algorithm in ALGORITHMS:
+            heart_rate, first, ms = run_algorithm(algorithm, colors, timestamps, args.fps)
+            results[algorithm]['error'].append(abs(heart_rate - bpm))
+            results[algorithm]['first'].append(first if first is not None else np.nan)
+            results[algorithm]['ms'].append(ms)
+            row += f"{heart_rate:>10.1f}"
+        print(row)
+    
+    print("\n" + "="*60)
+    print(f"{'algorithm':<10}{'mean|err| BPM':>15}{'max|err| BPM':>14}{'first s':>9}{'ms/frame':>11}")
+    for algorithm in ALGORITHMS:
+        r = results[algorithm]
+        print(f"{algorithm:<10}{np.mean(r['error']):>15.2f}{np.max(r['error']):>14.2f}"
+              f"{np.nanmean(r['first']):>9.2f}{np.mean(r['ms']):>11.3f}")
+    print("="*60)
+
+
+def make_processor(mode, fps):
+    """모드별 rPPGProcessor"""
+    if mode == 'legacy':
+        return rPPGProcessor(fps=fps, streaming=False)
+    return rPPGProcessor(fps=fps, estimator=mode)
+
+
+def run_mode(mode, values, timestamps, fps):
+    """한 신호를 처리하고 (최종 심박수, 프레임당 평균 ms, 갱신당 최대 ms) 반환"""
+    processor = make_processor(mode, fps)
+    times = []
+    for value, timestamp in zip(values, timestamps):
+        # process_frame의 ROI 추출을 건너뛰고 신호 처리 부분만 측정
+        processor.raw_values.append(value)
+        processor.timestamps.append(timestamp)
+        if len(processor.raw_values) < processor.buffer_size:
+            continue
+        start = time.perf_counter()
+        if processor.streaming:
+            processor._update_heart_rate_streaming()
+        else:
+            processor._calculate_heart_rate()
+        times.append((time.perf_counter() - start) * 1000)
+    
+    return processor.heart_rate, float(np.mean(times)), float(np.max(times))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='rPPG spectral estimator benchmark on synthetic pulses')
+    parser.add_argument('--fps', type=float, default=24, help='Sample rate (default: 24)')
+    parser.add_argument('--seconds', type=float, default=30, help='Signal length per trial (default: 30)')
+    parser.add_argument('--noise', type=float, default=0.4, help='Noise std (default: 0.4)')
+    parser.add_argument('--bpm', type=float, nargs='*', default=list(np.arange(52, 172, 7.3)),
+                        help='Heart rates to test (default: 52..170 BPM sweep)')
+    parser.add_argument('--algorithms', action='store_true',
+                        help='Compare GREEN / CHROM / POS on synthetic RGB with motion instead')
+    parser.add_argument('--motion', type=float, default=0.02,
+                        help='Illumination/motion modulation depth for --algorithms (default: 0.02)')
+    args = parser.parse_args()
+    
+    if args.algorithms:
+        compare_algorithms(args)
+        raise SystemExit(0)
+    
+    results = {mode: {'error': [], 'mean_ms': [], 'max_ms': []} for mode in MODES}
+    
+    print(f"{'BPM':>7}" + "".join(f"{mode:>10}" for mode in MODES))
+    for seed, bpm in enumerate(args.bpm):
+        values, timestamps = synthetic_signal(bpm, args.seconds, args.fps, args.noise, seed)
+        row = f"{bpm:>7.1f}"
+        for mode in MODES:
+            heart_rate, mean_ms, max_ms = run_mode(mode, values, timestamps, args.fps)
+            results[mode]['error'].append(abs(heart_rate - bpm))
+            results[mode]['mean_ms'].append(mean_ms)
+            results[mode]['max_ms'].append(max_ms)
+            row += f"{heart_rate:>10.1f}"
+        print(row)
+    
+    print("\n" + "="*60)
+    print(f"{'mode':<8}{'mean|err| BPM':>15}{'max|err| BPM':>14}{'ms/frame':>11}{'max ms':>10}")
+    for mode in MODES:
+        r = results[mode]
+        print(f"{mode:<8}{np.mean(r['error']):>15.2f}{np.max(r['error']):>14.2f}"
+              f"{np.mean(r['mean_ms']):>11.3f}{np.max(r['max_ms']):>10.3f}")
+    print("="*60)
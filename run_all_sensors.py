@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
 모든 센서 동시에 실행 - 라즈베리파이 5 호환
+세 센서의 MQTTSensorSender는 프로세스 공용 MQTT 연결 하나를 함께 사용 (클라이언트 / 네트워크 루프 / TCP 연결 1개)
 """
 
 import time
@@ -15,6 +16,9 @@ try:
     from infrared_sensor import InfraredSensor
     from sound_sensor import SoundSensor
     from dht_sensor import DHTSensor
+    from mqtt_sensor_sender import get_connection_manager
+    from scheduler import get_scheduler
+    import mqtt_config
     print("✓ 모든 센서 모듈 로드 완료")
 except ImportError as e:
     print(f"✗ 센서 모듈 로드 실패: {e}")
@@ -98,6 +102,13 @@ def main():
     print(f"\n🎉 {len(started_sensors)}개 센서가 성공적으로 시작되었습니다!")
     print("📊 시작된 센서:", ", ".join(started_sensors))
     
+    # 공유 MQTT 연결 (센서 전송기가 모두 같은 클라이언트 사용)
+    mqtt_manager = get_connection_manager(
+        mqtt_config.MQTT_CONFIG["broker_host"],
+        mqtt_config.MQTT_CONFIG["broker_port"]
+    )
+    print(mqtt_manager.format_summary())
+    
     # 종료 시그널 핸들러 등록
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -124,6 +135,9 @@ def main():
             
             print(f"⏰ 실행 시간: {hours:02d}:{minutes:02d}:{seconds:02d} | "
                   f"활성 센서: {active_count}/{len(started_sensors)}")
+            print(f"   {mqtt_manager.format_summary()}")
+            # 센서 샘플링 / 평균 작업 (같은 틱 병합, 지연 / 지터)
+            print(get_scheduler().format_summary())
             
     except KeyboardInterrupt:
         signal_handler(None, None)
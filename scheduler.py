@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+공용 주기 작업 스케줄러
+MQTT 전송기 / 센서가 주기 작업을 등록하면 스레드 하나가 다음 마감 시각까지 잠들었다가 정확히 그때 실행
+(100ms마다 깨어나 시간을 확인하던 폴링 루프 대체)
+- 마감 시각은 간격 격자에 맞춰 정렬되므로 같은 간격 / 배수 간격 작업은 같은 틱에 함께 실행 (깨어남 1번)
+- 마감은 이전 마감 + 간격으로 계산 (실행 시간이 누적되어 밀리지 않음), 놓친 주기는 건너뛰고 집계
+- 작업별 지연 (마감 -> 실제 실행) p50/p95/최대와 지터 (지연 표준편차)를 get_stats()로 확인
+- 등록된 작업이 없으면 스레드가 종료되고, 다음 등록 때 다시 시작
+작업 수가 적고 마감을 정확히 지켜야 하므로 틱 단위 타이머 휠 대신 마감 시각 힙 사용
+    python scheduler.py   # 자체 점검 (지연 / 틱 병합 / 건너뛰기 / 종료)
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+
+class ScheduledJob:
+    """등록된 주기 작업 (PeriodicScheduler.every()가 반환)"""
+    
+    def __init__(self, scheduler, interval, callback, name, offload):
+        self.scheduler = scheduler
+        self.interval = interval
+        self.callback = callback
+        self.name = name
+        self.offload = offload
+        self.deadline = 0.0
+        self.cancelled = False
+        
+        # 실행 중이 아니면 set (cancel(wait=True)에서 대기)
+        self.idle = threading.Event()
+        self.idle.set()
+        
+        # 통계
+        self.runs = 0
+        self.skipped = 0  # 이전 실행이 끝나지 않아 놓친 주기
+        self.errors = 0
+        self.lateness = RingBuffer(256)  # 마감 -> 실행 시작 (초)
+    
+    def cancel(self, wait=True, timeout=2.0):
+        """작업 취소 (wait=True면 실행 중인 콜백이 끝날 때까지 대기)"""
+        self.scheduler.cancel(self)
+        if wait and threading.current_thread() is not self.scheduler.thread:
+            self.idle.wait(timeout)
+    
+    def _run(self):
+        """콜백 실행 (예외는 출력하고 다음 주기에 계속)"""
+        try:
+            self.callback()
+        except Exception as e:
+            self.errors += 1
+            print(f"✗ Scheduled job '{self.name}' error: {e}")
+        finally:
+            self.idle.set()
+    
+    def get_stats(self):
+        """작업 통계 (지연 ms)"""
+        lateness = self.lateness.values() * 1000
+        if len(lateness):
+            p50, p95 = np.percentile(lateness, [50, 95])
+            late_max = float(lateness.max())
+            jitter = float(lateness.std())
+        else:
+            p50 = p95 = late_max = jitter = 0.0
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'late_p50_ms': round(float(p50), 3),
+            'late_p95_ms': round(float(p95), 3),
+            'late_max_ms': round(late_max, 3),
+            'jitter_ms': round(jitter, 3)
+        }
+
+
+class PeriodicScheduler:
+    """마감 시각 힙 + 스레드 하나로 여러 주기 작업 실행
+    
+    사용법:
+        scheduler = get_scheduler()
+        job = scheduler.every(5.0, self.send_biometrics, name="biometrics_send")
+        job.cancel()
+    콜백은 스케줄러 스레드에서 실행되므로 짧아야 한다. 오래 걸릴 수 있는 작업 (DHT 읽기 등)은
+    offload=True로 등록하면 별도 스레드에서 실행하고, 이전 실행이 끝나지 않았으면 그 주기는 건너뛴다.
+    """
+    
+    def __init__(self, resolution=0.002):
+        """
+        Args:
+            resolution: 이 시간 (초) 안에 마감이 몰린 작업은 한 번 깨어나서 함께 실행
+        """
+        self.resolution = resolution
+        self.condition = threading.Condition()
+        self.heap = []  # (마감 시각, 순번, 작업)
+        self.counter = itertools.count()
+        self.jobs = []
+        self.thread = None
+        
+        # 통계
+        self.wakeups = 0  # 작업을 실행하려고 깨어난 횟수
+        self.fired = 0  # 실행한 작업 수 (wakeups보다 많은 만큼 틱 병합)
+    
+    def every(self, interval, callback, name=None, offload=False, align=True):
+        """
+        주기 작업 등록
+        
+        Args:
+            interval: 주기 (초)
+            callback: 인자 없는 함수
+            name: 통계용 이름
+            offload: True면 별도 스레드에서 실행 (스케줄러 스레드를 막지 않음)
+            align: True면 첫 마감을 간격 격자 (monotonic 시각의 interval 배수)에 맞춤
+                   -> 같은 간격 작업끼리 같은 틱에 실행
+        
+        Returns:
+            ScheduledJob
+        """
+        job = ScheduledJob(self, interval, callback, name or getattr(callback, '__name__', 'job'), offload)
+        now = time.monotonic()
+        job.deadline = math.ceil(now / interval) * interval if align else now + interval
+        with self.condition:
+            self.jobs.append(job)
+            heapq.heappush(self.heap, (job.deadline, next(self.counter), job))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+                self.thread.start()
+            self.condition.notify()
+        return job
+    
+    def cancel(self, job):
+        """작업 취소 (힙에서는 다음에 꺼낼 때 버림)"""
+        with self.condition:
+            if job.cancelled:
+                return
+            job.cancelled = True
+            self.jobs.remove(job)
+            self.condition.notify()
+    
+    def stop(self, timeout=2.0):
+        """모든 작업 취소 + 스레드 종료 대기"""
+        with self.condition:
+            jobs = list(self.jobs)
+        for job in jobs:
+            job.cancel(timeout=timeout)
+        thread = self.thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+    
+    def _loop(self):
+        """다음 마감까지 대기 -> 마감된 작업 (resolution 안에 몰린 것 포함) 실행 -> 다음 마감 등록"""
+        while True:
+            with self.condition:
+                while True:
+                    if not self.jobs:
+                        # 등록된 작업이 없으면 종료 (다음 every()에서 다시 시작)
+                        self.heap = []
+                        self.thread = None
+                        return
+                    while self.heap and self.heap[0][2].cancelled:
+                        heapq.heappop(self.heap)
+                    delay = self.heap[0][0] - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self.condition.wait(delay)
+                
+                now = time.monotonic()
+                due = []
+                while self.heap and self.heap[0][0] <= now + self.resolution:
+                    _, _, job = heapq.heappop(self.heap)
+                    if not job.cancelled:
+                        due.append(job)
+                self.wakeups += 1
+                self.fired += len(due)
+            
+            for job in due:
+                self._fire(job)
+            
+            # 다음 마감 = 이전 마감 + 간격 (이미 지난 주기는 건너뛰고 집계)
+            with self.condition:
+                now = time.monotonic()
+                for job in due:
+                    if job.cancelled:
+                        continue
+                    job.deadline += job.interval
+                    if job.deadline <= now:
+                        missed = math.floor((now - job.deadline) / job.interval) + 1
+                        job.skipped += missed
+                        job.deadline += missed * job.interval
+                    heapq.heappush(self.heap, (job.deadline, next(self.counter), job))
+    
+    def _fire(self, job):
+        """작업 하나 실행 (offload면 이전 실행이 끝났을 때만 새 스레드에서)"""
+        if not job.idle.is_set():
+            job.skipped += 1
+            return
+        job.lateness.append(max(0.0, time.monotonic() - job.deadline))
+        job.runs += 1
+        job.idle.clear()
+        if job.offload:
+            threading.Thread(target=job._run, name=job.name, daemon=True).start()
+        else:
+            job._run()
+    
+    def get_stats(self):
+        """스케줄러 + 작업별 통계"""
+        with self.condition:
+            jobs = list(self.jobs)
+        return {
+            'jobs': {job.name: job.get_stats() for job in jobs},
+            'wakeups': self.wakeups,
+            'fired': self.fired,
+            'coalesced': self.fired - self.wakeups
+        }
+    
+    def format_summary(self, stats=None):
+        """요약 텍스트"""
+        stats = stats or self.get_stats()
+        lines = [
+            f"⏱️ Scheduler: {len(stats['jobs'])} jobs | {stats['wakeups']} wake-ups for "
+            f"{stats['fired']} runs ({stats['coalesced']} coalesced)"
+        ]
+        for name, s in stats['jobs'].items():
+            lines.append(f"   {name:<20}every {s['interval']:g}s | late p50 {s['late_p50_ms']:.2f} "
+                         f"p95 {s['late_p95_ms']:.2f} max {s['late_max_ms']:.2f} ms | "
+                         f"jitter {s['jitter_ms']:.2f} ms | skipped {s['skipped']}")
+        return "\n".join(lines)
+
+
+# 프로세스 공용 스케줄러 (센서 / 전송기가 함께 사용)
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """프로세스 공용 스케줄러 반환 (없으면 생성)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PeriodicScheduler()
+        return _scheduler
+
+
+def self_check():
+    """지연 / 틱 병합 / 건너뛰기 / offload / 종료 확인"""
+    scheduler = PeriodicScheduler()
+    counts = {'fast_a': 0, 'fast_b': 0, 'slow': 0, 'offload': 0}
+    
+    def bump(name):
+        counts[name] += 1
+    
+    def blocking():
+        counts['offload'] += 1
+        time.sleep(0.25)
+    
+    jobs = [
+        scheduler.every(0.05, lambda: bump('fast_a'), name='fast_a'),
+        scheduler.every(0.05, lambda: bump('fast_b'), name='fast_b'),
+        scheduler.every(0.5, lambda: bump('slow'), name='slow'),
+        scheduler.every(0.1, blocking, name='offload', offload=True),
+    ]
+    time.sleep(2.0)
+    stats = scheduler.get_stats()
+    print(scheduler.format_summary(stats))
+    
+    # 같은 간격 작업은 같은 틱 -> 깨어남 수가 실행 수보다 적음
+    assert stats['coalesced'] >= counts['fast_a'] - 2, stats
+    assert 36 <= counts['fast_a'] <= 41, counts
+    assert 3 <= counts['slow'] <= 5, counts
+    # 0.25초 걸리는 offload 작업은 0.1초 주기 중 일부를 건너뜀 (스케줄러 스레드는 막히지 않음)
+    assert stats['jobs']['offload']['skipped'] > 0 and stats['jobs']['fast_a']['late_p95_ms'] < 20, stats
+    
+    scheduler.stop()
+    assert scheduler.thread is None and all(job.cancelled for job in jobs)
+    done = dict(counts)
+    time.sleep(0.2)
+    assert counts == done, (counts, done)
+    print("✓ self-check passed")
+
+
+if __name__ == "__main__":
+    self_check()
@@ -5,27 +5,37 @@ PIR, 소음, 온습도 센서를 통합 관리하고 MQTT 브로커로 데이터
 """
 
 import time
-import json
 import threading
 from datetime import datetime
 import paho.mqtt.client as mqtt
 
+from mqtt_codecs import CodecRegistry
+
 # 센서 모듈 import
 from pir_sensor import PIRSensor
 from sound_sensor import SoundSensor
 from temp_humidity_sensor import TempHumiditySensor
 
 class SensorController:
-    def __init__(self, mqtt_broker="localhost", mqtt_port=1883):
+    def __init__(self, mqtt_broker="localhost", mqtt_port=1883, codec="json", topic_codecs=None):
         """
         센서 컨트롤러 초기화
         Args:
             mqtt_broker (str): MQTT 브로커 주소
             mqtt_port (int): MQTT 브로커 포트
+            codec (str): 페이로드 코덱 (json / msgpack / cbor / struct, JSON이 아니면 토픽 끝에 /<코덱 이름>)
+            topic_codecs (dict): MQTT 패턴 -> 코덱 이름
         """
         self.mqtt_broker = mqtt_broker
         self.mqtt_port = mqtt_port
         
+        # 페이로드 코덱 (msgpack / cbor2가 없으면 JSON)
+        try:
+            self.codecs = CodecRegistry(codec, topic_codecs)
+        except RuntimeError as e:
+            print(f"MQTT 코덱 사용 불가 ({e}) - JSON 사용")
+            self.codecs = CodecRegistry()
+        
         # 센서 초기화
         try:
             self.pir_sensor = PIRSensor(pin=18)
@@ -88,12 +98,12 @@ class SensorController:
     def publish_sensor_data(self, topic, data):
         """센서 데이터를 MQTT로 발행"""
         try:
-            json_data = json.dumps(data, indent=2)
-            result = self.mqtt_client.publish(topic, json_data)
+            publish_topic, payload = self.codecs.encode(topic, data)
+            result = self.mqtt_client.publish(publish_topic, payload)
             
             if result.rc == mqtt.MQTT_ERR_SUCCESS:
-                print(f"데이터 발행 성공 - 토픽: {topic}")
-                print(f"데이터: {json_data}")
+                print(f"데이터 발행 성공 - 토픽: {publish_topic} ({len(payload)} bytes)")
+                print(f"데이터: {data}")
             else:
                 print(f"데이터 발행 실패 - 토픽: {topic}, 오류코드: {result.rc}")
                 
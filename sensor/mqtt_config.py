@@ -11,7 +11,11 @@ MQTT_CONFIG = {
     "password": None,            # 인증 필요시 비밀번호
     "topic_prefix": "sensors",   # 토픽 접두사
     "qos": 0,                    # QoS 레벨 (0, 1, 2)
-    "retain": False              # 메시지 보존 여부
+    "retain": False,             # 메시지 보존 여부
+    "codec": "json",             # 페이로드 코덱 (json / msgpack / cbor / struct, mqtt_codecs.py)
+    "topic_codecs": {},          # 토픽별 코덱 (예: {"sensors/#": "struct"} -> sensors/infrared/struct)
+    "outbox": None               # 브로커가 끊긴 동안 디스크에 저장 후 재연결 시 전송 (mqtt_outbox.py)
+                                 # 예: {"path": "mqtt_outbox.db", "max_mb": 64, "rate": 50, "qos": 1}
 }
 
 # 센서별 설정
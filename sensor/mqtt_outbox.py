@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+MQTT 저장 후 전달 (store-and-forward) 큐
+브로커 연결이 끊긴 동안 발행할 메시지를 SQLite (WAL 모드) 파일에 쌓아 두고,
+재연결되면 드레인 스레드가 쌓인 순서대로 배치 발행 (초당 메시지 수 제한, QoS 설정 가능)
+- 프로세스가 재시작돼도 파일에 남은 메시지는 다음 실행에서 이어서 전송
+- 크기 상한 (max_mb)을 넘으면 가장 오래된 메시지부터 버림 (evict="newest"면 새 메시지를 버림)
+- 메모리에는 드레인 배치 하나만 올리므로 몇 시간치 백로그도 메모리 사용량과 무관
+    python mqtt_outbox.py --self-check   # 메모리 안의 가짜 브로커로 끊김 / 재시작 / 순서 / 상한 확인
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+
+class MQTTOutbox:
+    """SQLite WAL 기반 영구 발행 큐 + 드레인 스레드
+    
+    사용법:
+        outbox = MQTTOutbox("mqtt_outbox.db")
+        outbox.start(publish_batch, is_connected)   # 드레인 스레드 시작
+        outbox.put(topic, payload, qos)             # 연결이 없거나 백로그가 있을 때
+        outbox.wake()                               # 재연결 시 바로 드레인
+        outbox.close()
+    publish_batch(rows)는 [(topic, payload, qos, retain)] 를 순서대로 발행하고
+    브로커까지 전달이 확인된 앞쪽 메시지 수를 반환 (그만큼만 큐에서 삭제)
+    """
+    
+    def __init__(self, path="mqtt_outbox.db", max_mb=64.0, evict="oldest", rate=50.0, batch=100,
+                 qos=1, synchronous="NORMAL"):
+        """
+        Args:
+            path: SQLite 파일 경로
+            max_mb: 큐 페이로드 상한 (MB)
+            evict: 상한 초과 시 버릴 메시지 ("oldest" / "newest")
+            rate: 드레인 초당 최대 메시지 수
+            batch: 드레인 한 번에 발행할 메시지 수
+            qos: 큐에서 발행할 때 최소 QoS (메시지 자체 QoS가 더 높으면 그 값)
+            synchronous: SQLite synchronous (NORMAL: 프로세스 종료에 안전, FULL: 전원 차단에도 안전)
+        """
+        if evict not in ("oldest", "newest"):
+            raise ValueError(f"evict must be 'oldest' or 'newest', not {evict!r}")
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.evict = evict
+        self.rate = rate
+        self.batch = batch
+        self.qos = qos
+        
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(f"PRAGMA synchronous={synchronous}")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, payload BLOB NOT NULL, "
+            "qos INTEGER NOT NULL, retain INTEGER NOT NULL, created REAL NOT NULL)"
+        )
+        
+        # 이전 실행에서 남은 메시지 (재시작 후 이어서 전송)
+        count, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM outbox").fetchone()
+        self.count = count
+        self.bytes = size
+        self.restored = count
+        
+        # 통계
+        self.queued = 0
+        self.sent = 0
+        self.evicted = 0
+        self.drain_time = 0.0  # 마지막 드레인 배치 시간 (초)
+        
+        self.wake_event = threading.Event()
+        self.thread = None
+        self.running = False
+    
+    def __len__(self):
+        return self.count
+    
+    def put(self, topic, payload, qos=0, retain=False):
+        """메시지 저장 (상한을 넘으면 evict 정책대로 버림) - 저장했으면 True"""
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        size = len(payload)
+        with self.lock:
+            if self.bytes + size > self.max_bytes:
+                if self.evict == "newest" or size > self.max_bytes:
+                    self.evicted += 1
+                    return False
+                self._evict_oldest(self.bytes + size - self.max_bytes)
+            self.db.execute(
+                "INSERT INTO outbox (topic, payload, qos, retain, created) VALUES (?, ?, ?, ?, ?)",
+                (topic, payload, max(qos, self.qos), int(retain), time.time())
+            )
+            self.count += 1
+            self.bytes += size
+            self.queued += 1
+        self.wake_event.set()
+        return True
+    
+    def _evict_oldest(self, excess):
+        """가장 오래된 메시지부터 excess 바이트 이상 삭제 (lock 안에서 호출)"""
+        freed = 0
+        removed = 0
+        last_id = None
+        for row_id, size in self.db.execute("SELECT id, LENGTH(payload) FROM outbox ORDER BY id"):
+            freed += size
+            removed += 1
+            last_id = row_id
+            if freed >= excess:
+                break
+        if last_id is not None:
+            self.db.execute("DELETE FROM outbox WHERE id <= ?", (last_id,))
+            self.count -= removed
+            self.bytes -= freed
+            self.evicted += removed
+    
+    def peek(self, limit):
+        """가장 오래된 limit개 [(id, topic, payload, qos, retain)]"""
+        with self.lock:
+            return self.db.execute(
+                "SELECT id, topic, payload, qos, retain FROM outbox ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+    
+    def ack(self, rows):
+        """전달 확인된 메시지 삭제 (peek 결과의 앞부분)"""
+        if not rows:
+            return
+        with self.lock:
+            # 드레인 중에 상한 초과로 이미 지워진 메시지는 빼고 계산
+            count, size = self.db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM outbox WHERE id <= ?", (rows[-1][0],)
+            ).fetchone()
+            self.db.execute("DELETE FROM outbox WHERE id <= ?", (rows[-1][0],))
+            self.count -= count
+            self.bytes -= size
+            self.sent += len(rows)
+    
+    def drain_once(self, publish_batch):
+        """배치 하나 발행 -> 전달된 메시지 수 (0이면 큐가 비었거나 전달 실패)"""
+        rows = self.peek(self.batch)
+        if not rows:
+            return 0
+        start = time.perf_counter()
+        delivered = publish_batch([(topic, payload, qos, bool(retain)) for _, topic, payload, qos, retain in rows])
+        self.ack(rows[:delivered])
+        self.drain_time = time.perf_counter() - start
+        return delivered
+    
+    def start(self, publish_batch, is_connected):
+        """드레인 스레드 시작 (연결돼 있고 쌓인 메시지가 있으면 rate 제한으로 발행)"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._drain_loop, args=(publish_batch, is_connected), daemon=True)
+        self.thread.start()
+    
+    def wake(self):
+        """드레인 스레드 깨우기 (재연결 시)"""
+        self.wake_event.set()
+    
+    def _drain_loop(self, publish_batch, is_connected):
+        """재연결 / 새 메시지 알림을 기다렸다가 큐가 빌 때까지 배치 발행"""
+        while self.running:
+            self.wake_event.wait(1.0)
+            self.wake_event.clear()
+            while self.running and self.count and is_connected():
+                try:
+                    delivered = self.drain_once(publish_batch)
+                except Exception as e:
+                    print(f"✗ Outbox drain error: {e}")
+                    break
+                if delivered == 0:
+                    break
+                # 초당 rate개로 제한
+                time.sleep(delivered / self.rate if self.rate > 0 else 0)
+    
+    def get_stats(self):
+        """큐 통계"""
+        with self.lock:
+            row = self.db.execute("SELECT created FROM outbox ORDER BY id LIMIT 1").fetchone()
+        oldest = row[0] if row else None
+        return {
+            'pending': self.count,
+            'pending_kb': round(self.bytes / 1024, 1),
+            'oldest_s': round(time.time() - oldest, 1) if oldest else 0.0,
+            'restored': self.restored,
+            'queued': self.queued,
+            'sent': self.sent,
+            'evicted': self.evicted,
+            'drain_ms': round(self.drain_time * 1000, 1)
+        }
+    
+    def format_summary(self, stats=None):
+        """요약 텍스트"""
+        stats = stats or self.get_stats()
+        return (f"💾 MQTT outbox: {stats['pending']} pending ({stats['pending_kb']:.1f} KB, "
+                f"oldest {stats['oldest_s']:.0f}s) | sent {stats['sent']} | "
+                f"evicted {stats['evicted']} | restored {stats['restored']}")
+    
+    def close(self):
+        """드레인 스레드 중지 + 파일 닫기 (남은 메시지는 다음 실행에서 전송)"""
+        self.running = False
+        self.wake_event.set()
+        if self.thread:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+        with self.lock:
+            self.db.close()
+
+
+def paho_publish_batch(client, rows, timeout=5.0):
+    """
+    paho 클라이언트로 배치 발행 -> 브로커 전달이 확인된 앞쪽 메시지 수
+    
+    Args:
+        client: paho.mqtt.client.Client
+        rows: [(topic, payload, qos, retain)]
+        timeout: 배치 전체의 전달 확인 대기 시간 (초)
+    
+    QoS 1/2는 PUBACK / PUBCOMP, QoS 0은 소켓 쓰기 완료를 전달로 본다.
+    """
+    infos = []
+    for topic, payload, qos, retain in rows:
+        info = client.publish(topic, payload, qos=qos, retain=retain)
+        if info.rc != 0:
+            break
+        infos.append(info)
+    
+    deadline = time.time() + timeout
+    delivered = 0
+    for info in infos:
+        while not info.is_published():
+            if time.time() >= deadline:
+                return delivered
+            time.sleep(0.01)
+        delivered += 1
+    return delivered
+
+
+class _FakeBroker:
+    """self-check용 메모리 안의 브로커 (연결 상태 전환 + 받은 메시지 기록)"""
+    
+    def __init__(self):
+        self.connected = False
+        self.received = []
+    
+    def publish_batch(self, rows):
+        delivered = 0
+        for topic, payload, qos, retain in rows:
+            if not self.connected:
+                break
+            self.received.append((topic, payload, qos))
+            delivered += 1
+        return delivered
+
+
+def self_check():
+    """가짜 브로커로 끊김 -> 재시작 -> 재연결 순서 / QoS / 상한 / 속도 제한 확인"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "outbox.db")
+        broker = _FakeBroker()
+        
+        # 1. 브로커가 끊긴 동안 쌓기 -> 프로세스 재시작 (파일만 남음)
+        outbox = MQTTOutbox(path, rate=0, qos=1)
+        outbox.start(broker.publish_batch, lambda: broker.connected)
+        for i in range(500):
+            outbox.put("sensors/infrared", f"{i}".encode(), qos=0)
+        outbox.close()
+        
+        outbox = MQTTOutbox(path, rate=2000, batch=50, qos=1)
+        assert outbox.restored == 500, outbox.restored
+        
+        # 2. 재연결 -> 순서대로 모두 전달 (속도 제한 확인)
+        outbox.start(broker.publish_batch, lambda: broker.connected)
+        broker.connected = True
+        start = time.time()
+        outbox.wake()
+        while len(outbox) and time.time() - start < 10:
+            time.sleep(0.01)
+        elapsed = time.time() - start
+        outbox.close()
+        assert [int(payload) for _, payload, _ in broker.received] == list(range(500))
+        assert all(qos == 1 for _, _, qos in broker.received)
+        assert elapsed >= 500 / 2000 * 0.8, elapsed
+        print(f"✓ restart + in-order drain: 500 messages in {elapsed * 1000:.0f} ms (limit 2000/s)")
+        
+        # 3. 상한 초과 -> 가장 오래된 메시지부터 버림
+        outbox = MQTTOutbox(path, max_mb=1000 / 1024 / 1024)
+        for i in range(20):
+            outbox.put("t", b"x" * 99 + bytes([i]))
+        kept = [payload[-1] for _, _, payload, _, _ in outbox.peek(100)]
+        assert kept == list(range(10, 20)), kept
+        assert outbox.bytes <= outbox.max_bytes and outbox.evicted == 10
+        print(f"✓ size cap: kept newest {len(kept)} of 20 (evicted {outbox.evicted})")
+        print(outbox.format_summary())
+        outbox.close()
+    print("✓ self-check passed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='MQTT store-and-forward outbox')
+    parser.add_argument('path', nargs='?', default=None, help='Outbox file to inspect')
+    parser.add_argument('--self-check', action='store_true',
+                        help='Outage / restart / ordering / size cap check against an in-process fake broker')
+    args = parser.parse_args()
+    
+    if args.self_check:
+        self_check()
+    elif args.path:
+        outbox = MQTTOutbox(args.path)
+        print(outbox.format_summary())
+        outbox.close()
+    else:
+        parser.print_help()
@@ -9,7 +9,6 @@ import json
 from datetime import datetime
 from collections import deque
 import numpy as np
-import threading
 
 # GPIO 라이브러리 선택 (라즈베리파이 5 호환)
 GPIO_LIB = None
@@ -34,6 +33,7 @@ except ImportError:
 
 from mqtt_sensor_sender import MQTTSensorSender
 import mqtt_config
+from scheduler import get_scheduler
 
 # GPIO 설정
 SOUND_PIN = 27  # 소음 센서 GPIO 핀
@@ -86,12 +86,16 @@ class SoundSensor:
             broker_host=mqtt_config.MQTT_CONFIG["broker_host"],
             broker_port=mqtt_config.MQTT_CONFIG["broker_port"],
             client_id=f"sound_sensor_{int(time.time())}",
-            topic_prefix=mqtt_config.MQTT_CONFIG["topic_prefix"]
+            topic_prefix=mqtt_config.MQTT_CONFIG["topic_prefix"],
+            codec=mqtt_config.MQTT_CONFIG.get("codec", "json"),
+            topic_codecs=mqtt_config.MQTT_CONFIG.get("topic_codecs"),
+            outbox=mqtt_config.MQTT_CONFIG.get("outbox")
         )
         
-        # 실행 제어
+        # 실행 제어 (샘플링 / 평균 전송은 공용 스케줄러의 주기 작업)
         self.running = False
-        self.thread = None
+        self.scheduler = get_scheduler()
+        self.jobs = []
         
         # 소음 감지 이벤트 카운터
         self.event_counter = 0
@@ -114,33 +118,15 @@ class SoundSensor:
             print(f"✗ 소음 센서 읽기 오류: {e}")
             return None
     
-    def collect_data(self):
-        """데이터 수집 및 전송 루프"""
-        last_average_time = time.time()
-        
-        while self.running:
-            try:
-                # 센서 값 읽기
-                value = self.read_sensor()
-                if value is not None:
-                    self.buffer.append(value)
+    def sample(self):
+        """센서 값 1회 읽기 (SAMPLE_INTERVAL마다 스케줄러가 호출)"""
+        value = self.read_sensor()
+        if value is not None:
+            self.buffer.append(value)
                     
-                    # 소음 감지 시 카운터 증가 (HIGH 신호일 때)
-                    if value == 1:
-                        self.event_counter += 1
-                
-                # 5초마다 평균 계산 및 전송
-                current_time = time.time()
-                if current_time - last_average_time >= AVERAGE_INTERVAL:
-                    self.calculate_and_send_average()
-                    last_average_time = current_time
-                
-                # 샘플링 간격 대기
-                time.sleep(SAMPLE_INTERVAL)
-                
-            except Exception as e:
-                print(f"✗ 데이터 수집 오류: {e}")
-                time.sleep(1)
+            # 소음 감지 시 카운터 증가 (HIGH 신호일 때)
+            if value == 1:
+                self.event_counter += 1
     
     def calculate_and_send_average(self):
         """5초 평균 계산 및 MQTT 전송"""
@@ -172,10 +158,9 @@ class SoundSensor:
             "gpio_lib": self.gpio_lib if self.is_pi else "none"
         }
         
-        # MQTT로 전송
-        if self.mqtt_sender.connected:
-            topic = f"{mqtt_config.MQTT_CONFIG['topic_prefix']}/sound"
-            self.mqtt_sender.publish_message(topic, sensor_data)
+        # MQTT로 전송 (브로커가 끊긴 동안은 outbox에 저장)
+        topic = f"{mqtt_config.MQTT_CONFIG['topic_prefix']}/sound"
+        if self.mqtt_sender.publish_message(topic, sensor_data):
             mode_text = f" ({self.gpio_lib})" if self.is_pi else " (Mock)"
             print(f"🔊 소음 레벨{mode_text}: {noise_level} (이벤트: {self.event_counter}개, {events_per_second}/초)")
         
@@ -195,10 +180,12 @@ class SoundSensor:
             print("✗ MQTT 연결 실패")
             return False
         
+        # 샘플링 / 5초 평균 전송 작업 등록 (같은 간격의 다른 센서 작업과 같은 틱에 실행)
         self.running = True
-        self.thread = threading.Thread(target=self.collect_data)
-        self.thread.daemon = True
-        self.thread.start()
+        self.jobs = [
+            self.scheduler.every(SAMPLE_INTERVAL, self.sample, name="sound_sample"),
+            self.scheduler.every(AVERAGE_INTERVAL, self.calculate_and_send_average, name="sound_average")
+        ]
         
         lib_text = self.gpio_lib if self.is_pi else "Mock"
         print(f"🚀 소음 센서 모니터링 시작 ({lib_text}, GPIO {SOUND_PIN})")
@@ -207,8 +194,9 @@ class SoundSensor:
     def stop(self):
         """센서 모니터링 중지"""
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=2.0)
+        for job in self.jobs:
+            job.cancel()
+        self.jobs = []
         
         # MQTT 연결 해제
         self.mqtt_sender.disconnect()
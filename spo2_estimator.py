@@ -1,21 +1,21 @@
 import numpy as np
-from collections import deque
 import time
 from scipy import signal
 import threading
+from ring_buffer import RingBuffer
 
 class SpO2Estimator:
     """카메라 기반 산소 포화도(SpO2) 추정"""
     
+    # process_sample에서 사용할 ROIStatsStage 하위 ROI 이름 (_extract_spo2_roi와 같은 이마 영역)
+    roi_region = 'forehead_wide'
+    
     def __init__(self, fps=30, buffer_size=150):
         self.fps = fps
         self.buffer_size = buffer_size
         
-        # RGB 채널별 신호 버퍼
-        self.red_values = deque(maxlen=buffer_size)
-        self.blue_values = deque(maxlen=buffer_size)
-        self.green_values = deque(maxlen=buffer_size)
-        self.timestamps = deque(maxlen=buffer_size)
+        # RGB 채널별 신호 버퍼 ((B, G, R) + 시각 열을 함께 담는 미리 할당된 numpy 링 버퍼)
+        self.color_values = RingBuffer(buffer_size, channels=3, timestamps=True)
         
         # SpO2 결과
         self.spo2_value = 0
@@ -39,9 +39,29 @@ class SpO2Estimator:
             'ac_red': 0,
             'ac_blue': 0
         }
+    
+    @property
+    def red_values(self):
+        """빨강 채널 신호 (오래된 순서 뷰)"""
+        return self.color_values.values()[:, 2]
+    
+    @property
+    def green_values(self):
+        """녹색 채널 신호 (오래된 순서 뷰)"""
+        return self.color_values.values()[:, 1]
+    
+    @property
+    def blue_values(self):
+        """파랑 채널 신호 (오래된 순서 뷰)"""
+        return self.color_values.values()[:, 0]
+    
+    @property
+    def timestamps(self):
+        """샘플 시각 (오래된 순서 뷰)"""
+        return self.color_values.times()
         
-    def process_frame(self, frame, face_bbox):
-        """프레임에서 SpO2 추정을 위한 신호 추출"""
+    def process_frame(self, frame, face_bbox, timestamp=None):
+        """프레임에서 SpO2 추정을 위한 신호 추출 (timestamp: 프레임 시각, 없으면 현재 시각)"""
         if face_bbox is None:
             return
             
@@ -61,15 +81,26 @@ class SpO2Estimator:
         if mean_rgb.shape != (3,):
             return
         
+        self._add_color(mean_rgb, time.time() if timestamp is None else timestamp)
+    
+    def process_sample(self, sample):
+        """ROIStatsStage 샘플로 SpO2 신호 추가 (ROI 평균을 다시 계산하지 않음)"""
+        if sample is None:
+            return
+        region = sample['regions'].get(self.roi_region)
+        if region is None:
+            return
+        self.roi_bbox = region['bbox']
+        self._add_color(region['mean'], sample['timestamp'])
+    
+    def _add_color(self, mean_rgb, timestamp):
+        """ROI 평균색 (B, G, R) 한 샘플 추가 후 필요하면 SpO2 계산"""
         with self.lock:
-            # BGR to RGB 순서 변경
-            self.blue_values.append(float(mean_rgb[0]))
-            self.green_values.append(float(mean_rgb[1]))
-            self.red_values.append(float(mean_rgb[2]))
-            self.timestamps.append(time.time())
+            # (B, G, R) 순서 그대로 저장
+            self.color_values.append(mean_rgb[:3], timestamp)
             
             # 충분한 데이터가 모이면 SpO2 계산
-            if len(self.red_values) >= self.buffer_size:
+            if len(self.color_values) >= self.buffer_size:
                 self._calculate_spo2()
     
     def _extract_spo2_roi(self, frame, face_bbox):
@@ -105,10 +136,11 @@ class SpO2Estimator:
     def _calculate_spo2(self):
         """SpO2 계산"""
         try:
-            # 신호 배열 생성
-            red_array = np.array(self.red_values)
-            blue_array = np.array(self.blue_values)
-            time_array = np.array(self.timestamps)
+            # 신호 배열 (링 버퍼 뷰 - 복사 없음)
+            colors = self.color_values.values()
+            red_array = colors[:, 2]
+            blue_array = colors[:, 0]
+            time_array = self.color_values.times()
             
             # 실제 샘플링 레이트
             time_diff = time_array[-1] - time_array[0]
@@ -219,7 +251,7 @@ class SpO2Estimator:
                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2)
         else:
             # 측정 중
-            buffer_percent = (len(self.red_values) / self.buffer_size) * 100
+            buffer_percent = (len(self.color_values) / self.buffer_size) * 100
             cv2.putText(frame, f"SpO2: Measuring... ({buffer_percent:.0f}%)", 
                        (x, y), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
             cv2.putText(frame, "Please keep still", 
@@ -238,10 +270,7 @@ class SpO2Estimator:
     def reset(self):
         """버퍼 초기화"""
         with self.lock:
-            self.red_values.clear()
-            self.blue_values.clear()
-            self.green_values.clear()
-            self.timestamps.clear()
+            self.color_values.clear()
             self.spo2_value = 0
             self.spo2_confidence = 0
             self.r_value = 0
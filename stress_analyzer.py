@@ -1,18 +1,88 @@
 import numpy as np
-from collections import deque
 import time
 from scipy import signal
 import threading
+from ring_buffer import RingBuffer
+
+def batch_hrv_metrics(rr_array):
+    """RR 간격 배열 전체에서 (RMSSD, SDNN, pNN50) 계산 (기준 구현 - 증분 계산 검증용)"""
+    rmssd = 0
+    pnn50 = 0
+    if len(rr_array) > 1:
+        successive_diffs = np.diff(rr_array)
+        rmssd = np.sqrt(np.mean(successive_diffs ** 2))
+        nn50 = np.sum(np.abs(successive_diffs) > 50)
+        pnn50 = (nn50 / len(successive_diffs)) * 100
+    sdnn = np.std(rr_array)
+    return rmssd, sdnn, pnn50
+
+
+# 주파수 영역 HRV 대역 (Hz)
+LF_BAND = (0.04, 0.15)
+HF_BAND = (0.15, 0.40)
+
+
+def lomb_scargle_lf_hf(beat_times, rr_intervals, resolution=0.005):
+    """
+    불균일 간격 RR 시계열의 LF / HF 파워 (Lomb-Scargle)
+    
+    Args:
+        beat_times: 각 RR 간격이 끝나는 박동 시각 (초)
+        rr_intervals: RR 간격 (ms)
+        resolution: 주파수 격자 간격 (Hz)
+    
+    Returns:
+        (lf_power, hf_power) ms² (보간 / 리샘플링 없이 원래 박동 시각 그대로 사용)
+    """
+    beat_times = np.asarray(beat_times, dtype=np.float64)
+    rr = np.asarray(rr_intervals, dtype=np.float64)
+    rr = rr - rr.mean()
+    span = beat_times[-1] - beat_times[0]
+    
+    frequencies = np.arange(LF_BAND[0], HF_BAND[1] + resolution / 2, resolution)
+    power = signal.lombscargle(beat_times - beat_times[0], rr, 2 * np.pi * frequencies)
+    # 비정규화 주기도 (진폭 A -> A²N/4)를 ms²/Hz 밀도로 변환 (대역 적분 = 분산 기여분)
+    density = power * 2 * span / len(rr)
+    
+    lf = (frequencies >= LF_BAND[0]) & (frequencies <= LF_BAND[1])
+    hf = (frequencies >= HF_BAND[0]) & (frequencies <= HF_BAND[1])
+    return float(density[lf].sum() * resolution), float(density[hf].sum() * resolution)
+
 
 class StressAnalyzer:
     """심박 변이도(HRV) 기반 스트레스 지수 측정"""
     
-    def __init__(self, buffer_size=300):
+    # 주파수 영역 계산 조건 (LF 대역 하한 0.04Hz 주기의 1주기 이상)
+    MIN_SPECTRAL_BEATS = 20
+    MIN_SPECTRAL_SPAN = 30.0
+    
+    # 박동 간격 검증 (update_beats)
+    RR_REFERENCE_BEATS = 8     # 기준 간격 = 최근 수락한 간격 중앙값
+    RR_TOLERANCE = 0.3         # 기준 간격 대비 허용 편차
+    RR_RESEED_REJECTIONS = 4   # 연속으로 이만큼 버려지면 기준 재설정 검토
+    
+    def __init__(self, buffer_size=300, spectral_interval=5.0, spectral_window=120.0):
+        """
+        Args:
+            buffer_size: RR 간격 윈도우 크기
+            spectral_interval: LF/HF 계산 간격 (초, 워커 스레드)
+            spectral_window: LF/HF 계산에 사용할 최근 박동 구간 (초)
+        """
         self.buffer_size = buffer_size
+        self.spectral_interval = spectral_interval
+        self.spectral_window = spectral_window
+        
+        # RR 간격 버퍼 (심박 간 시간 간격, 시각 열 포함 numpy 링 버퍼)
+        self.rr_intervals = RingBuffer(buffer_size, timestamps=True)
         
-        # RR 간격 버퍼 (심박 간 시간 간격)
-        self.rr_intervals = deque(maxlen=buffer_size)
-        self.timestamps = deque(maxlen=buffer_size)
+        # 슬라이딩 윈도우 누적합 (샘플당 O(1) 갱신)
+        # RR 합 / 제곱합은 기준값(shift)을 뺀 값으로 누적해서 분산 계산의 자릿수 손실을 줄임
+        self.rr_shift = 0.0
+        self.rr_sum = 0.0       # Σ(RR - shift)
+        self.rr_sq_sum = 0.0    # Σ(RR - shift)²
+        self.diff_sq_sum = 0.0  # Σ(연속 차이)²
+        self.nn50_count = 0     # |연속 차이| > 50ms 개수
+        self.sum_updates = 0    # 마지막 재계산 이후 추가된 샘플 수
         
         # HRV 메트릭스
         self.rmssd = 0  # Root Mean Square of Successive Differences
@@ -27,23 +97,47 @@ class StressAnalyzer:
         self.last_hr = 0
         self.last_hr_time = 0
         
+        # 박동 단위 입력 (update_beats) - 들어오기 시작하면 심박수 기반 RR 추정 대신 실제 박동 간격 사용
+        self.beat_mode = False
+        self.last_beat_time = None
+        self.rr_accepted_run = 0  # 마지막 기준 재설정 이후 수락한 간격 수
+        self.rr_rejected = []     # 기준과 달라 연속으로 버린 (간격, 시각)
+        
+        # 주파수 영역 HRV (워커 스레드가 spectral_interval마다 갱신)
+        self.lf_power = 0
+        self.hf_power = 0
+        self.lf_hf_ratio = 0
+        self.spectral_time = None
+        self.spectral_thread = None
+        self.spectral_stop = threading.Event()
+        
         # 스레드 안전
         self.lock = threading.Lock()
         
-    def update_heart_rate(self, heart_rate):
-        """심박수 업데이트 및 RR 간격 계산"""
+    @property
+    def timestamps(self):
+        """RR 간격 시각 (오래된 순서 뷰)"""
+        return self.rr_intervals.times()
+    
+    def update_heart_rate(self, heart_rate, timestamp=None):
+        """심박수 업데이트 및 RR 간격 계산 (timestamp: 측정 시각, 없으면 현재 시각)"""
         if heart_rate <= 0 or heart_rate > 200:
             return
             
-        current_time = time.time()
+        current_time = time.time() if timestamp is None else timestamp
         
         with self.lock:
+            if self.beat_mode:
+                # 실제 박동 간격을 쓰는 중 - 심박수에서 RR 추정하지 않음
+                self.last_hr = heart_rate
+                self.last_hr_time = current_time
+                return
+            
             if self.last_hr > 0 and self.last_hr_time > 0:
                 # RR 간격 계산 (ms 단위)
                 rr_interval = (60.0 / heart_rate) * 1000  # BPM to ms
                 
-                self.rr_intervals.append(rr_interval)
-                self.timestamps.append(current_time)
+                self._add_rr_interval(rr_interval, current_time)
                 
                 # 충분한 데이터가 모이면 HRV 계산
                 if len(self.rr_intervals) >= 30:  # 최소 30개 이상
@@ -53,24 +147,194 @@ class StressAnalyzer:
             self.last_hr = heart_rate
             self.last_hr_time = current_time
     
+    def update_beats(self, beat_times):
+        """
+        검출된 박동 시각으로 실제 RR 간격(IBI) 추가 (rPPGProcessor.pop_beats 결과)
+        
+        40~180 BPM 범위 밖이거나 최근 간격 중앙값과 30% 이상 다른 간격 (놓친 / 잘못 검출된 박동)은 버린다.
+        버린 간격이 연속 RR_RESEED_REJECTIONS개 쌓이면 기준 재설정을 검토한다 (_reseed_reference).
+        """
+        if not beat_times:
+            return
+        
+        with self.lock:
+            if not self.beat_mode:
+                # 심박수에서 추정한 RR 간격은 버리고 박동 간격으로 전환
+                self.beat_mode = True
+                self.rr_intervals.clear()
+                self._recompute_sums()
+            
+            for beat_time in beat_times:
+                if self.last_beat_time is not None and beat_time > self.last_beat_time:
+                    rr_interval = (beat_time - self.last_beat_time) * 1000
+                    if 333 <= rr_interval <= 1500:
+                        self._check_rr_interval(rr_interval, beat_time)
+                self.last_beat_time = beat_time
+            
+            if len(self.rr_intervals) >= 30:
+                self._calculate_hrv_metrics()
+                self._calculate_stress_index()
+        
+        self._start_spectral_worker()
+    
+    def _check_rr_interval(self, rr_interval, beat_time):
+        """기준 간격 (재설정 이후 최근 수락 간격 중앙값)과 비교해서 수락 / 버림"""
+        recent = self.rr_intervals.values(min(self.RR_REFERENCE_BEATS, self.rr_accepted_run))
+        reference = np.median(recent) if len(recent) >= 4 else None
+        if reference is None or abs(rr_interval - reference) <= self.RR_TOLERANCE * reference:
+            self._add_rr_interval(rr_interval, beat_time)
+            self.rr_accepted_run += 1
+            self.rr_rejected = []
+            return
+        
+        self.rr_rejected.append((rr_interval, beat_time))
+        if len(self.rr_rejected) >= self.RR_RESEED_REJECTIONS:
+            self._reseed_reference(reference)
+    
+    def _reseed_reference(self, reference):
+        """
+        연속으로 버린 간격들로 기준 재설정
+        
+        처음 수락한 간격들이 잘못된 경우 (예: 두 번 검출된 박동 ~400ms) 이후의 올바른 간격이 모두 버려져
+        reset() 전까지 스트레스 지수가 계산되지 않으므로, 버린 간격끼리 서로 일치하고
+        현재 심박수 (60000 / HR ms)에 기존 기준보다 가까우면 그 간격들을 새 기준으로 삼는다.
+        기존 기준이 RR_REFERENCE_BEATS개보다 적은 간격으로 만들어졌으면 그 간격들 (버퍼의 최근 간격)은 빼고
+        그보다 오래된 간격만 남긴다.
+        """
+        rejected = np.array([rr for rr, _ in self.rr_rejected])
+        candidate = np.median(rejected)
+        consistent = np.all(np.abs(rejected - candidate) <= self.RR_TOLERANCE * candidate)
+        closer = self.last_hr <= 0 or abs(candidate - 60000 / self.last_hr) < abs(reference - 60000 / self.last_hr)
+        if not (consistent and closer):
+            # 가장 오래된 것부터 밀어내며 계속 검토
+            self.rr_rejected.pop(0)
+            return
+        
+        if self.rr_accepted_run < self.RR_REFERENCE_BEATS:
+            keep = len(self.rr_intervals) - self.rr_accepted_run
+            # values(n) / times(n)은 최근 n개를 반환하므로 앞쪽 (오래된) keep개를 잘라냄
+            rr_values = self.rr_intervals.values()[:keep].copy()
+            rr_times = self.rr_intervals.times()[:keep].copy()
+            self.rr_intervals.clear()
+            self.rr_intervals.extend(rr_values, rr_times)
+            self._recompute_sums()
+        
+        for rr_interval, beat_time in self.rr_rejected:
+            self._add_rr_interval(rr_interval, beat_time)
+        self.rr_accepted_run = len(self.rr_rejected)
+        self.rr_rejected = []
+    
+    def _start_spectral_worker(self):
+        """LF/HF 워커 스레드 시작 (처음 박동이 들어올 때 한 번)"""
+        if self.spectral_thread is not None or self.spectral_interval <= 0:
+            return
+        self.spectral_stop.clear()
+        self.spectral_thread = threading.Thread(target=self._spectral_loop, daemon=True)
+        self.spectral_thread.start()
+    
+    def _spectral_loop(self):
+        """spectral_interval마다 LF/HF 갱신 (프레임 루프와 분리)"""
+        while not self.spectral_stop.wait(self.spectral_interval):
+            try:
+                self.compute_frequency_domain()
+            except Exception as e:
+                print(f"LF/HF 계산 오류: {e}")
+    
+    def compute_frequency_domain(self):
+        """최근 spectral_window초 박동 간격으로 LF/HF 계산 (락은 복사할 때만 잡음)"""
+        with self.lock:
+            if not self.beat_mode:
+                return False
+            beat_times = self.rr_intervals.times().copy()
+            rr = self.rr_intervals.values().copy()
+        
+        if len(beat_times) == 0:
+            return False
+        recent = beat_times >= beat_times[-1] - self.spectral_window
+        beat_times, rr = beat_times[recent], rr[recent]
+        if len(rr) < self.MIN_SPECTRAL_BEATS or beat_times[-1] - beat_times[0] < self.MIN_SPECTRAL_SPAN:
+            return False
+        
+        lf_power, hf_power = lomb_scargle_lf_hf(beat_times, rr)
+        with self.lock:
+            self.lf_power = lf_power
+            self.hf_power = hf_power
+            self.lf_hf_ratio = lf_power / hf_power if hf_power > 0 else 0
+            self.spectral_time = beat_times[-1]
+        return True
+    
+    def stop(self):
+        """LF/HF 워커 종료"""
+        self.spectral_stop.set()
+        if self.spectral_thread is not None:
+            self.spectral_thread.join(timeout=1.0)
+            self.spectral_thread = None
+    
+    def _add_rr_interval(self, rr_interval, timestamp):
+        """RR 간격 추가 + 누적합 갱신 (밀려나는 가장 오래된 RR과 그 다음 차이를 빼고 새 값을 더함)"""
+        rr_values = self.rr_intervals.values()
+        count = len(rr_values)
+        
+        if count == 0:
+            self.rr_shift = rr_interval
+        
+        if count == self.buffer_size:
+            oldest = rr_values[0]
+            self.rr_sum -= oldest - self.rr_shift
+            self.rr_sq_sum -= (oldest - self.rr_shift) ** 2
+            if count > 1:
+                diff = rr_values[1] - oldest
+                self.diff_sq_sum -= diff * diff
+                if abs(diff) > 50:
+                    self.nn50_count -= 1
+        
+        if count > 0:
+            diff = rr_interval - rr_values[-1]
+            self.diff_sq_sum += diff * diff
+            if abs(diff) > 50:
+                self.nn50_count += 1
+        
+        self.rr_sum += rr_interval - self.rr_shift
+        self.rr_sq_sum += (rr_interval - self.rr_shift) ** 2
+        self.rr_intervals.append(rr_interval, timestamp)
+        
+        # 뺄셈 누적 오차가 쌓이지 않도록 윈도우 크기만큼 추가될 때마다 새로 계산 (분할 상환 O(1))
+        self.sum_updates += 1
+        if self.sum_updates >= self.buffer_size:
+            self._recompute_sums()
+    
+    def _recompute_sums(self):
+        """현재 윈도우로 누적합 다시 계산"""
+        rr_array = self.rr_intervals.values()
+        self.sum_updates = 0
+        if len(rr_array) == 0:
+            self.rr_shift = self.rr_sum = self.rr_sq_sum = self.diff_sq_sum = 0.0
+            self.nn50_count = 0
+            return
+        self.rr_shift = float(rr_array.mean())
+        shifted = rr_array - self.rr_shift
+        self.rr_sum = float(shifted.sum())
+        self.rr_sq_sum = float(np.dot(shifted, shifted))
+        successive_diffs = np.diff(rr_array)
+        self.diff_sq_sum = float(np.dot(successive_diffs, successive_diffs))
+        self.nn50_count = int(np.sum(np.abs(successive_diffs) > 50))
+    
     def _calculate_hrv_metrics(self):
-        """HRV 메트릭스 계산"""
+        """HRV 메트릭스 계산 (누적합에서 O(1))"""
         try:
-            rr_array = np.array(self.rr_intervals)
+            count = len(self.rr_intervals)
+            if count == 0:
+                return
             
             # RMSSD: 연속된 RR 간격 차이의 제곱 평균 제곱근
-            if len(rr_array) > 1:
-                successive_diffs = np.diff(rr_array)
-                self.rmssd = np.sqrt(np.mean(successive_diffs ** 2))
-            
-            # SDNN: RR 간격의 표준 편차
-            self.sdnn = np.std(rr_array)
-            
             # pNN50: 50ms 이상 차이나는 연속 RR 간격의 비율
-            if len(rr_array) > 1:
-                successive_diffs = np.abs(np.diff(rr_array))
-                nn50 = np.sum(successive_diffs > 50)
-                self.pnn50 = (nn50 / len(successive_diffs)) * 100
+            if count > 1:
+                self.rmssd = np.sqrt(max(self.diff_sq_sum, 0.0) / (count - 1))
+                self.pnn50 = (self.nn50_count / (count - 1)) * 100
+            
+            # SDNN: RR 간격의 표준 편차 (모표준편차, np.std와 동일)
+            mean = self.rr_sum / count
+            self.sdnn = np.sqrt(max(self.rr_sq_sum / count - mean * mean, 0.0))
             
         except Exception as e:
             print(f"HRV 계산 오류: {e}")
@@ -153,7 +417,11 @@ class StressAnalyzer:
                 'stress_level': self.stress_level,
                 'rmssd': self.rmssd,
                 'sdnn': self.sdnn,
-                'pnn50': self.pnn50
+                'pnn50': self.pnn50,
+                'lf_power': self.lf_power,
+                'hf_power': self.hf_power,
+                'lf_hf_ratio': self.lf_hf_ratio,
+                'rr_source': 'beats' if self.beat_mode else 'heart_rate'
             }
     
     def draw_stress_info(self, frame, x=10, y=350):
@@ -207,16 +475,108 @@ class StressAnalyzer:
         """버퍼 초기화"""
         with self.lock:
             self.rr_intervals.clear()
-            self.timestamps.clear()
+            self._recompute_sums()
             self.stress_index = 0
             self.stress_level = "측정 중..."
             self.rmssd = 0
             self.sdnn = 0
             self.pnn50 = 0
+            self.beat_mode = False
+            self.last_beat_time = None
+            self.rr_accepted_run = 0
+            self.rr_rejected = []
+            self.lf_power = 0
+            self.hf_power = 0
+            self.lf_hf_ratio = 0
+            self.spectral_time = None
 
 
 # OpenCV import (draw 함수용)
 try:
     import cv2
 except ImportError:
-    print("경고: OpenCV를 찾을 수 없습니다. 시각화 기능이 제한됩니다.")
\ No newline at end of file
+    print("경고: OpenCV를 찾을 수 없습니다. 시각화 기능이 제한됩니다.")
+
+def self_check(trials=200, seed=0):
+    """무작위 RR 시퀀스로 증분 HRV와 batch_hrv_metrics 비교 (매 샘플마다)"""
+    rng = np.random.default_rng(seed)
+    checked = 0
+    for _ in range(trials):
+        buffer_size = int(rng.integers(2, 80))
+        analyzer = StressAnalyzer(buffer_size=buffer_size)
+        length = int(rng.integers(1, buffer_size * 5))
+        # 느린 추세 + 잡음 + 가끔 큰 변화 (|차이| 50ms 경계 부근 포함)
+        rr = 800 + np.cumsum(rng.normal(0, 5, length)) + rng.normal(0, 30, length)
+        rr[rng.random(length) < 0.05] += rng.choice([-50.0, 50.0, 120.0])
+        
+        for i, rr_interval in enumerate(rr):
+            if rng.random() < 0.01:
+                analyzer.reset()
+            analyzer._add_rr_interval(rr_interval, float(i))
+            analyzer._calculate_hrv_metrics()
+            
+            rmssd, sdnn, pnn50 = batch_hrv_metrics(analyzer.rr_intervals.values())
+            if len(analyzer.rr_intervals) > 1:
+                assert np.isclose(analyzer.rmssd, rmssd, rtol=1e-9, atol=1e-9), (analyzer.rmssd, rmssd)
+                assert analyzer.pnn50 == pnn50, (analyzer.pnn50, pnn50)
+            assert np.isclose(analyzer.sdnn, sdnn, rtol=1e-9, atol=1e-6), (analyzer.sdnn, sdnn)
+            checked += 1
+    
+    print(f"✓ Incremental HRV matches batch computation ({trials} sequences, {checked} updates)")
+    
+    # LF/HF: 0.1Hz(LF) / 0.25Hz(HF)로 변조된 박동 간격 (불균일 박동 시각 그대로)
+    for modulation, expect_lf in ((0.1, True), (0.25, False)):
+        analyzer = StressAnalyzer(spectral_interval=0)
+        beat_time = 0.0
+        beats = []
+        while beat_time < 120:
+            beat_time += (850 + 40 * np.sin(2 * np.pi * modulation * beat_time) + rng.normal(0, 5)) / 1000
+            beats.append(beat_time)
+        analyzer.update_beats(beats)
+        assert analyzer.compute_frequency_domain()
+        data = analyzer.get_stress_data()
+        assert data['rr_source'] == 'beats'
+        assert (data['lf_hf_ratio'] > 1) == expect_lf, data
+        # 40ms 진폭 사인파 분산 = 800ms², 대부분이 해당 대역에 있어야 함
+        band_power = data['lf_power'] if expect_lf else data['hf_power']
+        assert 500 < band_power < 1100, data
+    
+    print("✓ Lomb-Scargle LF/HF separates 0.1 Hz and 0.25 Hz RR modulation")
+    
+    # 처음 박동이 두 번씩 검출되어 (~400ms) 기준이 잘못 잡혀도 올바른 간격 (~800ms, 75 BPM)으로 복구
+    analyzer = StressAnalyzer(spectral_interval=0)
+    analyzer.update_heart_rate(75, timestamp=0.0)
+    beats = list(np.cumsum([0.4] * 6))
+    beat_time = beats[-1]
+    for _ in range(60):
+        beat_time += (800 + rng.normal(0, 20)) / 1000
+        beats.append(beat_time)
+    analyzer.update_beats(beats)
+    rr = analyzer.rr_intervals.values()
+    assert len(rr) >= 50 and rr.min() > 600, (len(rr), rr.min())
+    assert analyzer.get_stress_data()['stress_level'] != "측정 중...", analyzer.get_stress_data()
+    
+    # 올바른 기준은 연속된 이중 검출 (~400ms)로 바뀌지 않음
+    analyzer.update_beats(list(beat_time + np.cumsum([0.4] * 6)))
+    assert len(analyzer.rr_intervals) == len(rr) and analyzer.rr_intervals.values().min() > 600
+    
+    # 심박수가 잠깐 120 BPM (500ms)으로 튀어 기준이 바뀐 뒤 75 BPM (800ms)으로 돌아오면
+    # 재설정 때 500ms 간격들만 빠지고 그 전의 800ms 간격은 남아야 함
+    analyzer = StressAnalyzer(spectral_interval=0)
+    analyzer.update_heart_rate(75, timestamp=0.0)
+    beats = list(np.cumsum([0.8] * 41))
+    analyzer.update_beats(beats)
+    analyzer.update_heart_rate(120)
+    analyzer.update_beats(list(beats[-1] + np.cumsum([0.5] * 4)))
+    analyzer.update_heart_rate(75)
+    analyzer.update_beats(list(beats[-1] + 2.0 + np.cumsum([0.8] * 4)))
+    rr = analyzer.rr_intervals.values()
+    assert not np.any(np.abs(rr - 500) < 1), rr
+    assert len(rr) == 44 and np.allclose(rr, 800), (len(rr), rr)
+    assert np.isclose(analyzer.rr_intervals.times()[0], beats[1]), analyzer.rr_intervals.times()[:3]
+    print("✓ Beat intervals recover from a wrong initial reference")
+    return True
+
+
+if __name__ == "__main__":
+    self_check()
\ No newline at end of file